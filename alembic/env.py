@@ -25,6 +25,9 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 from welearn_database.data.models import Base
 
+# Tables owned by the datastack, registered on the same metadata
+import welearn_datastack.data.db_models  # noqa: F401
+
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
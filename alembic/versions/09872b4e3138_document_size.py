@@ -0,0 +1,46 @@
+"""document_size
+
+Revision ID: 09872b4e3138
+Revises: 480be7566897
+Create Date: 2026-10-19 10:03:27.941280
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "09872b4e3138"
+down_revision: Union[str, None] = "480be7566897"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled by the collector and the vectorizer, existing documents are handled by the BackFiller
+    # (QUERY_NAME=document_without_size / upsert_document_size)
+    op.create_table(
+        "document_size",
+        sa.Column("document_id", sa.Uuid(), nullable=False),
+        sa.Column("content_bytes", sa.BIGINT(), nullable=True),
+        sa.Column("slice_bytes", sa.BIGINT(), nullable=True),
+        sa.Column(
+            "updated_at", postgresql.TIMESTAMP(), server_default="NOW()", nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["document_id"],
+            ["document_related.welearn_document.id"],
+            name="document_size_document_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("document_id"),
+        schema="document_related",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("document_size", schema="document_related")
@@ -0,0 +1,135 @@
+"""latest_process_state
+
+Revision ID: 480be7566897
+Revises: e354666f951d
+Create Date: 2026-10-19 09:12:41.518203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "480be7566897"
+down_revision: Union[str, None] = "e354666f951d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "latest_process_state",
+        sa.Column("document_id", sa.Uuid(), nullable=False),
+        sa.Column("process_state_id", sa.Uuid(), nullable=False),
+        sa.Column("corpus_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "title",
+            postgresql.ENUM(name="step", schema="document_related", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("created_at", postgresql.TIMESTAMP(), nullable=False),
+        sa.Column("operation_order", sa.BIGINT(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["document_id"],
+            ["document_related.welearn_document.id"],
+            name="latest_process_state_document_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("document_id"),
+        schema="document_related",
+    )
+    op.create_index(
+        "latest_process_state_title_corpus_id_idx",
+        "latest_process_state",
+        ["title", "corpus_id"],
+        schema="document_related",
+    )
+
+    # Statement level trigger : a bulk insert of process states updates each document only once
+    op.execute("""
+        CREATE OR REPLACE FUNCTION document_related.update_latest_process_state()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO document_related.latest_process_state
+                (document_id, process_state_id, corpus_id, title, created_at, operation_order)
+            SELECT DISTINCT ON (ns.document_id)
+                ns.document_id, ns.id, wd.corpus_id, ns.title, ns.created_at, ns.operation_order
+            FROM new_states ns
+            JOIN document_related.welearn_document wd ON wd.id = ns.document_id
+            ORDER BY ns.document_id, ns.operation_order DESC
+            ON CONFLICT (document_id) DO UPDATE SET
+                process_state_id = EXCLUDED.process_state_id,
+                corpus_id = EXCLUDED.corpus_id,
+                title = EXCLUDED.title,
+                created_at = EXCLUDED.created_at,
+                operation_order = EXCLUDED.operation_order
+            WHERE document_related.latest_process_state.operation_order < EXCLUDED.operation_order;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """)
+    op.execute("""
+        CREATE TRIGGER process_state_update_latest
+        AFTER INSERT ON document_related.process_state
+        REFERENCING NEW TABLE AS new_states
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION document_related.update_latest_process_state();
+        """)
+
+    # Keep the denormalized corpus in sync if a document changes of corpus
+    op.execute("""
+        CREATE OR REPLACE FUNCTION document_related.update_latest_process_state_corpus()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE document_related.latest_process_state
+            SET corpus_id = NEW.corpus_id
+            WHERE document_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """)
+    op.execute("""
+        CREATE TRIGGER welearn_document_update_latest_process_state_corpus
+        AFTER UPDATE OF corpus_id ON document_related.welearn_document
+        FOR EACH ROW
+        WHEN (OLD.corpus_id IS DISTINCT FROM NEW.corpus_id)
+        EXECUTE FUNCTION document_related.update_latest_process_state_corpus();
+        """)
+
+    # Backfill from the history, the trigger handles the states inserted from now
+    op.execute("""
+        INSERT INTO document_related.latest_process_state
+            (document_id, process_state_id, corpus_id, title, created_at, operation_order)
+        SELECT DISTINCT ON (ps.document_id)
+            ps.document_id, ps.id, wd.corpus_id, ps.title, ps.created_at, ps.operation_order
+        FROM document_related.process_state ps
+        JOIN document_related.welearn_document wd ON wd.id = ps.document_id
+        ORDER BY ps.document_id, ps.operation_order DESC
+        ON CONFLICT (document_id) DO NOTHING;
+        """)
+
+
+def downgrade() -> None:
+    op.execute(
+        "DROP TRIGGER IF EXISTS welearn_document_update_latest_process_state_corpus "
+        "ON document_related.welearn_document;"
+    )
+    op.execute(
+        "DROP FUNCTION IF EXISTS document_related.update_latest_process_state_corpus();"
+    )
+    op.execute(
+        "DROP TRIGGER IF EXISTS process_state_update_latest ON document_related.process_state;"
+    )
+    op.execute(
+        "DROP FUNCTION IF EXISTS document_related.update_latest_process_state();"
+    )
+    op.drop_index(
+        "latest_process_state_title_corpus_id_idx",
+        table_name="latest_process_state",
+        schema="document_related",
+    )
+    op.drop_table("latest_process_state", schema="document_related")
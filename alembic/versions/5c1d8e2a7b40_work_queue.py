@@ -0,0 +1,60 @@
+"""work_queue
+
+Revision ID: 5c1d8e2a7b40
+Revises: 09872b4e3138
+Create Date: 2026-10-19 11:21:05.613482
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1d8e2a7b40"
+down_revision: Union[str, None] = "09872b4e3138"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "work_queue",
+        sa.Column("queue_name", sa.String(), nullable=False),
+        sa.Column("document_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "enqueued_at",
+            postgresql.TIMESTAMP(),
+            server_default="NOW()",
+            nullable=False,
+        ),
+        sa.Column("claimed_by", sa.String(), nullable=True),
+        sa.Column("lease_expires_at", postgresql.TIMESTAMP(), nullable=True),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(
+            ["document_id"],
+            ["document_related.welearn_document.id"],
+            name="work_queue_document_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("queue_name", "document_id"),
+        schema="document_related",
+    )
+    op.create_index(
+        "work_queue_queue_name_enqueued_at_idx",
+        "work_queue",
+        ["queue_name", "enqueued_at"],
+        schema="document_related",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "work_queue_queue_name_enqueued_at_idx",
+        table_name="work_queue",
+        schema="document_related",
+    )
+    op.drop_table("work_queue", schema="document_related")
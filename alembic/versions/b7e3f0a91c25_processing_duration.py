@@ -0,0 +1,61 @@
+"""processing_duration
+
+Revision ID: b7e3f0a91c25
+Revises: 5c1d8e2a7b40
+Create Date: 2026-10-19 13:47:52.204719
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e3f0a91c25"
+down_revision: Union[str, None] = "5c1d8e2a7b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "processing_duration",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("corpus_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "title",
+            postgresql.ENUM(name="step", schema="document_related", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("documents_qty", sa.Integer(), nullable=False),
+        sa.Column("duration_seconds", sa.Float(), nullable=False),
+        sa.Column(
+            "created_at", postgresql.TIMESTAMP(), server_default="NOW()", nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["corpus_id"],
+            ["corpus_related.corpus.id"],
+            name="processing_duration_corpus_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        schema="document_related",
+    )
+    op.create_index(
+        "processing_duration_title_corpus_id_created_at_idx",
+        "processing_duration",
+        ["title", "corpus_id", "created_at"],
+        schema="document_related",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "processing_duration_title_corpus_id_created_at_idx",
+        table_name="processing_duration",
+        schema="document_related",
+    )
+    op.drop_table("processing_duration", schema="document_related")
@@ -0,0 +1,305 @@
+"""partition_process_state
+
+Revision ID: d41a7c9e2f58
+Revises: b7e3f0a91c25
+Create Date: 2026-10-19 16:05:13.482911
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d41a7c9e2f58"
+down_revision: Union[str, None] = "b7e3f0a91c25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, document_id, title, created_at, operation_order"
+
+
+def _create_restore_grants_function() -> None:
+    """
+    Temporary function granting again the privileges of an ACL (pg_class.relacl) on a recreated relation, a NULL ACL
+    means the default privileges and grants nothing
+    """
+    op.execute("""
+        CREATE OR REPLACE FUNCTION pg_temp.restore_grants(relation text, acl aclitem[]) RETURNS void AS $$
+        DECLARE grant_item record;
+        BEGIN
+            FOR grant_item IN SELECT * FROM aclexplode(acl) LOOP
+                EXECUTE format(
+                    'GRANT %s ON %s TO %s%s',
+                    grant_item.privilege_type,
+                    relation,
+                    CASE
+                        WHEN grant_item.grantee = 0 THEN 'PUBLIC'
+                        ELSE quote_ident(pg_get_userbyid(grant_item.grantee))
+                    END,
+                    CASE WHEN grant_item.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END
+                );
+            END LOOP;
+        END $$ LANGUAGE plpgsql;
+        """)
+
+
+def _save_process_state_grants() -> None:
+    op.execute("""
+        CREATE TEMP TABLE process_state_grants AS
+        SELECT relacl AS acl FROM pg_class WHERE oid = 'document_related.process_state'::regclass;
+        """)
+
+
+def _restore_process_state_grants() -> None:
+    op.execute(
+        "SELECT pg_temp.restore_grants('document_related.process_state', acl) FROM process_state_grants;"
+    )
+    op.execute("DROP TABLE process_state_grants;")
+
+
+def _drop_dependent_views() -> None:
+    """
+    A table can't be partitioned in place : the views and materialized views built on process_state (directly or
+    through other views) are saved with their owner, grants and indexes in a temporary table, then dropped.
+    """
+    op.execute("""
+        CREATE TEMP TABLE process_state_dependent_views AS
+        WITH RECURSIVE dependents AS (
+            SELECT DISTINCT rw.ev_class AS view_oid, 1 AS depth
+            FROM pg_depend d
+            JOIN pg_rewrite rw ON rw.oid = d.objid
+            WHERE d.refobjid = 'document_related.process_state'::regclass
+            AND rw.ev_class <> d.refobjid
+            UNION
+            SELECT DISTINCT rw.ev_class, dep.depth + 1
+            FROM dependents dep
+            JOIN pg_depend d ON d.refobjid = dep.view_oid
+            JOIN pg_rewrite rw ON rw.oid = d.objid
+            WHERE rw.ev_class <> dep.view_oid
+        )
+        SELECT
+            format('%I.%I', n.nspname, c.relname) AS view_name,
+            c.relkind,
+            max(dep.depth) AS depth,
+            pg_get_viewdef(c.oid) AS definition,
+            pg_get_userbyid(c.relowner) AS owner,
+            c.relacl AS acl,
+            ARRAY(
+                SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i WHERE i.indrelid = c.oid
+            ) AS indexes
+        FROM dependents dep
+        JOIN pg_class c ON c.oid = dep.view_oid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        GROUP BY c.oid, n.nspname, c.relname, c.relkind;
+        """)
+    op.execute("""
+        DO $$
+        DECLARE v record;
+        BEGIN
+            FOR v IN SELECT * FROM process_state_dependent_views ORDER BY depth DESC LOOP
+                IF v.relkind = 'm' THEN
+                    EXECUTE format('DROP MATERIALIZED VIEW %s', v.view_name);
+                ELSE
+                    EXECUTE format('DROP VIEW %s', v.view_name);
+                END IF;
+            END LOOP;
+        END $$;
+        """)
+
+
+def _recreate_dependent_views() -> None:
+    """
+    Recreate the views saved by _drop_dependent_views on the new process_state table
+    """
+    op.execute("""
+        DO $$
+        DECLARE v record; index_definition text;
+        BEGIN
+            FOR v IN SELECT * FROM process_state_dependent_views ORDER BY depth LOOP
+                IF v.relkind = 'm' THEN
+                    EXECUTE format('CREATE MATERIALIZED VIEW %s AS %s', v.view_name, v.definition);
+                    EXECUTE format('ALTER MATERIALIZED VIEW %s OWNER TO %I', v.view_name, v.owner);
+                ELSE
+                    EXECUTE format('CREATE VIEW %s AS %s', v.view_name, v.definition);
+                    EXECUTE format('ALTER VIEW %s OWNER TO %I', v.view_name, v.owner);
+                END IF;
+                PERFORM pg_temp.restore_grants(v.view_name, v.acl);
+                FOREACH index_definition IN ARRAY v.indexes LOOP
+                    EXECUTE index_definition;
+                END LOOP;
+            END LOOP;
+        END $$;
+        """)
+    op.execute("DROP TABLE process_state_dependent_views;")
+
+
+def _create_latest_process_state_trigger() -> None:
+    op.execute("""
+        CREATE TRIGGER process_state_update_latest
+        AFTER INSERT ON document_related.process_state
+        REFERENCING NEW TABLE AS new_states
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION document_related.update_latest_process_state();
+        """)
+
+
+def upgrade() -> None:
+    _create_restore_grants_function()
+    _save_process_state_grants()
+    _drop_dependent_views()
+    op.execute(
+        "DROP TRIGGER IF EXISTS process_state_update_latest ON document_related.process_state;"
+    )
+    op.execute(
+        "ALTER TABLE document_related.process_state RENAME TO process_state_unpartitioned;"
+    )
+    op.execute(
+        "ALTER INDEX IF EXISTS document_related.process_state_pkey "
+        "RENAME TO process_state_unpartitioned_pkey;"
+    )
+
+    # The partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE document_related.process_state (
+            id uuid NOT NULL DEFAULT gen_random_uuid(),
+            document_id uuid NOT NULL,
+            title document_related.step NOT NULL,
+            created_at timestamp NOT NULL DEFAULT NOW(),
+            operation_order bigint NOT NULL
+                DEFAULT nextval('document_related.process_state_operation_order_seq'),
+            CONSTRAINT process_state_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT state_document_id_fkey FOREIGN KEY (document_id)
+                REFERENCES document_related.welearn_document (id)
+        ) PARTITION BY RANGE (created_at);
+        """)
+    op.execute(
+        "ALTER SEQUENCE document_related.process_state_operation_order_seq "
+        "OWNED BY document_related.process_state.operation_order;"
+    )
+
+    # One partition per month from the oldest state to 2 months ahead, ProcessStateArchiver creates the next ones.
+    # The default partition receives the states no monthly partition covers.
+    op.execute("""
+        DO $$
+        DECLARE month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    oldest.month,
+                    date_trunc('month', localtimestamp) + interval '2 months',
+                    interval '1 month'
+                )::date
+                FROM (
+                    SELECT date_trunc('month', coalesce(min(created_at), localtimestamp)) AS month
+                    FROM document_related.process_state_unpartitioned
+                ) oldest
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE document_related.%I PARTITION OF document_related.process_state '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'process_state_' || to_char(month, '"y"YYYY"m"MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$;
+        """)
+    op.execute(
+        "CREATE TABLE document_related.process_state_default "
+        "PARTITION OF document_related.process_state DEFAULT;"
+    )
+    op.create_index(
+        "process_state_document_id_operation_order_idx",
+        "process_state",
+        ["document_id", "operation_order"],
+        schema="document_related",
+    )
+
+    # latest_process_state is already up to date, the trigger is created after the copy
+    op.execute(f"""
+        INSERT INTO document_related.process_state ({COLUMNS})
+        SELECT {COLUMNS} FROM document_related.process_state_unpartitioned;
+        """)
+    op.execute("DROP TABLE document_related.process_state_unpartitioned;")
+    _create_latest_process_state_trigger()
+    _restore_process_state_grants()
+    _recreate_dependent_views()
+
+    op.create_table(
+        "process_state_archive",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("document_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "title",
+            postgresql.ENUM(name="step", schema="document_related", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("created_at", postgresql.TIMESTAMP(), nullable=False),
+        sa.Column("operation_order", sa.BIGINT(), nullable=False),
+        sa.Column(
+            "archived_at",
+            postgresql.TIMESTAMP(),
+            server_default="NOW()",
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        schema="document_related",
+    )
+    op.create_index(
+        "process_state_archive_document_id_idx",
+        "process_state_archive",
+        ["document_id"],
+        schema="document_related",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "process_state_archive_document_id_idx",
+        table_name="process_state_archive",
+        schema="document_related",
+    )
+    op.drop_table("process_state_archive", schema="document_related")
+
+    _create_restore_grants_function()
+    _save_process_state_grants()
+    _drop_dependent_views()
+    op.execute(
+        "DROP TRIGGER IF EXISTS process_state_update_latest ON document_related.process_state;"
+    )
+    op.execute(
+        "ALTER TABLE document_related.process_state RENAME TO process_state_partitioned;"
+    )
+    op.execute(
+        "ALTER INDEX document_related.process_state_pkey "
+        "RENAME TO process_state_partitioned_pkey;"
+    )
+    op.execute("""
+        CREATE TABLE document_related.process_state (
+            id uuid NOT NULL DEFAULT gen_random_uuid(),
+            document_id uuid NOT NULL,
+            title document_related.step NOT NULL,
+            created_at timestamp NOT NULL DEFAULT NOW(),
+            operation_order bigint NOT NULL
+                DEFAULT nextval('document_related.process_state_operation_order_seq'),
+            CONSTRAINT process_state_pkey PRIMARY KEY (id),
+            CONSTRAINT state_document_id_fkey FOREIGN KEY (document_id)
+                REFERENCES document_related.welearn_document (id)
+        );
+        """)
+    op.execute(
+        "ALTER SEQUENCE document_related.process_state_operation_order_seq "
+        "OWNED BY document_related.process_state.operation_order;"
+    )
+    op.execute(f"""
+        INSERT INTO document_related.process_state ({COLUMNS})
+        SELECT {COLUMNS} FROM document_related.process_state_partitioned;
+        """)
+    op.execute("DROP TABLE document_related.process_state_partitioned;")
+    _create_latest_process_state_trigger()
+    _restore_process_state_grants()
+    _recreate_dependent_views()
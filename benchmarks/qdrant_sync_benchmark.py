@@ -0,0 +1,278 @@
+"""
+End-to-end benchmark of the QdrantSyncronizer logic, without any cluster : a SQLite database (or a local Postgres
+already migrated) is seeded with synthetic documents, slices and SDGs, and synchronized in a local Qdrant.
+
+Usage :
+    python -m benchmarks.qdrant_sync_benchmark --documents 2000 --slices-per-document 10 --mode async
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+from uuid import UUID
+
+import numpy
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import models
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import (
+    Base,
+    Category,
+    Corpus,
+    DbSchemaEnum,
+    DocumentSlice,
+    EmbeddingModel,
+    ProcessState,
+    Sdg,
+    WeLearnDocument,
+)
+
+from welearn_datastack.nodes_workflow.QdrantSyncronizer import qdrant_syncronizer
+
+logger = logging.getLogger(__name__)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def create_session(db_url: str | None) -> Session:
+    """
+    Create a session on the given database, or on an in-memory SQLite database with the schema created
+    :param db_url: URL of an already migrated database, None for SQLite in memory
+    :return: Database session
+    """
+    if db_url:
+        return sessionmaker(create_engine(db_url))()
+
+    # Static pool : the async mode uses the session from a dedicated thread
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    with engine.begin() as conn:
+        for schema_name in DbSchemaEnum:  # type: ignore
+            conn.execute(text(f"ATTACH ':memory:' AS {schema_name.value}"))
+    Base.metadata.create_all(engine)
+    return sessionmaker(engine)()
+
+
+def seed_database(
+    db_session: Session,
+    documents_qty: int,
+    slices_per_document: int,
+    vector_size: int,
+    langs: List[str],
+) -> List[UUID]:
+    """
+    Insert synthetic documents ready to be synchronized, i.e. with their keywords extracted
+    :return: Ids of the inserted documents
+    """
+    rng = numpy.random.default_rng(42)
+    category_id = uuid.uuid4()
+    db_session.add(Category(id=category_id, title="benchmark"))
+    corpus = Corpus(
+        id=uuid.uuid4(),
+        source_name="benchmark",
+        is_fix=True,
+        is_active=True,
+        category_id=category_id,
+    )
+    db_session.add(corpus)
+    models_per_lang = {
+        lang: EmbeddingModel(id=uuid.uuid4(), title=f"bench-{lang}", lang=lang)
+        for lang in langs
+    }
+    db_session.add_all(models_per_lang.values())
+
+    docids: List[UUID] = []
+    created_at = datetime.now() - timedelta(days=1)
+    for i in range(documents_qty):
+        lang = langs[i % len(langs)]
+        doc_id = uuid.uuid4()
+        docids.append(doc_id)
+        db_session.add(
+            WeLearnDocument(
+                id=doc_id,
+                title=f"benchmark document {i}",
+                url=f"https://www.example.org/benchmark/{i}",
+                lang=lang,
+                full_content="This is a sentence. " * slices_per_document,
+                corpus=corpus,
+                description="benchmark",
+                details={},
+            )
+        )
+        db_session.add(
+            ProcessState(
+                id=uuid.uuid4(),
+                document_id=doc_id,
+                title=Step.DOCUMENT_KEYWORDS_EXTRACTED.value,
+                created_at=created_at,
+                operation_order=i,
+            )
+        )
+        embeddings = rng.uniform(-1, 1, (slices_per_document, vector_size)).astype(
+            numpy.float32
+        )
+        for order in range(slices_per_document):
+            slice_id = uuid.uuid4()
+            db_session.add(
+                DocumentSlice(
+                    id=slice_id,
+                    body="This is a sentence.",
+                    document_id=doc_id,
+                    order_sequence=order,
+                    embedding=embeddings[order].tobytes(),
+                    embedding_model_name=models_per_lang[lang].title,
+                    embedding_model_id=models_per_lang[lang].id,
+                )
+            )
+            db_session.add(
+                Sdg(
+                    id=uuid.uuid4(),
+                    slice_id=slice_id,
+                    sdg_number=int(rng.integers(1, 18)),
+                    bi_classifier_model_id=uuid.uuid4(),
+                    n_classifier_model_id=uuid.uuid4(),
+                )
+            )
+        if i % 1000 == 999:
+            db_session.commit()
+    db_session.commit()
+    return docids
+
+
+def _collections_names(langs: List[str]) -> List[str]:
+    return [f"collection_welearn_{lang}_bench-{lang}" for lang in langs]
+
+
+def run_sync(args, db_session: Session, docids: List[UUID]) -> int:
+    qdrant_client = QdrantClient(path=args.qdrant_path or ":memory:")
+    for name in _collections_names(args.langs):
+        qdrant_client.create_collection(
+            collection_name=name,
+            vectors_config=models.VectorParams(
+                size=args.vector_size, distance=models.Distance.COSINE
+            ),
+        )
+    qdrant_syncronizer.syncronize(
+        db_session=db_session,
+        qdrant_client=qdrant_client,
+        docids=docids,
+        qdrant_chunk_size=args.chunk_size,
+        qdrant_wait=True,
+    )
+    return sum(
+        qdrant_client.count(name, exact=True).count
+        for name in _collections_names(args.langs)
+    )
+
+
+async def run_async_sync(args, db_session: Session, docids: List[UUID]) -> int:
+    qdrant_client = AsyncQdrantClient(path=args.qdrant_path or ":memory:")
+    for name in _collections_names(args.langs):
+        await qdrant_client.create_collection(
+            collection_name=name,
+            vectors_config=models.VectorParams(
+                size=args.vector_size, distance=models.Distance.COSINE
+            ),
+        )
+    await qdrant_syncronizer.async_syncronize(
+        db_session=db_session,
+        qdrant_client=qdrant_client,
+        docids=docids,
+        qdrant_chunk_size=args.chunk_size,
+        qdrant_wait=True,
+        max_in_flight=args.max_in_flight,
+    )
+    points = 0
+    for name in _collections_names(args.langs):
+        points += (await qdrant_client.count(name, exact=True)).count
+    return points
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--slices-per-document", type=int, default=10)
+    parser.add_argument("--vector-size", type=int, default=384)
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--langs", nargs="+", default=["en", "fr"])
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument(
+        "--db-url", default=None, help="Migrated database, SQLite in memory if unset"
+    )
+    parser.add_argument(
+        "--qdrant-path", default=None, help="Local Qdrant folder, in memory if unset"
+    )
+    parser.add_argument("--output", type=Path, default=None, help="JSON report path")
+    args = parser.parse_args()
+
+    # Nodes configure the root logger when imported, keep only the report on the output
+    logging.getLogger().setLevel(logging.WARNING)
+
+    db_session = create_session(args.db_url)
+    seed_start = time.monotonic()
+    docids = seed_database(
+        db_session,
+        args.documents,
+        args.slices_per_document,
+        args.vector_size,
+        args.langs,
+    )
+    seed_duration = time.monotonic() - seed_start
+    db_session.expunge_all()
+    rss_before_sync = _peak_rss_mb()
+
+    queries_qty = 0
+
+    def count_query(*_):
+        nonlocal queries_qty
+        queries_qty += 1
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_query)
+    sync_start = time.monotonic()
+    if args.mode == "async":
+        points_qty = asyncio.run(run_async_sync(args, db_session, docids))
+    else:
+        points_qty = run_sync(args, db_session, docids)
+    sync_duration = time.monotonic() - sync_start
+    event.remove(db_session.get_bind(), "before_cursor_execute", count_query)
+
+    chunks_qty = -(-len(docids) // args.chunk_size)
+    report = {
+        "mode": args.mode,
+        "documents": args.documents,
+        "slices_per_document": args.slices_per_document,
+        "vector_size": args.vector_size,
+        "chunk_size": args.chunk_size,
+        "seed_duration_s": round(seed_duration, 2),
+        "sync_duration_s": round(sync_duration, 2),
+        "points": points_qty,
+        "points_per_s": round(points_qty / sync_duration, 1),
+        "db_queries": queries_qty,
+        "db_queries_per_chunk": round(queries_qty / chunks_qty, 1),
+        "peak_rss_before_sync_mb": round(rss_before_sync, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import logging
+import os
+from pathlib import Path
+from typing import Dict
+
+import numpy
+from sqlalchemy import func
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import (
+    Corpus,
+    DocumentSlice,
+    EmbeddingModel,
+    WeLearnDocument,
+)
+
+from welearn_datastack.modules.retrieve_data_from_database import (
+    _get_process_state_source,
+    _join_last_process_state,
+)
+from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s][%(name)s][%(levelname)s] - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Separator between the embedding model title and the array name in the fixture keys
+KEY_SEPARATOR = "__"
+
+
+def main() -> None:
+    """
+    Export a sample of real slices embeddings, normalized, with the payload values used in the locust filters. Only
+    the slices of documents whose last state is DOCUMENT_IN_QDRANT are sampled, so the filters match points.
+    The fixture contains for each embedding model the arrays <model>__vectors, <model>__document_ids,
+    <model>__corpora and <model>__langs.
+    """
+    sample_size = int(os.getenv("LOCUST_FIXTURE_SAMPLE_SIZE", "1000"))
+    fixture_path = Path(
+        os.getenv(
+            "LOCUST_VECTORS_FIXTURE", Path(__file__).parent / "vectors_fixture.npz"
+        )
+    )
+
+    db_session = create_db_session()
+    state = _get_process_state_source()
+    arrays: Dict[str, numpy.ndarray] = {}
+    for (model_title,) in db_session.query(EmbeddingModel.title).all():
+        query = (
+            db_session.query(
+                DocumentSlice.embedding,
+                DocumentSlice.document_id,
+                Corpus.source_name,
+                WeLearnDocument.lang,
+            )
+            .join(EmbeddingModel, DocumentSlice.embedding_model_id == EmbeddingModel.id)
+            .join(WeLearnDocument, DocumentSlice.document_id == WeLearnDocument.id)
+            .join(Corpus, WeLearnDocument.corpus_id == Corpus.id)
+            .join(state, state.document_id == DocumentSlice.document_id)
+            .filter(
+                EmbeddingModel.title == model_title,
+                state.title == Step.DOCUMENT_IN_QDRANT.value,
+            )
+        )
+        rows = (
+            _join_last_process_state(db_session, query, state)
+            .order_by(func.random())
+            .limit(sample_size)
+            .all()
+        )
+        if not rows:
+            continue
+        vectors = numpy.stack(
+            [numpy.frombuffer(bytes(r[0]), dtype=numpy.float32) for r in rows]
+        )
+        vectors /= numpy.linalg.norm(vectors, axis=1, keepdims=True)
+        arrays[f"{model_title}{KEY_SEPARATOR}vectors"] = vectors
+        arrays[f"{model_title}{KEY_SEPARATOR}document_ids"] = numpy.array(
+            [str(r[1]) for r in rows]
+        )
+        arrays[f"{model_title}{KEY_SEPARATOR}corpora"] = numpy.array(
+            [r[2] for r in rows]
+        )
+        arrays[f"{model_title}{KEY_SEPARATOR}langs"] = numpy.array([r[3] for r in rows])
+        logger.info("'%s' vectors sampled for %s", len(rows), model_title)
+
+    db_session.close()
+    numpy.savez_compressed(fixture_path, **arrays)
+    logger.info("Fixture written in %s", fixture_path)
+
+
+if __name__ == "__main__":
+    load_dotenv_local()
+    main()
@@ -1,96 +1,282 @@
-import json
+import csv
+import logging
 import os
 import random
-from functools import cached_property
-from typing import List, Tuple
+from collections import defaultdict
+from functools import cache
+from pathlib import Path
+from typing import Dict, List, Tuple
 
 import numpy
-from locust import HttpUser, tag, task  # type: ignore
+from locust import HttpUser, events, tag, task  # type: ignore
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import CollectionDescription, CollectionsResponse
 
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
+logger = logging.getLogger(__name__)
+
+# Same separator as in export_vectors_fixture.py
+KEY_SEPARATOR = "__"
+SDG_NUMBERS = list(range(1, 18))
+
+# Response times per (collection, scenario), filled by the request event listener
+response_times: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+failures: Dict[Tuple[str, str], int] = defaultdict(int)
+
 
 class CollectionInformation:
-    def __init__(self, name: str, vector_size: int):
+    def __init__(
+        self,
+        name: str,
+        vectors: numpy.ndarray,
+        document_ids: numpy.ndarray,
+        corpora: numpy.ndarray,
+        langs: numpy.ndarray,
+    ):
         self.name: str = name
-        self.vector_size: int = vector_size
+        self.vectors = vectors
+        self.document_ids = document_ids
+        self.corpora = corpora
+        self.langs = langs
 
-    @cached_property
-    def mock_vector(self):
-        return numpy.random.rand(self.vector_size).tolist()
+    def sample(self) -> int:
+        """
+        :return: Index of a random sampled slice
+        """
+        return random.randrange(self.vectors.shape[0])
 
+    def vector(self, index: int) -> List[float]:
+        return self.vectors[index].tolist()
 
-class User(HttpUser):
-    def on_start(self):
-        load_dotenv_local()
-
-        qdrant_timeout: int = int(os.getenv("QDRANT_TIMEOUT", "60"))
-        qdrant_grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
-        qdrant_http_port: int = int(os.getenv("QDRANT_HTTP_PORT", "6333"))
-        qdrant_url: str = os.getenv("QDRANT_URL", "localhost")
-        qdrant_prefers_grpc: bool = (
-            os.getenv("QDRANT_PREFERS_GRPC", "False").lower() == "true"
+
+@cache
+def load_vectors_fixture() -> Dict[str, Dict[str, numpy.ndarray]]:
+    """
+    Load the real embeddings exported by export_vectors_fixture.py, grouped by embedding model title
+    :return: Dictionary with the model title as key and its arrays as value
+    """
+    fixture_path = Path(
+        os.getenv(
+            "LOCUST_VECTORS_FIXTURE", Path(__file__).parent / "vectors_fixture.npz"
         )
+    )
+    if not fixture_path.exists():
+        raise FileNotFoundError(
+            f"{fixture_path} doesn't exist, run locustfiles/export_vectors_fixture.py first"
+        )
+    per_model: Dict[str, Dict[str, numpy.ndarray]] = defaultdict(dict)
+    with numpy.load(fixture_path) as fixture:
+        for key in fixture.files:
+            model_title, array_name = key.rsplit(KEY_SEPARATOR, 1)
+            per_model[model_title][array_name] = fixture[key]
+
+    for arrays in per_model.values():
+        norms = numpy.linalg.norm(arrays["vectors"], axis=1, keepdims=True)
+        arrays["vectors"] = arrays["vectors"] / norms
+    return per_model
 
-        qdrant_client = QdrantClient(
-            url=qdrant_url,
-            port=qdrant_http_port,
-            grpc_port=qdrant_grpc_port,
-            prefer_grpc=qdrant_prefers_grpc,
-            timeout=qdrant_timeout,
-            https=True,
+
+@cache
+def load_collections_information() -> List[CollectionInformation]:
+    """
+    Match each collection (and alias) to the fixture vectors of its embedding model and lang
+    :return: List of collections information
+    """
+    load_dotenv_local()
+
+    qdrant_timeout: int = int(os.getenv("QDRANT_TIMEOUT", "60"))
+    qdrant_grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    qdrant_http_port: int = int(os.getenv("QDRANT_HTTP_PORT", "6333"))
+    qdrant_url: str = os.getenv("QDRANT_URL", "localhost")
+    qdrant_prefers_grpc: bool = (
+        os.getenv("QDRANT_PREFERS_GRPC", "False").lower() == "true"
+    )
+
+    qdrant_client = QdrantClient(
+        url=qdrant_url,
+        port=qdrant_http_port,
+        grpc_port=qdrant_grpc_port,
+        prefer_grpc=qdrant_prefers_grpc,
+        timeout=qdrant_timeout,
+        https=True,
+    )
+    names = [c.name for c in qdrant_client.get_collections().collections]
+    names.extend(a.alias_name for a in qdrant_client.get_aliases().aliases)
+
+    fixture = load_vectors_fixture()
+    collections_information: List[CollectionInformation] = []
+    for name in names:
+        models_titles = [m for m in fixture if f"_{m}" in name]
+        if not models_titles:
+            logger.warning("No fixture vectors for collection %s, skipped", name)
+            continue
+        arrays = fixture[max(models_titles, key=len)]
+        # collection_welearn_<lang>_<model>[_<version>], a multilingual collection contains every lang
+        lang = name.removeprefix("collection_welearn_").split("_", 1)[0]
+        mask = (
+            numpy.ones(arrays["langs"].shape, dtype=bool)
+            if lang == "mul"
+            else arrays["langs"] == lang
         )
-        collections: CollectionsResponse = qdrant_client.get_collections()
-        collections_information: List[CollectionInformation] = []
-        for collection in collections.collections:
-            infos = qdrant_client.get_collection(collection_name=collection.name)
-            collections_information.append(
-                CollectionInformation(
-                    name=collection.name, vector_size=infos.config.params.vectors.size
-                )
+        if not mask.any():
+            logger.warning(
+                "No fixture vectors in %s for collection %s, skipped", lang, name
+            )
+            continue
+        collections_information.append(
+            CollectionInformation(
+                name=name,
+                vectors=arrays["vectors"][mask],
+                document_ids=arrays["document_ids"][mask],
+                corpora=arrays["corpora"][mask],
+                langs=arrays["langs"][mask],
             )
+        )
+    return collections_information
 
-        self.collections = collections_information
 
-    @tag("qdrant", "chat")
-    @task
-    def search_unique_collection(self):
-        requested_collection: CollectionInformation = random.choice(self.collections)
+@events.request.add_listener
+def record_response_time(response_time, exception, context, **kwargs):
+    if not context or "collection" not in context:
+        return
+    key = (context["collection"], context["scenario"])
+    response_times[key].append(response_time)
+    if exception:
+        failures[key] += 1
+
+
+@events.quitting.add_listener
+def export_latency_percentiles(environment, **kwargs):
+    """
+    Write p50/p95/p99 latencies per collection and scenario, plus an "all" scenario per collection
+    """
+    output_path = Path(os.getenv("LOCUST_LATENCY_CSV", "locust_latency.csv"))
+    per_collection: Dict[str, List[float]] = defaultdict(list)
+    rows = []
+    for (collection, scenario), times in sorted(response_times.items()):
+        per_collection[collection].extend(times)
+        rows.append((collection, scenario, times, failures[(collection, scenario)]))
+    for collection, times in per_collection.items():
+        collection_failures = sum(
+            v for (c, _), v in failures.items() if c == collection
+        )
+        rows.append((collection, "all", times, collection_failures))
+
+    with output_path.open("w") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["collection", "scenario", "requests", "failures", "p50", "p95", "p99"]
+        )
+        for collection, scenario, times, failures_qty in rows:
+            p50, p95, p99 = numpy.percentile(times, [50, 95, 99])
+            writer.writerow(
+                [
+                    collection,
+                    scenario,
+                    len(times),
+                    failures_qty,
+                    round(p50, 2),
+                    round(p95, 2),
+                    round(p99, 2),
+                ]
+            )
+    logger.info("Latency percentiles written in %s", output_path)
 
-        json_post = {"query": requested_collection.mock_vector, "limit": 100}
 
+class User(HttpUser):
+    def on_start(self):
+        self.collections = load_collections_information()
+
+    def _post(self, collection: CollectionInformation, scenario: str, url: str, json):
         with self.client.post(
-            url=f"/collections/{requested_collection.name}/points/query",
-            json=json_post,
+            url=f"/collections/{collection.name}/points/{url}",
+            json=json,
+            name=f"{scenario} {collection.name}",
+            context={"collection": collection.name, "scenario": scenario},
             catch_response=True,
         ) as response:
-            if response.json()["status"] == "ok" and len(response.json()["result"]) > 0:
+            result = response.json().get("result")
+            if isinstance(result, dict):
+                result = result.get("points", result.get("groups"))
+            if response.json()["status"] == "ok" and result:
                 response.success()
             else:
                 response.failure(
-                    exc=f"Staus : {response.json()["status"]} and result len: {len(response.json()["result"])}"
+                    exc=f"Staus : {response.json()["status"]} and result len: {len(result or [])}"
                 )
 
+    def _filtered_search(self, scenario: str, key: str, value):
+        collection = random.choice(self.collections)
+        index = collection.sample()
+        if value is None:
+            value = {
+                "document_corpus": collection.corpora,
+                "document_lang": collection.langs,
+            }[key][index].item()
+        json_post = {
+            "query": collection.vector(index),
+            "limit": 100,
+            "filter": {"must": [{"key": key, "match": {"value": value}}]},
+        }
+        self._post(collection, scenario, "query", json_post)
+
+    @tag("qdrant", "chat")
+    @task
+    def search_unique_collection(self):
+        collection = random.choice(self.collections)
+        json_post = {"query": collection.vector(collection.sample()), "limit": 100}
+        self._post(collection, "query", "query", json_post)
+
     @tag("qdrant", "search")
     @task
     def group_unique_collection(self):
-        requested_collection: CollectionDescription = random.choice(self.collections)
+        collection = random.choice(self.collections)
         json_post = {
-            "query": requested_collection.mock_vector,
+            "query": collection.vector(collection.sample()),
             "group_by": "document_id",
             "limit": 100,
             "group_size": 1,
         }
-        with self.client.post(
-            url=f"/collections/{requested_collection.name}/points/query/groups",
-            json=json_post,
-            catch_response=True,
-        ) as response:
-            if response.json()["status"] == "ok" and len(response.json()["result"]) > 0:
-                response.success()
-            else:
-                response.failure(
-                    exc=f"Staus : {response.json()["status"]} and result len: {len(response.json()["result"])}"
-                )
+        self._post(collection, "group", "query/groups", json_post)
+
+    @tag("qdrant", "filter")
+    @task
+    def search_filtered_by_corpus(self):
+        self._filtered_search("filter_corpus", "document_corpus", None)
+
+    @tag("qdrant", "filter")
+    @task
+    def search_filtered_by_lang(self):
+        self._filtered_search("filter_lang", "document_lang", None)
+
+    @tag("qdrant", "filter")
+    @task
+    def search_filtered_by_sdg(self):
+        self._filtered_search("filter_sdg", "document_sdg", random.choice(SDG_NUMBERS))
+
+    @tag("qdrant", "batch")
+    @task
+    def batch_search(self):
+        collection = random.choice(self.collections)
+        batch_size = int(os.getenv("LOCUST_BATCH_SIZE", "10"))
+        json_post = {
+            "searches": [
+                {"query": collection.vector(collection.sample()), "limit": 10}
+                for _ in range(batch_size)
+            ]
+        }
+        self._post(collection, "batch", "query/batch", json_post)
+
+    @tag("qdrant", "scroll")
+    @task
+    def scroll_by_document(self):
+        collection = random.choice(self.collections)
+        document_id = collection.document_ids[collection.sample()].item()
+        json_post = {
+            "filter": {
+                "must": [{"key": "document_id", "match": {"value": document_id}}]
+            },
+            "limit": 100,
+            "with_payload": True,
+        }
+        self._post(collection, "scroll", "scroll", json_post)
@@ -117,7 +117,7 @@ class TestDocumentClassifier(unittest.TestCase):
         "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.create_db_session"
     )
     @patch(
-        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_csv"
+        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_artifact"
     )
     def test_main(
         self,
@@ -178,7 +178,7 @@ class TestDocumentClassifier(unittest.TestCase):
         "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.create_db_session"
     )
     @patch(
-        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_csv"
+        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_artifact"
     )
     def test_main_bi_classifier_false(
         self,
@@ -220,7 +220,7 @@ class TestDocumentClassifier(unittest.TestCase):
         "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.create_db_session"
     )
     @patch(
-        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_csv"
+        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_artifact"
     )
     def test_main_no_specific_sdg(
         self,
@@ -259,7 +259,7 @@ class TestDocumentClassifier(unittest.TestCase):
         "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.create_db_session"
     )
     @patch(
-        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_csv"
+        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_artifact"
     )
     def test_main_externally_classified(
         self,
@@ -350,7 +350,7 @@ class TestDocumentClassifier(unittest.TestCase):
         "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.create_db_session"
     )
     @patch(
-        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_csv"
+        "welearn_datastack.nodes_workflow.DocumentClassifier.document_classifier.retrieve_ids_from_artifact"
     )
     def test_main_externally_classified_but_without_sdg(
         self,
@@ -22,6 +22,7 @@ from welearn_database.data.models import (
 )
 
 from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.data.db_models import DocumentSize, ProcessingDuration
 from welearn_datastack.nodes_workflow.DocumentVectorizer import document_vectorizer
 from welearn_datastack.utils_.virtual_environement_utils import (
     get_sub_environ_according_prefix,
@@ -187,3 +188,18 @@ class TestDocumentVecto(unittest.TestCase):
         most_recent_state = max(states, key=lambda x: x.created_at.timestamp())
 
         self.assertEqual(Step.DOCUMENT_VECTORIZED.value, most_recent_state.title)
+
+        document_size = self.test_session.get(DocumentSize, doc_id)
+        self.assertEqual(
+            document_size.slice_bytes,
+            len("This is a sentence.")
+            + len("This is another sentence.")
+            + emb0.nbytes
+            + emb1.nbytes,
+        )
+
+        processing_duration = self.test_session.query(ProcessingDuration).one()
+        self.assertEqual(
+            processing_duration.corpus_id, self.test_session.query(Corpus).one().id
+        )
+        self.assertEqual(processing_duration.documents_qty, 1)
@@ -0,0 +1,240 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import models
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import (
+    Base,
+    Category,
+    Corpus,
+    DocumentSlice,
+    EmbeddingModel,
+    ProcessState,
+    Sdg,
+    WeLearnDocument,
+)
+
+from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.data.qdrant_collection_spec import QdrantCollectionSpec
+from welearn_datastack.nodes_workflow.QdrantSyncronizer import (
+    qdrant_collection_rebuilder,
+)
+from welearn_datastack.nodes_workflow.QdrantSyncronizer.qdrant_collection_rebuilder import (
+    rebuild_collection,
+)
+
+ALIAS_NAME = "collection_welearn_en_english-embmodel"
+
+
+class TestQdrantCollectionRebuilder(unittest.TestCase):
+    def setUp(self):
+        self.client = QdrantClient(":memory:")
+
+        self.engine = create_engine("sqlite://")
+        handle_schema_with_sqlite(self.engine)
+        s_maker = sessionmaker(self.engine)
+        self.test_session = s_maker()
+        Base.metadata.create_all(self.test_session.get_bind())
+
+        category_id = uuid.uuid4()
+        self.test_session.add(Category(id=category_id, title="category_test0"))
+        emb_model_id = uuid.uuid4()
+        self.test_session.add(
+            EmbeddingModel(id=emb_model_id, title="english-embmodel", lang="en")
+        )
+        corpus = Corpus(
+            id=uuid.uuid4(),
+            source_name="corpus",
+            is_fix=True,
+            is_active=True,
+            category_id=category_id,
+        )
+        self.test_session.add(corpus)
+
+        # Two documents in Qdrant, one only vectorized
+        for i, last_step in enumerate(
+            [Step.DOCUMENT_IN_QDRANT, Step.DOCUMENT_IN_QDRANT, Step.DOCUMENT_VECTORIZED]
+        ):
+            doc_id = uuid.uuid4()
+            self.test_session.add(
+                WeLearnDocument(
+                    id=doc_id,
+                    title=f"test{i}",
+                    url=f"https://www.example.org/wiki/{i}",
+                    lang="en",
+                    full_content="This is a sentence. This is another sentence.",
+                    corpus=corpus,
+                    description="test",
+                    details={},
+                )
+            )
+            self.test_session.add(
+                ProcessState(
+                    id=uuid.uuid4(),
+                    document_id=doc_id,
+                    title=last_step.value,
+                    created_at=datetime.now() - timedelta(hours=1),
+                    operation_order=i,
+                )
+            )
+            for order in range(2):
+                slice_id = uuid.uuid4()
+                self.test_session.add(
+                    DocumentSlice(
+                        id=slice_id,
+                        body=f"Sentence {order}.",
+                        document_id=doc_id,
+                        order_sequence=order,
+                        embedding=numpy.random.uniform(low=-1, high=1, size=(5,))
+                        .astype(numpy.float32)
+                        .tobytes(),
+                        embedding_model_name="english-embmodel",
+                        embedding_model_id=emb_model_id,
+                    )
+                )
+                self.test_session.add(
+                    Sdg(
+                        id=uuid.uuid4(),
+                        slice_id=slice_id,
+                        sdg_number=order + 1,
+                        bi_classifier_model_id=uuid.uuid4(),
+                        n_classifier_model_id=uuid.uuid4(),
+                    )
+                )
+        self.test_session.commit()
+
+    def tearDown(self):
+        self.test_session.close()
+
+    def test_rebuild_collection_creates_alias(self):
+        new_collection = rebuild_collection(
+            db_session=self.test_session,
+            qdrant_client=self.client,
+            embedding_model_title="english-embmodel",
+            lang="en",
+            version="v1",
+            indexing_timeout=10,
+        )
+
+        self.assertEqual(new_collection, f"{ALIAS_NAME}_v1")
+        aliases = {
+            a.alias_name: a.collection_name for a in self.client.get_aliases().aliases
+        }
+        self.assertEqual(aliases[ALIAS_NAME], new_collection)
+        self.assertEqual(self.client.count(ALIAS_NAME, exact=True).count, 4)
+        self.assertEqual(
+            self.client.get_collection(new_collection).config.params.vectors.size, 5
+        )
+
+    def test_rebuild_collection_catches_up_documents_synced_during_indexing(self):
+        vectorized_doc_id = (
+            self.test_session.query(ProcessState.document_id)
+            .filter(ProcessState.title == Step.DOCUMENT_VECTORIZED.value)
+            .scalar()
+        )
+        enable_collection_indexing = (
+            qdrant_collection_rebuilder.enable_collection_indexing
+        )
+
+        def sync_document_during_indexing(*args, **kwargs):
+            # The incremental synchronization runs while the indexing is awaited
+            self.test_session.add(
+                ProcessState(
+                    id=uuid.uuid4(),
+                    document_id=vectorized_doc_id,
+                    title=Step.DOCUMENT_IN_QDRANT.value,
+                    created_at=datetime.now(),
+                    operation_order=10,
+                )
+            )
+            self.test_session.commit()
+            return enable_collection_indexing(*args, **kwargs)
+
+        with patch.object(
+            qdrant_collection_rebuilder,
+            "enable_collection_indexing",
+            side_effect=sync_document_during_indexing,
+        ):
+            rebuild_collection(
+                db_session=self.test_session,
+                qdrant_client=self.client,
+                embedding_model_title="english-embmodel",
+                lang="en",
+                version="v1",
+                indexing_timeout=10,
+            )
+
+        self.assertEqual(self.client.count(ALIAS_NAME, exact=True).count, 6)
+
+    def test_rebuild_collection_swaps_alias_and_drops_old_collection(self):
+        rebuild_collection(
+            db_session=self.test_session,
+            qdrant_client=self.client,
+            embedding_model_title="english-embmodel",
+            lang="en",
+            version="v1",
+            indexing_timeout=10,
+        )
+        rebuild_collection(
+            db_session=self.test_session,
+            qdrant_client=self.client,
+            embedding_model_title="english-embmodel",
+            lang="en",
+            version="v2",
+            indexing_timeout=10,
+            drop_old_collection=True,
+        )
+
+        aliases = {
+            a.alias_name: a.collection_name for a in self.client.get_aliases().aliases
+        }
+        self.assertEqual(aliases[ALIAS_NAME], f"{ALIAS_NAME}_v2")
+        self.assertFalse(self.client.collection_exists(f"{ALIAS_NAME}_v1"))
+        self.assertEqual(self.client.count(ALIAS_NAME, exact=True).count, 4)
+
+    def test_rebuild_collection_refuses_to_replace_physical_collection(self):
+        self.client.create_collection(
+            collection_name=ALIAS_NAME,
+            vectors_config=models.VectorParams(size=5, distance=models.Distance.COSINE),
+        )
+        with self.assertRaises(ValueError):
+            rebuild_collection(
+                db_session=self.test_session,
+                qdrant_client=self.client,
+                embedding_model_title="english-embmodel",
+                lang="en",
+                version="v1",
+            )
+
+        rebuild_collection(
+            db_session=self.test_session,
+            qdrant_client=self.client,
+            embedding_model_title="english-embmodel",
+            lang="en",
+            version="v1",
+            indexing_timeout=10,
+            replace_collection=True,
+        )
+        self.assertEqual(self.client.count(ALIAS_NAME, exact=True).count, 4)
+
+    def test_rebuild_collection_with_spec(self):
+        spec = QdrantCollectionSpec(name=ALIAS_NAME, vector_size=5, on_disk=True)
+        new_collection = rebuild_collection(
+            db_session=self.test_session,
+            qdrant_client=self.client,
+            embedding_model_title="english-embmodel",
+            lang="en",
+            version="v1",
+            indexing_timeout=10,
+            spec=spec,
+        )
+
+        vectors = self.client.get_collection(new_collection).config.params.vectors
+        self.assertTrue(vectors.on_disk)
+        self.assertEqual(self.client.count(ALIAS_NAME, exact=True).count, 4)
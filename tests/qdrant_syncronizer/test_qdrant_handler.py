@@ -102,6 +102,21 @@ class TestQdrantHandler(unittest.TestCase):
         }
         self.assertEqual(dict(collections_names), expected)
 
+    def test_should_use_given_collections_names_without_qdrant_client(self):
+        doc_id = uuid.uuid4()
+        fake_slice = FakeSlice(doc_id, embedding_model_name="english-embmodel")
+        collections_names = classify_documents_per_collection(
+            None,
+            [fake_slice],
+            collections_names=["collection_welearn_en_english-embmodel"],
+        )
+
+        expected = {
+            None: set(),
+            "collection_welearn_en_english-embmodel": {fake_slice.document_id},
+        }
+        self.assertEqual(dict(collections_names), expected)
+
     def test_should_handle_multiple_slices_for_same_collection(self):
         doc_id0 = uuid.uuid4()
         doc_id1 = uuid.uuid4()
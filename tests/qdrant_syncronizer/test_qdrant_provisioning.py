@@ -0,0 +1,129 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import models
+
+from welearn_datastack.data.qdrant_collection_spec import (
+    DEFAULT_PAYLOAD_INDEXES,
+    QdrantCollectionSpec,
+    load_collections_specs,
+)
+from welearn_datastack.modules.qdrant_provisioning import (
+    build_index_coverage_report,
+    ensure_payload_indexes,
+    provision_collection,
+)
+
+
+def _payload_schema(indexes: dict) -> dict:
+    return {
+        name: models.PayloadIndexInfo(data_type=schema, points=0)
+        for name, schema in indexes.items()
+    }
+
+
+class TestQdrantProvisioning(unittest.TestCase):
+    def setUp(self):
+        self.spec = QdrantCollectionSpec(
+            name="collection_welearn_en_english-embmodel", vector_size=5
+        )
+
+    def test_provision_collection_creates_collection(self):
+        client = QdrantClient(":memory:")
+        actions = provision_collection(client, self.spec)
+
+        self.assertIn("create collection", actions)
+        vectors = client.get_collection(self.spec.name).config.params.vectors
+        self.assertEqual(vectors.size, 5)
+        self.assertTrue(vectors.on_disk)
+
+    def test_provision_collection_refuses_other_vector_size(self):
+        client = QdrantClient(":memory:")
+        client.create_collection(
+            collection_name=self.spec.name,
+            vectors_config=models.VectorParams(size=3, distance=models.Distance.COSINE),
+        )
+        with self.assertRaises(ValueError):
+            provision_collection(client, self.spec)
+
+    def test_ensure_payload_indexes_creates_only_missing_ones(self):
+        client = MagicMock()
+        client.get_collection.return_value.payload_schema = _payload_schema(
+            {
+                "document_id": models.PayloadSchemaType.KEYWORD,
+                "document_sdg": models.PayloadSchemaType.KEYWORD,
+            }
+        )
+
+        actions = ensure_payload_indexes(
+            client, self.spec.name, DEFAULT_PAYLOAD_INDEXES
+        )
+
+        created = [
+            c.kwargs["field_name"] for c in client.create_payload_index.call_args_list
+        ]
+        self.assertEqual(
+            created, ["document_corpus", "document_lang", "document_sdg", "slice_sdg"]
+        )
+        client.delete_payload_index.assert_called_once_with(
+            collection_name=self.spec.name, field_name="document_sdg", wait=True
+        )
+        self.assertEqual(len(actions), 5)
+
+    def test_ensure_payload_indexes_is_idempotent(self):
+        client = MagicMock()
+        client.get_collection.return_value.payload_schema = _payload_schema(
+            DEFAULT_PAYLOAD_INDEXES
+        )
+
+        actions = ensure_payload_indexes(
+            client, self.spec.name, DEFAULT_PAYLOAD_INDEXES
+        )
+
+        self.assertEqual(actions, [])
+        client.create_payload_index.assert_not_called()
+
+    def test_build_index_coverage_report(self):
+        client = QdrantClient(":memory:")
+        provision_collection(client, self.spec)
+        missing_spec = QdrantCollectionSpec(name="missing", vector_size=5)
+
+        report = build_index_coverage_report(client, [self.spec, missing_spec])
+
+        self.assertTrue(report[0]["exists"])
+        # Local Qdrant doesn't keep payload indexes
+        self.assertEqual(
+            report[0]["missing_fields"], list(DEFAULT_PAYLOAD_INDEXES.keys())
+        )
+        self.assertEqual(report[0]["hnsw"]["m"], 16)
+        self.assertFalse(report[1]["exists"])
+        json.dumps(report)
+
+    def test_load_collections_specs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "specs.json"
+            path.write_text(
+                json.dumps(
+                    [
+                        {
+                            "name": self.spec.name,
+                            "vector_size": 384,
+                            "distance": "Dot",
+                            "scalar_quantization": True,
+                            "payload_indexes": {"document_id": "keyword"},
+                        }
+                    ]
+                )
+            )
+            specs = load_collections_specs(path)
+
+        self.assertEqual(specs[0].distance, models.Distance.DOT)
+        self.assertEqual(
+            specs[0].payload_indexes,
+            {"document_id": models.PayloadSchemaType.KEYWORD},
+        )
+        self.assertIsInstance(specs[0].quantization_config(), models.ScalarQuantization)
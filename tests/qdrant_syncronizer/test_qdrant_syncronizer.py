@@ -1,17 +1,19 @@
+import asyncio
 import csv
 import os
 import unittest
 import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import numpy
 import sqlalchemy
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http.models import models
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from welearn_database.data.enumeration import Step
 from welearn_database.data.models import (
     Base,
@@ -55,7 +57,12 @@ class TestQdrantSyncronizer(unittest.TestCase):
         self.path_test_input = Path(__file__).parent.parent / "resources" / "input"
         self.path_test_input.mkdir(parents=True, exist_ok=True)
 
-        self.engine = create_engine("sqlite://")
+        # Static pool : async mode use the session from a dedicated thread
+        self.engine = create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
         handle_schema_with_sqlite(self.engine)
 
         s_maker = sessionmaker(self.engine)
@@ -228,3 +235,117 @@ class TestQdrantSyncronizer(unittest.TestCase):
                 self.assertEqual(s.payload["slice_sdg"], 1)
             elif s.id == self.slice_id1:
                 self.assertEqual(s.payload["slice_sdg"], 2)
+
+    @patch(
+        "welearn_datastack.nodes_workflow.QdrantSyncronizer.qdrant_syncronizer.AsyncQdrantClient"
+    )
+    @patch(
+        "welearn_datastack.nodes_workflow.QdrantSyncronizer.qdrant_syncronizer.create_db_session"
+    )
+    def test_qdrant_syncronizer_async_mode(
+        self, mock_create_db_session, mock_async_qdrant_client
+    ):
+        async_client = AsyncQdrantClient(":memory:")
+
+        async def create_collections():
+            for collection_name in [
+                "collection_welearn_en_english-embmodel",
+                "collection_welearn_fr_french-embmodel",
+            ]:
+                await async_client.create_collection(
+                    collection_name=collection_name,
+                    vectors_config=models.VectorParams(
+                        size=5, distance=models.Distance.COSINE
+                    ),
+                )
+
+        asyncio.run(create_collections())
+
+        os.environ["QDRANT_CHUNK_SIZE"] = "1"
+        os.environ["QDRANT_SYNC_MODE"] = "async"
+        mock_create_db_session.return_value = self.test_session
+        mock_async_qdrant_client.return_value = async_client
+
+        # The in-memory client can't be used anymore once closed
+        with patch.object(async_client, "close", new_callable=AsyncMock) as mock_close:
+            try:
+                qdrant_syncronizer.main()
+            finally:
+                del os.environ["QDRANT_SYNC_MODE"]
+        mock_close.assert_awaited_once()
+
+        states = (
+            self.test_session.query(ProcessState)
+            .filter(ProcessState.document_id == self.docid)
+            .all()
+        )
+        most_recent_state = max(states, key=lambda x: x.created_at.timestamp())
+        self.assertEqual(Step.DOCUMENT_IN_QDRANT.value, most_recent_state.title)
+
+        ret_values_from_qdrant = asyncio.run(
+            async_client.scroll(
+                collection_name="collection_welearn_en_english-embmodel",
+                limit=100,
+            )
+        )
+
+        self.assertEqual(2, len(ret_values_from_qdrant[0]))
+        for s in ret_values_from_qdrant[0]:
+            self.assertIn(uuid.UUID(s.id), [self.slice_id0, self.slice_id1])
+            self.assertEqual(s.payload["document_id"], str(self.docid))
+            self.assertListEqual(s.payload["document_sdg"], [1, 2])
+
+    @patch(
+        "welearn_datastack.nodes_workflow.QdrantSyncronizer.qdrant_syncronizer._add_process_states"
+    )
+    @patch(
+        "welearn_datastack.nodes_workflow.QdrantSyncronizer.qdrant_syncronizer._upload_collection"
+    )
+    @patch(
+        "welearn_datastack.nodes_workflow.QdrantSyncronizer.qdrant_syncronizer.prepare_chunk"
+    )
+    @patch(
+        "welearn_datastack.nodes_workflow.QdrantSyncronizer.qdrant_syncronizer.async_get_collections_names"
+    )
+    def test_async_syncronize_collection_failure(
+        self,
+        mock_get_collections_names,
+        mock_prepare_chunk,
+        mock_upload_collection,
+        mock_add_process_states,
+    ):
+        no_collection_id, en_id, fr_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        mock_get_collections_names.return_value = ["en", "fr"]
+        mock_prepare_chunk.return_value = qdrant_syncronizer.PreparedChunk(
+            index=0,
+            no_collection_docs_ids={no_collection_id},
+            docs_ids_per_collection={"en": {en_id}, "fr": {fr_id}},
+        )
+
+        async def upload_collection(collection_name, **kwargs):
+            if collection_name == "fr":
+                raise RuntimeError("Upsert failed")
+            return {Step.DOCUMENT_IN_QDRANT: [en_id], Step.KEPT_FOR_TRACE: []}
+
+        mock_upload_collection.side_effect = upload_collection
+        qdrant_client = AsyncMock()
+
+        asyncio.run(
+            qdrant_syncronizer.async_syncronize(
+                db_session=self.test_session,
+                qdrant_client=qdrant_client,
+                docids=[no_collection_id, en_id, fr_id],
+                qdrant_chunk_size=10,
+                qdrant_wait=True,
+                max_in_flight=2,
+            )
+        )
+
+        # The states of the other collection are written, the failed one keeps its state
+        written = {
+            call.args[2]: call.args[1]
+            for call in mock_add_process_states.call_args_list
+        }
+        self.assertEqual(written[Step.DOCUMENT_IN_QDRANT], [en_id])
+        self.assertEqual(written[Step.KEPT_FOR_TRACE], [no_collection_id])
+        qdrant_client.close.assert_awaited_once()
@@ -0,0 +1,123 @@
+import unittest
+import uuid
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from welearn_database.data.models import (
+    Base,
+    Category,
+    Corpus,
+    DocumentSlice,
+    EmbeddingModel,
+    WeLearnDocument,
+)
+
+from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.data.db_models import DocumentSize
+from welearn_datastack.modules.query_utils import resolve_batched_query
+
+QUERIES_FOLDER = (
+    Path(__file__).parent.parent
+    / "welearn_datastack"
+    / "nodes_workflow"
+    / "BackFiller"
+    / "batch_generator_queries"
+)
+REVISION_ID = "09872b4e3138"
+
+
+class TestDocumentWithoutSizeQuery(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        s_maker = sessionmaker(self.engine)
+        handle_schema_with_sqlite(self.engine)
+        self.test_session = s_maker()
+        Base.metadata.create_all(self.test_session.get_bind())
+        self.test_session.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32))")
+        )
+        self.test_session.execute(
+            text("INSERT INTO alembic_version VALUES (:revision_id)"),
+            {"revision_id": REVISION_ID},
+        )
+
+        category_id = uuid.uuid4()
+        self.test_session.add(Category(id=category_id, title="category_test0"))
+        self.corpus = Corpus(
+            id=uuid.uuid4(),
+            source_name="corpus",
+            is_fix=True,
+            is_active=True,
+            category_id=category_id,
+        )
+        self.test_session.add(self.corpus)
+        self.embedding_model_id = uuid.uuid4()
+        self.test_session.add(
+            EmbeddingModel(
+                id=self.embedding_model_id, title="english-embmodel", lang="en"
+            )
+        )
+
+    def tearDown(self):
+        self.test_session.close()
+
+    def _add_document(
+        self,
+        content_bytes: int | None,
+        slice_bytes: int | None,
+        vectorized: bool,
+        with_size: bool = True,
+    ) -> uuid.UUID:
+        doc_id = uuid.uuid4()
+        self.test_session.add(
+            WeLearnDocument(
+                id=doc_id,
+                title="test",
+                url=f"https://example.org/{doc_id}",
+                lang="en",
+                full_content="This is a sentence. This is another sentence.",
+                corpus=self.corpus,
+                description="test",
+                details={},
+            )
+        )
+        if vectorized:
+            self.test_session.add(
+                DocumentSlice(
+                    id=uuid.uuid4(),
+                    body="content",
+                    document_id=doc_id,
+                    order_sequence=0,
+                    embedding=b"\x00",
+                    embedding_model_name="english-embmodel",
+                    embedding_model_id=self.embedding_model_id,
+                )
+            )
+        if with_size:
+            self.test_session.add(
+                DocumentSize(
+                    document_id=doc_id,
+                    content_bytes=content_bytes,
+                    slice_bytes=slice_bytes,
+                )
+            )
+        return doc_id
+
+    def test_document_without_size(self):
+        without_size = self._add_document(None, None, False, with_size=False)
+        vectorized_after_size = self._add_document(7, None, True)
+        # Collected before the sizes migration, vectorized after it
+        vectorized_only_size = self._add_document(None, 8, True)
+        self._add_document(7, None, False)
+        self._add_document(7, 8, True)
+        self.test_session.commit()
+
+        stmt = resolve_batched_query(
+            100, QUERIES_FOLDER, "document_without_size.sql", REVISION_ID
+        )
+        ids = {uuid.UUID(row[0]) for row in self.test_session.execute(stmt)}
+
+        self.assertSetEqual(
+            ids, {without_size, vectorized_after_size, vectorized_only_size}
+        )
@@ -0,0 +1,125 @@
+import unittest
+import uuid
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import (
+    Base,
+    Category,
+    Corpus,
+    ProcessState,
+    WeLearnDocument,
+)
+
+from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.modules.batch_backlog import retrieve_ids_with_backlog
+
+
+class TestBatchBacklog(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        s_maker = sessionmaker(self.engine)
+        handle_schema_with_sqlite(self.engine)
+
+        self.test_session = s_maker()
+        Base.metadata.create_all(self.test_session.get_bind())
+
+        category_id = uuid.uuid4()
+        corpus_id = uuid.uuid4()
+        self.test_session.add(Category(id=category_id, title="test"))
+        self.test_session.add(
+            Corpus(
+                id=corpus_id,
+                source_name="corpus",
+                is_fix=True,
+                is_active=True,
+                category_id=category_id,
+            )
+        )
+        self.docids = [uuid.uuid4() for _ in range(4)]
+        titles = [
+            Step.DOCUMENT_SCRAPED,
+            Step.DOCUMENT_VECTORIZED,
+            Step.DOCUMENT_SCRAPED,
+            Step.DOCUMENT_SCRAPED,
+        ]
+        for i, (doc_id, title) in enumerate(zip(self.docids, titles)):
+            self.test_session.add(
+                WeLearnDocument(
+                    id=doc_id,
+                    url=f"https://example{i}.org",
+                    corpus_id=corpus_id,
+                    title="test",
+                    lang="en",
+                    full_content="a" * 100,
+                    description="test",
+                    details={},
+                )
+            )
+            self.test_session.add(
+                ProcessState(
+                    id=uuid.uuid4(),
+                    document_id=doc_id,
+                    title=title.value,
+                    operation_order=i,
+                )
+            )
+        self.test_session.commit()
+
+        self.backlog_file = (
+            Path(__file__).parent / "resources" / "batch_backlog" / "overflow.csv"
+        )
+        self.backlog_file.parent.mkdir(parents=True, exist_ok=True)
+        # The second document was processed since the previous run
+        self.backlog_file.write_text(f"{self.docids[0]}\n{self.docids[1]}\n")
+
+    def tearDown(self):
+        self.test_session.close()
+        self.backlog_file.unlink(missing_ok=True)
+        self.backlog_file.parent.rmdir()
+
+    def test_retrieve_ids_with_backlog(self):
+        retrieve_ids = Mock(return_value=[str(self.docids[3]), str(self.docids[0])])
+
+        res = retrieve_ids_with_backlog(
+            self.test_session,
+            self.backlog_file,
+            [Step.DOCUMENT_SCRAPED],
+            10,
+            retrieve_ids,
+        )
+        self.assertListEqual(res, [str(self.docids[0]), str(self.docids[3])])
+        retrieve_ids.assert_called_once()
+
+    def test_retrieve_ids_with_backlog_full(self):
+        retrieve_ids = Mock()
+
+        res = retrieve_ids_with_backlog(
+            self.test_session,
+            self.backlog_file,
+            [Step.DOCUMENT_SCRAPED],
+            1,
+            retrieve_ids,
+        )
+        self.assertListEqual(res, [str(self.docids[0])])
+        retrieve_ids.assert_not_called()
+
+    def test_retrieve_ids_without_backlog(self):
+        res = retrieve_ids_with_backlog(
+            self.test_session, None, [Step.DOCUMENT_SCRAPED], 10, lambda: ["a"]
+        )
+        self.assertListEqual(res, ["a"])
+
+    @patch("welearn_datastack.modules.batch_backlog.IN_CLAUSE_CHUNK_SIZE", 2)
+    def test_retrieve_ids_with_backlog_checked_by_chunks(self):
+        self.backlog_file.write_text("".join(f"{docid}\n" for docid in self.docids))
+
+        res = retrieve_ids_with_backlog(
+            self.test_session, self.backlog_file, [Step.DOCUMENT_SCRAPED], 3, Mock()
+        )
+        self.assertListEqual(
+            res, [str(self.docids[0]), str(self.docids[2]), str(self.docids[3])]
+        )
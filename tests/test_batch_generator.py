@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+import unittest
+import uuid
+from pathlib import Path
+
+from welearn_datastack.data.batch_generator import BatchGenerator
+from welearn_datastack.data.enumerations import BatchManifestFormat
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
+from welearn_datastack.utils_.manifest_utils import ManifestInfo, read_manifest
+
+
+class TestBatchGenerator(unittest.TestCase):
+    def setUp(self):
+        self.artifact_root = Path(__file__).parent / "resources" / "batch_generator"
+        os.environ["ARTIFACT_ROOT"] = self.artifact_root.as_posix()
+
+    def tearDown(self):
+        shutil.rmtree(self.artifact_root, ignore_errors=True)
+
+    def test_create_ids_batch(self):
+        batch_generator = BatchGenerator(parallelism_threshold=2, parallelism_max=2)
+        batches = batch_generator.create_ids_batch(["a", "b", "c", "d", "e"])
+        self.assertListEqual(batches, [["a", "b"], ["c", "d"]])
+
+    def test_create_ids_batch_overflow(self):
+        batch_generator = BatchGenerator(parallelism_threshold=2, parallelism_max=2)
+        batch_generator.create_ids_batch(["a", "b", "c", "d", "e"])
+        self.assertListEqual(batch_generator.overflow, ["e"])
+
+        overflow_file = self.artifact_root / "backlog" / "overflow.csv"
+        self.assertEqual(batch_generator.write_overflow_to_file(overflow_file), 1)
+        self.assertEqual(overflow_file.read_text(), "e\n")
+
+        # The number of batches grows within the budget
+        batch_generator = BatchGenerator(
+            parallelism_threshold=2, parallelism_max=2, parallelism_budget=3
+        )
+        batches = batch_generator.create_ids_batch(["a", "b", "c", "d", "e"])
+        self.assertListEqual(batches, [["a", "b"], ["c", "d"], ["e"]])
+        self.assertListEqual(batch_generator.overflow, [])
+        self.assertEqual(batch_generator.capacity, 6)
+
+        # A drained backlog is removed
+        self.assertEqual(batch_generator.write_overflow_to_file(overflow_file), 0)
+        self.assertFalse(overflow_file.exists())
+
+    def test_create_weighted_ids_batch(self):
+        batch_generator = BatchGenerator(parallelism_threshold=3, parallelism_max=5)
+        weights = {
+            "pdf0": 300,
+            "pdf1": 280,
+            "abstract0": 10,
+            "abstract1": 10,
+            "abstract2": 10,
+            "abstract3": 10,
+            "page0": 150,
+            "page1": 140,
+            "page2": 20,
+        }
+        batches = batch_generator.create_weighted_ids_batch(weights)
+
+        # Same number of batches as with the count strategy
+        self.assertEqual(len(batches), 3)
+        self.assertSetEqual({d for b in batches for d in b}, set(weights))
+        self.assertListEqual(
+            batch_generator.batches_weights,
+            [sum(weights[d] for d in b) for b in batches],
+        )
+        # Heaviest documents are spread, the lightest fill the gaps
+        self.assertListEqual(batches[0], ["pdf0", "abstract1"])
+        self.assertListEqual(batch_generator.batches_weights, [310, 310, 310])
+
+    def test_create_weighted_ids_batch_parallelism_max(self):
+        batch_generator = BatchGenerator(parallelism_threshold=2, parallelism_max=2)
+        weights = {"a": 1, "b": 2, "c": 3, "d": 4, "e": 100}
+        batches = batch_generator.create_weighted_ids_batch(weights)
+
+        # Documents are kept in the order of priority, not of weight
+        self.assertSetEqual({d for b in batches for d in b}, {"a", "b", "c", "d"})
+        self.assertListEqual(batch_generator.batches_weights, [5, 5])
+
+        # The number of batches grows within the budget
+        batch_generator = BatchGenerator(
+            parallelism_threshold=2, parallelism_max=2, parallelism_budget=3
+        )
+        batches = batch_generator.create_weighted_ids_batch(weights)
+        self.assertEqual(len(batches), 3)
+        self.assertSetEqual({d for b in batches for d in b}, set(weights))
+
+    def test_write_weights_to_file(self):
+        batch_generator = BatchGenerator(
+            parallelism_threshold=1,
+            parallelism_max=2,
+            output_batch_file_name="batch_ids.csv",
+        )
+        batch_generator.create_weighted_ids_batch({"a": 10, "b": 20})
+        batch_generator.write_weights_to_file()
+
+        weights_file = self.artifact_root / "output" / "batch_urls" / "weights.json"
+        self.assertListEqual(
+            json.loads(weights_file.read_text()),
+            [
+                {
+                    "batch": 0,
+                    "file_name": "0_batch_ids.csv",
+                    "documents": 1,
+                    "weight": 20,
+                },
+                {
+                    "batch": 1,
+                    "file_name": "1_batch_ids.csv",
+                    "documents": 1,
+                    "weight": 10,
+                },
+            ],
+        )
+
+    def test_create_duration_ids_batch(self):
+        batch_generator = BatchGenerator(parallelism_threshold=100, parallelism_max=2)
+        durations = {"a": 60.0, "b": 50.0, "c": 10.0, "d": 40.0, "e": 30.0}
+
+        batches = batch_generator.create_duration_ids_batch(durations, 100)
+        self.assertEqual(len(batches), 2)
+        self.assertListEqual(batch_generator.batches_weights, [100.0, 90.0])
+
+        # Documents overflowing the target of all the batches are left for the next run
+        batches = batch_generator.create_duration_ids_batch(durations, 60)
+        self.assertSetEqual({d for b in batches for d in b}, {"a", "b", "c"})
+        self.assertListEqual(batch_generator.batches_weights, [60.0, 60.0])
+
+        # The number of batches grows within the budget
+        batch_generator = BatchGenerator(
+            parallelism_threshold=100, parallelism_max=2, parallelism_budget=4
+        )
+        batches = batch_generator.create_duration_ids_batch(durations, 60)
+        self.assertEqual(len(batches), 4)
+        self.assertSetEqual({d for b in batches for d in b}, set(durations))
+
+    def test_create_duration_ids_batch_without_duration(self):
+        batch_generator = BatchGenerator(parallelism_threshold=100, parallelism_max=2)
+
+        batches = batch_generator.create_duration_ids_batch({"a": 0.0, "b": 0.0}, 60)
+        self.assertEqual(len(batches), 1)
+        self.assertSetEqual(set(batches[0]), {"a", "b"})
+
+        self.assertListEqual(batch_generator.create_duration_ids_batch({}, 60), [])
+        self.assertListEqual(batch_generator.batches_weights, [])
+
+    def test_write_streamed_batches(self):
+        batch_generator = BatchGenerator(
+            parallelism_threshold=2,
+            parallelism_max=2,
+            output_batch_file_name="batch_ids.csv",
+        )
+        documents_ids = iter(["a", "b", "c", "d", "e"])
+
+        qty = batch_generator.write_streamed_batches(documents_ids)
+
+        self.assertEqual(qty, 2)
+        output = self.artifact_root / "output" / "batch_urls"
+        self.assertEqual((output / "quantity.txt").read_text(), "2")
+        self.assertEqual((output / "0_batch_ids.csv").read_text(), "a\nb\n")
+        self.assertEqual((output / "1_batch_ids.csv").read_text(), "c\nd\n")
+        # The ids beyond the last batch are not consumed
+        self.assertListEqual(list(documents_ids), ["e"])
+
+    def test_write_batches_to_manifest(self):
+        batch_generator = BatchGenerator(
+            parallelism_threshold=2,
+            parallelism_max=2,
+            output_batch_file_name="batch_ids.csv",
+            manifest_format=BatchManifestFormat.NPY,
+        )
+        documents_ids = [str(uuid.uuid4()) for _ in range(3)]
+        batch_generator.create_ids_batch(documents_ids)
+        batch_generator.write_batches_to_file(
+            {
+                documents_ids[0]: ManifestInfo(
+                    corpus="wikipedia", size=1024, step="document_scraped"
+                )
+            }
+        )
+
+        output = self.artifact_root / "output" / "batch_urls"
+        self.assertFalse((output / "0_batch_ids.csv").exists())
+        manifest = read_manifest(output / "0_batch_ids.npy")
+        self.assertListEqual(manifest["size"].tolist(), [1024, -1])
+        self.assertListEqual(manifest["corpus"].tolist(), [b"wikipedia", b""])
+        self.assertListEqual(manifest["step"].tolist(), [b"document_scraped", b""])
+
+        # Nodes still configured with the CSV name read the manifest
+        self.assertListEqual(
+            retrieve_ids_from_artifact("0_batch_ids.csv", output),
+            [uuid.UUID(d) for d in documents_ids[:2]],
+        )
+        self.assertListEqual(
+            retrieve_ids_from_artifact("1_batch_ids.npy", output),
+            [uuid.UUID(documents_ids[2])],
+        )
@@ -0,0 +1,135 @@
+import random
+import unittest
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import (
+    Base,
+    Category,
+    Corpus,
+    ProcessState,
+    WeLearnDocument,
+)
+
+from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.modules.batch_planner import (
+    PlannedStep,
+    build_planned_steps,
+    plan_batches,
+)
+
+
+class TestBatchPlanner(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        s_maker = sessionmaker(self.engine)
+        handle_schema_with_sqlite(self.engine)
+
+        self.test_session = s_maker()
+        Base.metadata.create_all(self.test_session.get_bind())
+
+        category_id = uuid.uuid4()
+        self.test_session.add(Category(id=category_id, title="test"))
+        self.corpora_ids = {}
+        for corpus_name in ("wikipedia", "openalex"):
+            self.corpora_ids[corpus_name] = uuid.uuid4()
+            self.test_session.add(
+                Corpus(
+                    id=self.corpora_ids[corpus_name],
+                    source_name=corpus_name,
+                    is_fix=True,
+                    is_active=True,
+                    category_id=category_id,
+                )
+            )
+        self.operation_order = 0
+
+    def tearDown(self):
+        self.test_session.close()
+
+    def _add_document(self, corpus_name: str, titles) -> str:
+        doc_id = uuid.uuid4()
+        self.test_session.add(
+            WeLearnDocument(
+                id=doc_id,
+                url=f"https://example{self.operation_order}.org",
+                corpus_id=self.corpora_ids[corpus_name],
+                title="test",
+                lang="en",
+                full_content="a" * 100,
+                description="test",
+                details={},
+            )
+        )
+        for title in titles:
+            self.test_session.add(
+                ProcessState(
+                    id=uuid.uuid4(),
+                    document_id=doc_id,
+                    title=title.value,
+                    operation_order=self.operation_order,
+                )
+            )
+            self.operation_order += 1
+        return str(doc_id)
+
+    def test_plan_batches(self):
+        scraped = [
+            self._add_document("openalex", [Step.URL_RETRIEVED, Step.DOCUMENT_SCRAPED])
+            for _ in range(3)
+        ]
+        vectorized = self._add_document(
+            "openalex", [Step.DOCUMENT_SCRAPED, Step.DOCUMENT_VECTORIZED]
+        )
+        in_qdrant = [
+            self._add_document(corpus_name, [Step.DOCUMENT_IN_QDRANT])
+            for corpus_name in ("wikipedia", "openalex", "wikipedia")
+        ]
+        self.test_session.commit()
+
+        steps = build_planned_steps(
+            ["vectorize", "classify", "collect", "sanitize", "update"],
+            {"vectorize": 2, "classify": 5, "collect": 5, "sanitize": 5, "update": 5},
+        )
+        res = plan_batches(self.test_session, steps, random.Random(0))  # nosec
+
+        # Most recent first, documents are only candidates of the step of their last state
+        self.assertListEqual(res["vectorize"], scraped[::-1][:2])
+        self.assertListEqual(res["classify"], [vectorized])
+        self.assertListEqual(res["collect"], [])
+        self.assertCountEqual(res["sanitize"], in_qdrant)
+        self.assertCountEqual(res["update"], [in_qdrant[0], in_qdrant[2]])
+
+    def test_plan_batches_corpus_name(self):
+        self._add_document("wikipedia", [Step.DOCUMENT_SCRAPED])
+        openalex = self._add_document("openalex", [Step.DOCUMENT_SCRAPED])
+        self.test_session.commit()
+
+        steps = build_planned_steps(["vectorize"], {"vectorize": 5}, "openalex")
+        self.assertDictEqual(
+            plan_batches(self.test_session, steps), {"vectorize": [openalex]}
+        )
+
+    def test_random_step_sample(self):
+        step = PlannedStep(
+            name="sanitize",
+            titles=[Step.DOCUMENT_IN_QDRANT],
+            qty_max=3,
+            is_random=True,
+        )
+        rng = random.Random(0)  # nosec
+        candidates = [str(i) for i in range(100)]
+        for document_id in candidates:
+            step.offer(document_id, Step.DOCUMENT_IN_QDRANT.value, "wikipedia", rng)
+
+        self.assertFalse(step.is_full)
+        self.assertEqual(step.candidates_qty, 100)
+        self.assertEqual(len(set(step.documents_ids)), 3)
+        self.assertTrue(set(step.documents_ids).issubset(candidates))
+        self.assertNotEqual(step.documents_ids, candidates[:3])
+
+    def test_unknown_step(self):
+        with self.assertRaises(ValueError):
+            build_planned_steps(["unknown"], {"unknown": 1})
@@ -0,0 +1,65 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.pool import NullPool
+
+from welearn_datastack.utils_.database_utils import (
+    _get_engine_options,
+    _get_session_maker,
+    create_db_session,
+    get_sqlalchemy_engine,
+)
+
+
+class TestDatabaseUtils(unittest.TestCase):
+    def setUp(self):
+        get_sqlalchemy_engine.cache_clear()
+        _get_session_maker.cache_clear()
+
+    def tearDown(self):
+        get_sqlalchemy_engine.cache_clear()
+        _get_session_maker.cache_clear()
+
+    @patch.dict(
+        os.environ,
+        {"PG_POOL_SIZE": "2", "PG_MAX_OVERFLOW": "0", "PG_POOL_PRE_PING": "false"},
+    )
+    def test_get_engine_options_psycopg2(self):
+        options = _get_engine_options("postgresql+psycopg2")
+        self.assertEqual(options["pool_size"], 2)
+        self.assertEqual(options["max_overflow"], 0)
+        self.assertFalse(options["pool_pre_ping"])
+        self.assertEqual(options["executemany_mode"], "values_plus_batch")
+        self.assertEqual(options["insertmanyvalues_page_size"], 1000)
+
+    @patch.dict(os.environ, {"PG_PGBOUNCER": "true"})
+    def test_get_engine_options_pgbouncer(self):
+        options = _get_engine_options("postgresql+psycopg")
+        self.assertIs(options["poolclass"], NullPool)
+        self.assertNotIn("pool_size", options)
+        self.assertDictEqual(options["connect_args"], {"prepare_threshold": None})
+
+    def test_get_engine_options_sqlite(self):
+        options = _get_engine_options("sqlite")
+        self.assertSetEqual(
+            set(options), {"query_cache_size", "insertmanyvalues_page_size"}
+        )
+
+    @patch.dict(
+        os.environ,
+        {
+            "PG_DRIVER": "sqlite",
+            "PG_USER": "",
+            "PG_PASSWORD": "",  # nosec
+            "PG_HOST": "",
+            "PG_DB": ":memory:",
+        },
+    )
+    def test_create_db_session_share_engine(self):
+        first = create_db_session()
+        second = create_db_session()
+        self.assertIsNot(first, second)
+        self.assertIs(first.get_bind(), second.get_bind())
+        first.close()
+        second.close()
@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from welearn_datastack.utils_.memory_utils import (
+    MEGABYTE,
+    MemoryTracker,
+    get_rss,
+    memory_tracker,
+    track_node_memory,
+)
+
+
+def node_main() -> None:
+    with memory_tracker.phase("extraction", MEGABYTE):
+        data = bytearray(2 * MEGABYTE)
+    del data
+
+
+def failing_node_main() -> None:
+    with memory_tracker.phase("db_load"):
+        raise RuntimeError("Node failed")
+
+
+class TestMemoryTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = MemoryTracker()
+
+    def tearDown(self):
+        self.tracker.stop()
+
+    def test_get_rss(self):
+        self.assertGreater(get_rss(), 0)
+
+    def test_phase_disabled(self):
+        with self.tracker.phase("inference", 10) as frame:
+            frame.input_bytes = 20
+        self.assertFalse(self.tracker.enabled)
+        self.assertEqual(self.tracker.phases, {})
+
+    def test_phase_lazy_input_bytes(self):
+        input_bytes = MagicMock(return_value=MEGABYTE)
+        with self.tracker.phase("inference", input_bytes):
+            pass
+        input_bytes.assert_not_called()
+
+        self.tracker.start(interval=0.001)
+        with self.tracker.phase("inference", input_bytes):
+            pass
+        input_bytes.assert_called_once()
+        self.assertEqual(self.tracker.phases["inference"].input_bytes, MEGABYTE)
+
+    def test_phases(self):
+        self.tracker.start(interval=0.001)
+        for _ in range(2):
+            with self.tracker.phase("slicing") as frame:
+                data = bytearray(4 * MEGABYTE)
+                # Input size known at the end of the phase
+                frame.input_bytes = 2 * MEGABYTE
+                del data
+
+        phase = self.tracker.phases["slicing"]
+        self.assertEqual(phase.calls, 2)
+        self.assertEqual(phase.input_bytes, 4 * MEGABYTE)
+        self.assertGreaterEqual(phase.traced_peak, 4 * MEGABYTE)
+        self.assertGreaterEqual(phase.traced_bytes_per_input_mb, 2 * MEGABYTE)
+        self.assertGreater(phase.rss_peak, 0)
+
+    def test_nested_phases(self):
+        self.tracker.start(interval=0.001)
+        with self.tracker.phase("node"):
+            with self.tracker.phase("inference"):
+                data = bytearray(8 * MEGABYTE)
+                del data
+            with self.tracker.phase("writes"):
+                pass
+
+        phases = self.tracker.phases
+        # The peak of the inner phase is reported to the outer one, not to the next one
+        self.assertGreaterEqual(phases["node"].traced_peak, 8 * MEGABYTE)
+        self.assertLess(phases["writes"].traced_peak, MEGABYTE)
+        self.assertIsNone(phases["node"].traced_bytes_per_input_mb)
+
+
+class TestTrackNodeMemory(unittest.TestCase):
+    def setUp(self):
+        self.artifact_root = Path(__file__).parent / "resources" / "memory"
+        self.output = self.artifact_root / "output" / "memory"
+        self.env = {
+            "ARTIFACT_ROOT": self.artifact_root.as_posix(),
+            "BATCH_ID": "b1",
+            "MEMORY_INTERVAL": "0.001",
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.artifact_root, ignore_errors=True)
+
+    def test_track_node_memory(self):
+        with patch.dict(os.environ, {**self.env, "MEMORY_TRACKING": "true"}):
+            track_node_memory(node_main)()
+
+        report = json.loads((self.output / "test_memory_utils_b1.json").read_text())
+        self.assertEqual(report["node"], "test_memory_utils")
+        self.assertEqual(set(report["phases"]), {"node", "extraction"})
+        extraction = report["phases"]["extraction"]
+        self.assertEqual(extraction["input_bytes"], MEGABYTE)
+        self.assertGreaterEqual(extraction["traced_bytes_per_input_mb"], 2 * MEGABYTE)
+        self.assertFalse(memory_tracker.enabled)
+
+    def test_track_node_memory_failure(self):
+        with patch.dict(os.environ, {**self.env, "MEMORY_TRACKING": "true"}):
+            with self.assertRaises(RuntimeError):
+                track_node_memory(failing_node_main)()
+
+        report = json.loads((self.output / "test_memory_utils_b1.json").read_text())
+        self.assertEqual(report["phases"]["db_load"]["calls"], 1)
+
+    def test_track_node_memory_disabled(self):
+        with patch.dict(os.environ, self.env):
+            os.environ.pop("MEMORY_TRACKING", None)
+            track_node_memory(node_main)()
+        self.assertFalse(self.artifact_root.exists())
@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from welearn_datastack.utils_.metrics_utils import (
+    Metric,
+    MetricsRegistry,
+    export_node_metrics,
+    metrics,
+)
+
+node_counter = metrics.counter("test_node_documents", "Documents", ["status"])
+
+
+def node_main() -> None:
+    node_counter.inc(2, status="ok")
+
+
+def failing_node_main() -> None:
+    node_counter.inc(status="ko")
+    raise RuntimeError("Node failed")
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry(namespace="test")
+
+    def test_counter(self):
+        counter = self.registry.counter("documents", "Documents", ["corpus"])
+        counter.inc(corpus="wikipedia")
+        counter.inc(3, corpus="wikipedia")
+        self.assertEqual(counter.get(corpus="wikipedia"), 4)
+        # Same metric is returned for the same name
+        self.assertIs(
+            self.registry.counter("documents", "Documents", ["corpus"]), counter
+        )
+        with self.assertRaises(ValueError):
+            counter.inc(-1, corpus="wikipedia")
+        with self.assertRaises(ValueError):
+            counter.inc(step="scraped")
+        with self.assertRaises(ValueError):
+            self.registry.histogram("documents", "Documents")
+
+    def test_histogram(self):
+        histogram = self.registry.histogram(
+            "duration_seconds", "Duration", buckets=(0.1, 1.0)
+        )
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(5)
+        with histogram.time():
+            pass
+        self.assertEqual(histogram.get_count(), 4)
+        self.assertAlmostEqual(histogram.get_sum(), 5.15, places=2)
+        self.assertEqual(
+            histogram.to_dict()["values"][0]["buckets"],
+            {"0.1": 3, "1.0": 3, "+Inf": 4},
+        )
+
+    def test_render_openmetrics(self):
+        counter = self.registry.counter("documents", "Documents", ["corpus"])
+        counter.inc(2, corpus='say "hi"')
+        histogram = self.registry.histogram(
+            "duration_seconds", "Duration", buckets=(1,)
+        )
+        histogram.observe(0.5)
+
+        rendered = self.registry.render_openmetrics({"batch_id": "b1"})
+        self.assertEqual(
+            rendered,
+            "# HELP test_documents Documents\n"
+            "# TYPE test_documents counter\n"
+            'test_documents_total{batch_id="b1",corpus="say \\"hi\\""} 2\n'
+            "# HELP test_duration_seconds Duration\n"
+            "# TYPE test_duration_seconds histogram\n"
+            'test_duration_seconds_bucket{batch_id="b1",le="1.0"} 1\n'
+            'test_duration_seconds_bucket{batch_id="b1",le="+Inf"} 1\n'
+            'test_duration_seconds_count{batch_id="b1"} 1\n'
+            'test_duration_seconds_sum{batch_id="b1"} 0.5\n'
+            "# EOF\n",
+        )
+
+    def test_incomplete_metric(self):
+        class Gauge(Metric):
+            metric_type = "gauge"
+
+            def to_dict(self):
+                return {}
+
+        with self.assertRaises(TypeError):
+            Gauge("temperature", "Temperature")
+
+    def test_reset(self):
+        counter = self.registry.counter("documents", "Documents")
+        counter.inc()
+        self.registry.reset()
+        self.assertEqual(counter.get(), 0)
+        self.assertIn("test_documents", self.registry.to_dict())
+
+    @patch("welearn_datastack.utils_.metrics_utils.get_new_https_session")
+    def test_push(self, mock_session):
+        http_session = mock_session.return_value.__enter__.return_value
+        self.registry.counter("documents", "Documents").inc()
+
+        self.registry.push("http://pushgateway:9091/", "node", {"batch_id": "b1"})
+
+        args, kwargs = http_session.put.call_args
+        self.assertEqual(
+            args[0], "http://pushgateway:9091/metrics/job/node/batch_id/b1"
+        )
+        self.assertIn(b"test_documents_total 1\n", kwargs["data"])
+        self.assertNotIn(b"# EOF", kwargs["data"])
+        http_session.put.return_value.raise_for_status.assert_called_once()
+
+
+class TestExportNodeMetrics(unittest.TestCase):
+    def setUp(self):
+        self.artifact_root = Path(__file__).parent / "resources" / "metrics"
+        self.output = self.artifact_root / "output" / "metrics"
+        self.env = {"ARTIFACT_ROOT": self.artifact_root.as_posix(), "BATCH_ID": "b1"}
+
+    def tearDown(self):
+        shutil.rmtree(self.artifact_root, ignore_errors=True)
+
+    def test_export_json(self):
+        with patch.dict(os.environ, {**self.env, "METRICS_FORMAT": "json"}):
+            export_node_metrics(node_main)()
+
+        content = json.loads((self.output / "test_metrics_utils_b1.json").read_text())
+        self.assertEqual(content["node"], "test_metrics_utils")
+        self.assertEqual(
+            content["metrics"]["welearn_datastack_test_node_documents"]["values"],
+            [{"labels": {"status": "ok"}, "value": 2}],
+        )
+
+    def test_export_openmetrics_failure(self):
+        with patch.dict(os.environ, {**self.env, "METRICS_FORMAT": "openmetrics"}):
+            with self.assertRaises(RuntimeError):
+                export_node_metrics(failing_node_main)()
+
+        # Metrics of the previous runs are reset, those of a failed run are written
+        content = (self.output / "test_metrics_utils_b1.txt").read_text()
+        self.assertIn(
+            'welearn_datastack_test_node_documents_total{node="test_metrics_utils",'
+            'batch_id="b1",status="ko"} 1\n',
+            content,
+        )
+        self.assertNotIn('status="ok"', content)
+
+    @patch("welearn_datastack.utils_.metrics_utils.MetricsRegistry.push")
+    def test_export_push_error(self, mock_push: MagicMock):
+        mock_push.side_effect = ConnectionError("Unreachable")
+        env = {**self.env, "METRICS_PUSHGATEWAY_URL": "http://pushgateway:9091"}
+        with patch.dict(os.environ, env):
+            os.environ.pop("METRICS_FORMAT", None)
+            export_node_metrics(node_main)()
+
+        mock_push.assert_called_once_with(
+            "http://pushgateway:9091", "test_metrics_utils", {"batch_id": "b1"}
+        )
+        self.assertFalse(self.output.exists())
+
+    def test_export_disabled(self):
+        with patch.dict(os.environ, self.env):
+            os.environ.pop("METRICS_FORMAT", None)
+            os.environ.pop("METRICS_PUSHGATEWAY_URL", None)
+            export_node_metrics(node_main)()
+        self.assertFalse(self.artifact_root.exists())
+
+    def test_export_unknown_format(self):
+        with patch.dict(os.environ, {**self.env, "METRICS_FORMAT": "xml"}):
+            with self.assertRaises(ValueError):
+                export_node_metrics(node_main)()
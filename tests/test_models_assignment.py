@@ -0,0 +1,107 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from welearn_database.data.models import (
+    Base,
+    Category,
+    Corpus,
+    CorpusEmbeddingModel,
+    EmbeddingModel,
+)
+
+from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.data.enumerations import MLModelsType
+from welearn_datastack.modules.models_assignment import (
+    ModelsAssignmentResolver,
+    load_models_assignment,
+)
+
+
+class TestModelsAssignment(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        s_maker = sessionmaker(self.engine)
+        handle_schema_with_sqlite(self.engine)
+
+        self.test_session = s_maker()
+        Base.metadata.create_all(self.test_session.get_bind())
+
+        category_id = uuid.uuid4()
+        self.test_session.add(Category(id=category_id, title="test"))
+        self.corpus_id = uuid.uuid4()
+        self.test_session.add(
+            Corpus(
+                id=self.corpus_id,
+                source_name="corpus",
+                is_fix=True,
+                is_active=True,
+                category_id=category_id,
+            )
+        )
+        self.test_session.commit()
+
+    def tearDown(self):
+        self.test_session.close()
+
+    def _assign_model(self, title: str, lang: str, days_ago: int) -> uuid.UUID:
+        model_id = uuid.uuid4()
+        used_since = datetime.now() - timedelta(days=days_ago)
+        self.test_session.add(EmbeddingModel(id=model_id, title=title, lang=lang))
+        self.test_session.add(
+            CorpusEmbeddingModel(
+                corpus_id=self.corpus_id,
+                embedding_model_id=model_id,
+                used_since=used_since,
+            )
+        )
+        self.test_session.commit()
+        return model_id
+
+    def test_load_models_assignment(self):
+        self._assign_model("old_en", "en", 10)
+        en_id = self._assign_model("new_en", "en", 1)
+        fr_id = self._assign_model("fr", "fr", 5)
+
+        assignment = load_models_assignment(self.test_session, MLModelsType.EMBEDDING)
+
+        self.assertDictEqual(
+            assignment,
+            {
+                (self.corpus_id, "en"): {"model_id": en_id, "model_name": "new_en"},
+                (self.corpus_id, "fr"): {"model_id": fr_id, "model_name": "fr"},
+            },
+        )
+        self.assertDictEqual(
+            load_models_assignment(self.test_session, MLModelsType.BI_CLASSIFIER), {}
+        )
+
+    def test_resolver_ttl(self):
+        self._assign_model("old_en", "en", 10)
+        resolver = ModelsAssignmentResolver(ttl_seconds=3600)
+        first = resolver.get(self.test_session, MLModelsType.EMBEDDING)
+
+        # Assignment is cached until the TTL expires or the cache is cleared
+        self._assign_model("new_en", "en", 1)
+        self.assertIs(resolver.get(self.test_session, MLModelsType.EMBEDDING), first)
+
+        resolver.clear()
+        self.assertEqual(
+            resolver.get(self.test_session, MLModelsType.EMBEDDING)[
+                (self.corpus_id, "en")
+            ]["model_name"],
+            "new_en",
+        )
+
+    def test_resolver_without_ttl(self):
+        resolver = ModelsAssignmentResolver(ttl_seconds=0)
+        self.assertDictEqual(
+            resolver.get(self.test_session, MLModelsType.EMBEDDING), {}
+        )
+
+        self._assign_model("en", "en", 1)
+        self.assertEqual(
+            len(resolver.get(self.test_session, MLModelsType.EMBEDDING)), 1
+        )
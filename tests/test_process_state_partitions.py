@@ -0,0 +1,63 @@
+import unittest
+from datetime import date
+from unittest.mock import Mock
+
+from welearn_datastack.modules.process_state_partitions import (
+    add_months,
+    compact_partition,
+    months_to_create,
+    parse_partition_name,
+    partition_name,
+    partitions_to_compact,
+)
+
+
+class TestProcessStatePartitions(unittest.TestCase):
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2026, 10, 19), 0), date(2026, 10, 1))
+        self.assertEqual(add_months(date(2026, 10, 19), 3), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 31), -1), date(2025, 12, 1))
+        self.assertEqual(add_months(date(2026, 10, 1), -22), date(2024, 12, 1))
+
+    def test_partition_name(self):
+        self.assertEqual(partition_name(date(2026, 3, 12)), "process_state_y2026m03")
+        self.assertEqual(
+            parse_partition_name("process_state_y2026m03"), date(2026, 3, 1)
+        )
+        self.assertIsNone(parse_partition_name("process_state_default"))
+        self.assertIsNone(parse_partition_name("process_state_y2026m03; DROP"))
+
+    def test_months_to_create(self):
+        self.assertListEqual(
+            months_to_create(date(2026, 11, 19), 2),
+            [date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1)],
+        )
+
+    def test_partitions_to_compact(self):
+        partitions = [
+            "process_state_y2026m04",
+            "process_state_default",
+            "process_state_y2026m03",
+            "process_state_y2026m05",
+            "process_state_y2026m10",
+        ]
+        # 6 months kept : from May to October
+        self.assertListEqual(
+            partitions_to_compact(partitions, date(2026, 10, 19), 6),
+            ["process_state_y2026m03", "process_state_y2026m04"],
+        )
+
+    def test_compact_partition_unknown_partition(self):
+        with self.assertRaises(ValueError):
+            compact_partition(Mock(), "process_state_default", archive=False)
+
+    def test_compact_partition_archive(self):
+        db_session = Mock()
+        db_session.execute.return_value.rowcount = 12
+
+        removed = compact_partition(db_session, "process_state_y2026m03", archive=True)
+
+        self.assertEqual(removed, 12)
+        statement = str(db_session.execute.call_args.args[0])
+        self.assertIn("DELETE FROM document_related.process_state_y2026m03", statement)
+        self.assertIn("INSERT INTO document_related.process_state_archive", statement)
@@ -0,0 +1,152 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import Base, Category, Corpus, WeLearnDocument
+
+from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.data.db_models import ProcessingDuration
+from welearn_datastack.modules.processing_duration import (
+    ProcessingDurationRecorder,
+    estimate_documents_durations,
+    retrieve_mean_processing_durations,
+)
+
+
+class TestProcessingDuration(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        s_maker = sessionmaker(self.engine)
+        handle_schema_with_sqlite(self.engine)
+
+        self.test_session = s_maker()
+        Base.metadata.create_all(self.test_session.get_bind())
+
+        category_id = uuid.uuid4()
+        self.test_session.add(Category(id=category_id, title="test"))
+        self.corpora = [
+            Corpus(
+                id=uuid.uuid4(),
+                source_name=f"corpus{i}",
+                is_fix=True,
+                is_active=True,
+                category_id=category_id,
+            )
+            for i in range(3)
+        ]
+        self.test_session.add_all(self.corpora)
+        self.docids = [uuid.uuid4() for _ in self.corpora]
+        for i, (doc_id, corpus) in enumerate(zip(self.docids, self.corpora)):
+            self.test_session.add(
+                WeLearnDocument(
+                    id=doc_id,
+                    url=f"https://example{i}.org",
+                    corpus_id=corpus.id,
+                    title="test",
+                    lang="en",
+                    full_content="a" * 100,
+                    description="test",
+                    details={},
+                )
+            )
+        self.test_session.commit()
+
+    def tearDown(self):
+        self.test_session.close()
+
+    def test_recorder_save(self):
+        recorder = ProcessingDurationRecorder(Step.DOCUMENT_VECTORIZED)
+        recorder.add(self.corpora[0].id, 2.0)
+        recorder.add(self.corpora[0].id, 4.0)
+        recorder.add(self.corpora[1].id, 30.0, documents_qty=3)
+        recorder.save(self.test_session)
+        self.test_session.commit()
+
+        records = {
+            r.corpus_id: r for r in self.test_session.query(ProcessingDuration).all()
+        }
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[self.corpora[0].id].documents_qty, 2)
+        self.assertEqual(records[self.corpora[0].id].duration_seconds, 6.0)
+        self.assertEqual(records[self.corpora[1].id].title, "document_vectorized")
+
+    def test_retrieve_mean_processing_durations(self):
+        self.test_session.add_all(
+            [
+                ProcessingDuration(
+                    id=uuid.uuid4(),
+                    corpus_id=self.corpora[0].id,
+                    title=Step.DOCUMENT_VECTORIZED.value,
+                    documents_qty=10,
+                    duration_seconds=10.0,
+                ),
+                ProcessingDuration(
+                    id=uuid.uuid4(),
+                    corpus_id=self.corpora[0].id,
+                    title=Step.DOCUMENT_VECTORIZED.value,
+                    documents_qty=30,
+                    duration_seconds=70.0,
+                ),
+                # Too old
+                ProcessingDuration(
+                    id=uuid.uuid4(),
+                    corpus_id=self.corpora[0].id,
+                    title=Step.DOCUMENT_VECTORIZED.value,
+                    documents_qty=1,
+                    duration_seconds=1000.0,
+                    created_at=datetime.now() - timedelta(days=60),
+                ),
+                # Other step
+                ProcessingDuration(
+                    id=uuid.uuid4(),
+                    corpus_id=self.corpora[1].id,
+                    title=Step.DOCUMENT_SCRAPED.value,
+                    documents_qty=1,
+                    duration_seconds=5.0,
+                ),
+            ]
+        )
+        self.test_session.commit()
+
+        means = retrieve_mean_processing_durations(
+            self.test_session,
+            Step.DOCUMENT_VECTORIZED,
+            datetime.now() - timedelta(days=30),
+        )
+        self.assertDictEqual(means, {self.corpora[0].id: 2.0})
+
+    @patch("welearn_datastack.modules.processing_duration.IN_CLAUSE_CHUNK_SIZE", 2)
+    def test_estimate_documents_durations(self):
+        docids = [str(d) for d in self.docids]
+        self.assertDictEqual(
+            estimate_documents_durations(
+                self.test_session, docids, Step.DOCUMENT_VECTORIZED, 1.5
+            ),
+            {d: 1.5 for d in docids},
+        )
+
+        for corpus, duration in zip(self.corpora[:2], [2.0, 4.0]):
+            self.test_session.add(
+                ProcessingDuration(
+                    id=uuid.uuid4(),
+                    corpus_id=corpus.id,
+                    title=Step.DOCUMENT_VECTORIZED.value,
+                    documents_qty=1,
+                    duration_seconds=duration,
+                )
+            )
+        self.test_session.commit()
+
+        # The corpus without history gets the mean of the others
+        self.assertListEqual(
+            list(
+                estimate_documents_durations(
+                    self.test_session, docids, Step.DOCUMENT_VECTORIZED, 1.5
+                ).items()
+            ),
+            [(docids[0], 2.0), (docids[1], 4.0), (docids[2], 3.0)],
+        )
@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from welearn_datastack.utils_.profiling_utils import collapse_stack, profile_node
+
+
+def node_main() -> None:
+    time.sleep(0.05)
+
+
+def failing_node_main() -> None:
+    raise RuntimeError("Node failed")
+
+
+class TestProfilingUtils(unittest.TestCase):
+    def setUp(self):
+        self.artifact_root = Path(__file__).parent / "resources" / "profiling"
+        self.profiles = self.artifact_root / "output" / "profiles"
+        self.env = {
+            "ARTIFACT_ROOT": self.artifact_root.as_posix(),
+            "BATCH_ID": "batch-3",
+            "PICK_CORPUS_NAME": "wikipedia",
+            "PROFILE_INTERVAL": "0.001",
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.artifact_root, ignore_errors=True)
+
+    def test_collapse_stack(self):
+        stack = collapse_stack(sys._getframe())
+        self.assertTrue(
+            stack.endswith(f"{__name__}:TestProfilingUtils.test_collapse_stack")
+        )
+        self.assertEqual(collapse_stack(None), "")
+
+    def test_profile_node_sampling(self):
+        with patch.dict(os.environ, {**self.env, "PROFILE_MODE": "sampling"}):
+            profile_node(node_main)()
+
+        prefix = "test_profiling_utils_batch-3_wikipedia"
+        collapsed = (self.profiles / f"{prefix}.collapsed").read_text()
+        self.assertIn(f"{__name__}:node_main", collapsed)
+        self.assertFalse((self.profiles / f"{prefix}.prof").exists())
+        metadata = json.loads((self.profiles / f"{prefix}.json").read_text())
+        self.assertEqual(metadata["batch_id"], "batch-3")
+        self.assertEqual(metadata["corpus"], "wikipedia")
+        self.assertEqual(metadata["mode"], "sampling")
+        self.assertGreater(metadata["samples"], 0)
+
+    def test_profile_node_cprofile_failure(self):
+        with patch.dict(os.environ, {**self.env, "PROFILE_MODE": "cprofile"}):
+            with self.assertRaises(RuntimeError):
+                profile_node(failing_node_main)()
+
+        # The profile of a failed node is written too
+        prefix = "test_profiling_utils_batch-3_wikipedia"
+        self.assertTrue((self.profiles / f"{prefix}.prof").exists())
+        self.assertTrue((self.profiles / f"{prefix}.collapsed").exists())
+
+    def test_profile_node_disabled(self):
+        with patch.dict(os.environ, self.env):
+            os.environ.pop("PROFILE_MODE", None)
+            profile_node(node_main)()
+        self.assertFalse(self.profiles.exists())
+
+    def test_profile_node_unknown_mode(self):
+        with patch.dict(os.environ, {**self.env, "PROFILE_MODE": "perf"}):
+            with self.assertRaises(ValueError):
+                profile_node(node_main)()
@@ -4,7 +4,8 @@ import uuid
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
 
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import sessionmaker
 from welearn_database.data.enumeration import Step
 from welearn_database.data.models import (
@@ -15,6 +16,7 @@ from welearn_database.data.models import (
     CorpusBiClassifierModel,
     CorpusEmbeddingModel,
     CorpusNClassifierModel,
+    DocumentSlice,
     EmbeddingModel,
     NClassifierModel,
     ProcessState,
@@ -22,8 +24,21 @@ from welearn_database.data.models import (
 )
 
 from tests.database_test_utils import handle_schema_with_sqlite
-from welearn_datastack.data.enumerations import MLModelsType, URLRetrievalType
+from welearn_datastack.data.db_models import DocumentSize, LatestProcessState
+from welearn_datastack.data.enumerations import (
+    MLModelsType,
+    URLRetrievalType,
+    WeighedScope,
+)
 from welearn_datastack.modules.retrieve_data_from_database import (
+    _filter_on_sample,
+    _next_sample_percent,
+    _retrieve_sampled_documents,
+    check_process_state_for_documents,
+    iter_documents_ids_according_process_title,
+    retrieve_documents_ids_according_process_title,
+    retrieve_documents_manifest_info,
+    retrieve_documents_sizes_according_process_title,
     retrieve_models,
     retrieve_random_documents_ids_according_process_title,
     retrieve_urls_ids,
@@ -556,3 +571,465 @@ class TestRetrieveDataFromDatabase(unittest.TestCase):
         )
 
         self.assertEqual(len(res), 0)
+
+    @patch.dict(os.environ, {"USE_LATEST_PROCESS_STATE": "true"})
+    def test_retrieve_with_latest_process_state(self):
+        engine = create_engine("sqlite://")
+
+        @event.listens_for(engine, "connect")
+        def connect(conn, rec):
+            conn.create_function("octet_length", 1, octet_length)
+
+        s_maker = sessionmaker(engine)
+        handle_schema_with_sqlite(engine)
+
+        test_session = s_maker()
+        Base.metadata.create_all(test_session.get_bind())
+        category_id = uuid.uuid4()
+        test_session.add(Category(id=category_id, title="test"))
+        corpora = [
+            Corpus(
+                id=uuid.uuid4(),
+                source_name=f"corpus{i}",
+                is_fix=True,
+                is_active=True,
+                category_id=category_id,
+            )
+            for i in range(2)
+        ]
+        test_session.add_all(corpora)
+
+        docs_ids = [uuid.uuid4() for _ in range(3)]
+        docs_corpora = [corpora[0], corpora[0], corpora[1]]
+        docs_steps = [
+            Step.DOCUMENT_IN_QDRANT,
+            Step.DOCUMENT_CLASSIFIED_NON_SDG,
+            Step.DOCUMENT_IN_QDRANT,
+        ]
+        for i, doc_id in enumerate(docs_ids):
+            test_session.add(
+                WeLearnDocument(
+                    id=doc_id,
+                    url=f"https://example{i}.org",
+                    corpus_id=docs_corpora[i].id,
+                    title="test",
+                    lang="en",
+                    full_content="test content test content test content test content test content ",
+                    description="test",
+                    details={"test": "test"},
+                )
+            )
+        test_session.commit()
+        # Rows maintained by a trigger in Postgres
+        test_session.execute(
+            insert(LatestProcessState),
+            [
+                {
+                    "document_id": doc_id,
+                    "process_state_id": uuid.uuid4(),
+                    "corpus_id": docs_corpora[i].id,
+                    "title": docs_steps[i].value,
+                    "created_at": datetime.now(),
+                    "operation_order": i,
+                }
+                for i, doc_id in enumerate(docs_ids)
+            ],
+        )
+        test_session.commit()
+
+        res = check_process_state_for_documents(
+            db_session=test_session,
+            documents_ids=docs_ids[:2],
+            steps=[Step.DOCUMENT_IN_QDRANT],
+        )
+        self.assertListEqual(res, [docs_ids[0]])
+
+        res = retrieve_random_documents_ids_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_IN_QDRANT],
+            qty_max=10,
+            corpus_name="corpus1",
+        )
+        self.assertListEqual(res, [str(docs_ids[2])])
+
+    def test_retrieve_documents_ids_according_process_title_size_budget(self):
+        engine = create_engine("sqlite://")
+
+        @event.listens_for(engine, "connect")
+        def connect(conn, rec):
+            conn.create_function("octet_length", 1, octet_length)
+
+        s_maker = sessionmaker(engine)
+        handle_schema_with_sqlite(engine)
+
+        test_session = s_maker()
+        Base.metadata.create_all(test_session.get_bind())
+        category_id = uuid.uuid4()
+        test_session.add(Category(id=category_id, title="test"))
+        corpus_test = Corpus(
+            id=uuid.uuid4(),
+            source_name="corpus0",
+            is_fix=True,
+            is_active=True,
+            category_id=category_id,
+        )
+        test_session.add(corpus_test)
+
+        # Most recent state first : doc 2 (100 bytes), doc 1 (100 bytes), doc 0 (100 bytes)
+        docs_ids = [uuid.uuid4() for _ in range(3)]
+        for i, doc_id in enumerate(docs_ids):
+            test_session.add(
+                WeLearnDocument(
+                    id=doc_id,
+                    url=f"https://example{i}.org",
+                    corpus_id=corpus_test.id,
+                    title="test",
+                    lang="en",
+                    full_content="a" * 100,
+                    description="test",
+                    details={"test": "test"},
+                )
+            )
+            test_session.add(
+                ProcessState(
+                    id=uuid.uuid4(),
+                    document_id=doc_id,
+                    title=Step.DOCUMENT_SCRAPED.value,
+                    operation_order=i,
+                )
+            )
+            for order in range(2):
+                test_session.add(
+                    DocumentSlice(
+                        id=uuid.uuid4(),
+                        body="b" * 10,
+                        document_id=doc_id,
+                        order_sequence=order,
+                        embedding=b"\x00" * 40,
+                        embedding_model_name="model",
+                        embedding_model_id=uuid.uuid4(),
+                    )
+                )
+        test_session.commit()
+
+        res = retrieve_documents_ids_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.DOCUMENT,
+            size_total_max=250,
+        )
+        self.assertListEqual(res, [str(docs_ids[2]), str(docs_ids[1])])
+
+        res = retrieve_documents_ids_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.DOCUMENT,
+            qty_max=1,
+            size_total_max=250,
+        )
+        self.assertListEqual(res, [str(docs_ids[2])])
+
+        # 2 slices of 10 + 40 bytes per document
+        res = retrieve_documents_ids_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.SLICE,
+            size_total_max=299,
+        )
+        self.assertListEqual(res, [str(docs_ids[2]), str(docs_ids[1])])
+
+        res = retrieve_documents_ids_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.DOCUMENT,
+        )
+        self.assertEqual(len(res), 3)
+
+        # Stored sizes take precedence over the measured ones : doc 2 weighs 200 bytes, doc 1 slices weigh 10 bytes
+        test_session.add(DocumentSize(document_id=docs_ids[2], content_bytes=200))
+        test_session.add(DocumentSize(document_id=docs_ids[1], slice_bytes=10))
+        test_session.commit()
+
+        res = retrieve_documents_ids_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.DOCUMENT,
+            size_total_max=250,
+        )
+        self.assertListEqual(res, [str(docs_ids[2])])
+
+        res = retrieve_documents_ids_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.SLICE,
+            size_total_max=150,
+        )
+        self.assertListEqual(res, [str(docs_ids[2]), str(docs_ids[1])])
+
+        res = retrieve_documents_sizes_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.DOCUMENT,
+        )
+        self.assertListEqual(
+            list(res.items()),
+            [(str(docs_ids[2]), 200), (str(docs_ids[1]), 100), (str(docs_ids[0]), 100)],
+        )
+
+        res = retrieve_documents_sizes_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.SLICE,
+            size_total_max=150,
+        )
+        self.assertDictEqual(res, {str(docs_ids[2]): 100, str(docs_ids[1]): 10})
+
+    def _create_corpora_backlogs(
+        self, test_session, backlogs, title=Step.DOCUMENT_SCRAPED.value
+    ):
+        category_id = uuid.uuid4()
+        test_session.add(Category(id=category_id, title="test"))
+        docs_ids = {}
+        operation_order = 0
+        for corpus_name, qty in backlogs.items():
+            corpus = Corpus(
+                id=uuid.uuid4(),
+                source_name=corpus_name,
+                is_fix=True,
+                is_active=True,
+                category_id=category_id,
+            )
+            test_session.add(corpus)
+            docs_ids[corpus_name] = []
+            for i in range(qty):
+                doc_id = uuid.uuid4()
+                docs_ids[corpus_name].append(str(doc_id))
+                test_session.add(
+                    WeLearnDocument(
+                        id=doc_id,
+                        url=f"https://{corpus_name}{i}.org",
+                        corpus_id=corpus.id,
+                        title="test",
+                        lang="en",
+                        full_content="a" * 100,
+                        description="test",
+                        details={"test": "test"},
+                    )
+                )
+                test_session.add(
+                    ProcessState(
+                        id=uuid.uuid4(),
+                        document_id=doc_id,
+                        title=title,
+                        operation_order=operation_order,
+                    )
+                )
+                operation_order += 1
+        test_session.commit()
+        return docs_ids
+
+    def test_retrieve_documents_ids_according_process_title_corpus_fair(self):
+        engine = create_engine("sqlite://")
+
+        @event.listens_for(engine, "connect")
+        def connect(conn, rec):
+            conn.create_function("octet_length", 1, octet_length)
+
+        handle_schema_with_sqlite(engine)
+        test_session = sessionmaker(engine)()
+        Base.metadata.create_all(test_session.get_bind())
+
+        # The openalex harvest is the most recent one
+        docs_ids = self._create_corpora_backlogs(
+            test_session, {"wikipedia": 2, "openalex": 4}
+        )
+        openalex = docs_ids["openalex"][::-1]
+        wikipedia = docs_ids["wikipedia"][::-1]
+
+        res = retrieve_documents_ids_according_process_title(
+            session=test_session,
+            process_titles=[Step.DOCUMENT_SCRAPED],
+            weighed_scope=WeighedScope.DOCUMENT,
+            qty_max=3,
+        )
+        self.assertListEqual(res, openalex[:3])
+
+        with patch.dict(os.environ, {"CORPUS_FAIR_SELECTION": "true"}):
+            res = retrieve_documents_ids_according_process_title(
+                session=test_session,
+                process_titles=[Step.DOCUMENT_SCRAPED],
+                weighed_scope=WeighedScope.DOCUMENT,
+                qty_max=3,
+            )
+            self.assertListEqual(res, [openalex[0], wikipedia[0], openalex[1]])
+
+            res = retrieve_documents_ids_according_process_title(
+                session=test_session,
+                process_titles=[Step.DOCUMENT_SCRAPED],
+                weighed_scope=WeighedScope.DOCUMENT,
+                qty_max=4,
+                size_total_max=300,
+            )
+            self.assertListEqual(res, [openalex[0], wikipedia[0], openalex[1]])
+
+        with patch.dict(
+            os.environ,
+            {"CORPUS_FAIR_SELECTION": "true", "CORPUS_WEIGHTS": "wikipedia:2"},
+        ):
+            res = retrieve_documents_ids_according_process_title(
+                session=test_session,
+                process_titles=[Step.DOCUMENT_SCRAPED],
+                weighed_scope=WeighedScope.DOCUMENT,
+                qty_max=3,
+            )
+            self.assertListEqual(res, [wikipedia[0], openalex[0], wikipedia[1]])
+
+    @patch.dict(os.environ, {"CORPUS_FAIR_SELECTION": "true"})
+    def test_retrieve_urls_ids_corpus_fair(self):
+        engine = create_engine("sqlite://")
+
+        @event.listens_for(engine, "connect")
+        def connect(conn, rec):
+            conn.create_function("octet_length", 1, octet_length)
+
+        handle_schema_with_sqlite(engine)
+        test_session = sessionmaker(engine)()
+        Base.metadata.create_all(test_session.get_bind())
+
+        docs_ids = self._create_corpora_backlogs(
+            test_session, {"wikipedia": 2, "openalex": 4}, "url_retrieved"
+        )
+
+        res = retrieve_urls_ids(test_session, URLRetrievalType.NEW_MODE, qty_max=4)
+        self.assertSetEqual(
+            {str(x) for x in res},
+            {*docs_ids["wikipedia"], *docs_ids["openalex"][-2:]},
+        )
+
+    def test__next_sample_percent(self):
+        # 5 candidates in 1% of the table, 100 wanted with a 2x margin
+        self.assertEqual(_next_sample_percent(1.0, 5, 100, 2), 40.0)
+        # Without candidate the sample is 10 times larger
+        self.assertEqual(_next_sample_percent(1.0, 0, 100, 2), 10.0)
+        # The sample at least doubles and never exceeds the table
+        self.assertEqual(_next_sample_percent(10.0, 99, 100, 1), 20.0)
+        self.assertEqual(_next_sample_percent(50.0, 1, 100, 2), 100.0)
+
+    def test__filter_on_sample(self):
+        query = Mock()
+        _filter_on_sample(query, "BERNOULLI", 2.5)
+
+        sample_filter = query.filter.call_args.args[0]
+        compiled = str(sample_filter.compile(dialect=postgresql.dialect()))
+        self.assertIn("TABLESAMPLE bernoulli", compiled)
+
+    @patch.dict(os.environ, {"RANDOM_SAMPLING_OVERSAMPLING": "2"})
+    @patch(
+        "welearn_datastack.modules.retrieve_data_from_database._estimate_rows_count",
+        return_value=10000,
+    )
+    @patch(
+        "welearn_datastack.modules.retrieve_data_from_database._filter_on_sample",
+    )
+    def test__retrieve_sampled_documents(
+        self, mock_filter_on_sample, mock_estimate_rows_count
+    ):
+        sampled_query = mock_filter_on_sample.return_value.order_by.return_value
+        sampled_query.limit.return_value.all.side_effect = [
+            [("id1",)],
+            [("id1",), ("id2",), ("id3",), ("id4",)],
+        ]
+        query = Mock()
+
+        res = _retrieve_sampled_documents(Mock(), query, "SYSTEM", 4)
+
+        self.assertEqual(len(res), 4)
+        self.assertListEqual(
+            [c.args[2] for c in mock_filter_on_sample.call_args_list], [0.08, 0.64]
+        )
+        query.order_by.assert_not_called()
+
+    @patch(
+        "welearn_datastack.modules.retrieve_data_from_database._estimate_rows_count",
+        return_value=0,
+    )
+    def test__retrieve_sampled_documents_not_analyzed(self, mock_estimate_rows_count):
+        query = Mock()
+        query.order_by.return_value.limit.return_value.all.return_value = [("id1",)]
+
+        # Without statistics the whole query is sorted
+        res = _retrieve_sampled_documents(Mock(), query, "SYSTEM", 4)
+        self.assertListEqual(res, [("id1",)])
+
+    def test_iter_documents_ids_according_process_title(self):
+        engine = create_engine("sqlite://")
+        handle_schema_with_sqlite(engine)
+        test_session = sessionmaker(engine)()
+        Base.metadata.create_all(test_session.get_bind())
+
+        docs_ids = self._create_corpora_backlogs(
+            test_session, {"wikipedia": 3, "openalex": 4}
+        )
+        most_recent_first = (docs_ids["wikipedia"] + docs_ids["openalex"])[::-1]
+
+        res = iter_documents_ids_according_process_title(
+            test_session, [Step.DOCUMENT_SCRAPED], page_size=2
+        )
+        self.assertListEqual(list(res), most_recent_first)
+
+        res = iter_documents_ids_according_process_title(
+            test_session, [Step.DOCUMENT_SCRAPED], qty_max=5, page_size=2
+        )
+        self.assertListEqual(list(res), most_recent_first[:5])
+
+        res = iter_documents_ids_according_process_title(
+            test_session,
+            [Step.DOCUMENT_SCRAPED],
+            corpus_name="wikipedia",
+            page_size=2,
+        )
+        self.assertListEqual(list(res), docs_ids["wikipedia"][::-1])
+
+        res = iter_documents_ids_according_process_title(
+            test_session, [Step.DOCUMENT_VECTORIZED], page_size=2
+        )
+        self.assertListEqual(list(res), [])
+
+    def test_retrieve_documents_manifest_info(self):
+        engine = create_engine("sqlite://")
+
+        @event.listens_for(engine, "connect")
+        def connect(conn, rec):
+            conn.create_function("octet_length", 1, octet_length)
+
+        handle_schema_with_sqlite(engine)
+        test_session = sessionmaker(engine)()
+        Base.metadata.create_all(test_session.get_bind())
+
+        docs_ids = self._create_corpora_backlogs(
+            test_session, {"wikipedia": 1, "openalex": 2}
+        )
+
+        # One query per id
+        with patch(
+            "welearn_datastack.modules.retrieve_data_from_database.IN_CLAUSE_CHUNK_SIZE",
+            1,
+        ):
+            res = retrieve_documents_manifest_info(
+                test_session, docs_ids["wikipedia"] + docs_ids["openalex"][:1]
+            )
+        self.assertDictEqual(
+            res,
+            {
+                docs_ids["wikipedia"][0]: {
+                    "corpus": "wikipedia",
+                    "size": 100,
+                    "step": Step.DOCUMENT_SCRAPED.value,
+                },
+                docs_ids["openalex"][0]: {
+                    "corpus": "openalex",
+                    "size": 100,
+                    "step": Step.DOCUMENT_SCRAPED.value,
+                },
+            },
+        )
@@ -0,0 +1,66 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from welearn_datastack.exceptions import QueryBudgetExceededError
+from welearn_datastack.utils_.sql_instrumentation_utils import (
+    QueryInstrumentation,
+    StatementStats,
+    normalize_statement,
+    query_budget,
+)
+
+
+class TestSqlInstrumentationUtils(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE doc (id INTEGER, title TEXT)"))
+            conn.execute(text("INSERT INTO doc VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+
+    def test_normalize_statement(self):
+        self.assertEqual(
+            normalize_statement(
+                "SELECT id FROM doc\n  WHERE title = 'it''s' AND id IN (%(id_1_1)s, %(id_1_2)s)\n  LIMIT 10"
+            ),
+            "SELECT id FROM doc WHERE title = ? AND id IN (?) LIMIT ?",
+        )
+        self.assertEqual(
+            normalize_statement("SELECT * FROM process_state_y2026m10 WHERE id = $1"),
+            "SELECT * FROM process_state_y2026m10 WHERE id = ?",
+        )
+
+    def test_p95_time(self):
+        stats = StatementStats(durations=[float(i) for i in range(1, 21)])
+        self.assertEqual(stats.p95_time, 19.0)
+        self.assertEqual(StatementStats().p95_time, 0.0)
+
+    def test_record_statements(self):
+        instrumentation = QueryInstrumentation()
+        instrumentation.attach(self.engine)
+        with self.engine.connect() as conn:
+            for i in range(3):
+                conn.execute(text("SELECT title FROM doc WHERE id = :id"), {"id": i})
+            conn.execute(text("UPDATE doc SET title = 'd'"))
+        instrumentation.detach(self.engine)
+
+        self.assertEqual(instrumentation.query_count, 4)
+        self.assertEqual(
+            instrumentation.stats["SELECT title FROM doc WHERE id = ?"].count, 3
+        )
+        self.assertEqual(instrumentation.stats["UPDATE doc SET title = ?"].rows, 3)
+        self.assertEqual(len(instrumentation.top(1)), 1)
+
+    def test_query_budget(self):
+        with query_budget(self.engine, 2) as instrumentation:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT * FROM doc"))
+        self.assertEqual(instrumentation.query_count, 1)
+
+        with self.assertRaises(QueryBudgetExceededError):
+            with query_budget(self.engine, 2):
+                with self.engine.connect() as conn:
+                    for i in range(3):
+                        conn.execute(
+                            text("SELECT title FROM doc WHERE id = :id"), {"id": i}
+                        )
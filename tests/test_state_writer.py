@@ -0,0 +1,103 @@
+import unittest
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import (
+    Base,
+    Category,
+    Corpus,
+    ErrorRetrieval,
+    ProcessState,
+    WeLearnDocument,
+)
+
+from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.modules.state_writer import StateWriter, _to_copy_text
+
+
+class TestStateWriter(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        s_maker = sessionmaker(self.engine)
+        handle_schema_with_sqlite(self.engine)
+
+        self.test_session = s_maker()
+        Base.metadata.create_all(self.test_session.get_bind())
+
+        category_id = uuid.uuid4()
+        corpus_id = uuid.uuid4()
+        self.test_session.add(Category(id=category_id, title="test"))
+        self.test_session.add(
+            Corpus(
+                id=corpus_id,
+                source_name="corpus",
+                is_fix=True,
+                is_active=True,
+                category_id=category_id,
+            )
+        )
+        self.docids = [uuid.uuid4() for _ in range(3)]
+        for i, doc_id in enumerate(self.docids):
+            self.test_session.add(
+                WeLearnDocument(
+                    id=doc_id,
+                    url=f"https://example{i}.org",
+                    corpus_id=corpus_id,
+                    title="test",
+                    lang="en",
+                    full_content="a" * 100,
+                    description="test",
+                    details={},
+                )
+            )
+        self.test_session.commit()
+
+    def tearDown(self):
+        self.test_session.close()
+
+    def test_flush(self):
+        state_writer = StateWriter(self.test_session)
+        state_writer.add_states(self.docids[:2], Step.DOCUMENT_VECTORIZED)
+        state_writer.add_state(self.docids[2], Step.KEPT_FOR_TRACE.value)
+        state_writer.add_error(self.docids[2], 404, "Not found")
+
+        # Nothing is written before the flush
+        self.assertEqual(self.test_session.query(ProcessState).count(), 0)
+
+        state_writer.flush()
+        self.test_session.commit()
+
+        states = {
+            s.document_id: s.title for s in self.test_session.query(ProcessState).all()
+        }
+        self.assertDictEqual(
+            states,
+            {
+                self.docids[0]: Step.DOCUMENT_VECTORIZED.value,
+                self.docids[1]: Step.DOCUMENT_VECTORIZED.value,
+                self.docids[2]: Step.KEPT_FOR_TRACE.value,
+            },
+        )
+        error = self.test_session.query(ErrorRetrieval).one()
+        self.assertEqual(error.document_id, self.docids[2])
+        self.assertEqual(error.http_error_code, 404)
+        self.assertEqual(error.error_info, "Not found")
+        self.assertDictEqual(state_writer.written, {"states": 3, "errors": 1})
+
+    def test_flush_per_chunk(self):
+        state_writer = StateWriter(self.test_session, chunk_size=2)
+        state_writer.add_states(self.docids, Step.DOCUMENT_SCRAPED)
+
+        # The first chunk is written as soon as it's full
+        self.assertEqual(self.test_session.query(ProcessState).count(), 2)
+        self.assertEqual(len(state_writer.states), 1)
+
+        state_writer.flush()
+        self.assertEqual(self.test_session.query(ProcessState).count(), 3)
+
+    def test_to_copy_text(self):
+        self.assertEqual(_to_copy_text(None), "\\N")
+        self.assertEqual(_to_copy_text(404), "404")
+        self.assertEqual(_to_copy_text("a\tb\nc\\d"), "a\\tb\\nc\\\\d")
@@ -0,0 +1,217 @@
+import os
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from welearn_database.data.models import Base
+
+from tests.database_test_utils import handle_schema_with_sqlite
+from welearn_datastack.data.db_models import WorkQueueItem
+from welearn_datastack.modules.work_queue import (
+    claim_documents,
+    complete_documents,
+    enqueue_documents,
+    iter_documents_to_process,
+)
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        s_maker = sessionmaker(self.engine)
+        handle_schema_with_sqlite(self.engine)
+
+        self.test_session = s_maker()
+        Base.metadata.create_all(self.test_session.get_bind())
+
+        self.docids = [uuid.uuid4() for _ in range(5)]
+        enqueue_documents(self.test_session, "vectorize", self.docids)
+
+    def tearDown(self):
+        self.test_session.close()
+        os.environ.pop("WORK_QUEUE_NAME", None)
+        os.environ.pop("WORK_QUEUE_CLAIM_SIZE", None)
+
+    def test_enqueue_documents_keep_waiting_documents(self):
+        enqueue_documents(self.test_session, "vectorize", self.docids[:2])
+        enqueue_documents(self.test_session, "classify", self.docids[:2])
+
+        self.assertEqual(
+            self.test_session.query(WorkQueueItem)
+            .filter(WorkQueueItem.queue_name == "vectorize")
+            .count(),
+            5,
+        )
+        self.assertEqual(self.test_session.query(WorkQueueItem).count(), 7)
+
+    @patch("welearn_datastack.modules.work_queue.IN_CLAUSE_CHUNK_SIZE", 6)
+    def test_enqueue_documents_by_chunks(self):
+        docids = [uuid.uuid4() for _ in range(5)]
+        enqueue_documents(self.test_session, "classify", docids)
+
+        enqueued = self.test_session.query(WorkQueueItem).filter(
+            WorkQueueItem.queue_name == "classify"
+        )
+        self.assertSetEqual(
+            {item.document_id for item in enqueued},
+            set(docids),
+        )
+
+    def test_claim_documents(self):
+        first = claim_documents(
+            self.test_session, "vectorize", "worker-0", 3, timedelta(hours=1)
+        )
+        second = claim_documents(
+            self.test_session, "vectorize", "worker-1", 3, timedelta(hours=1)
+        )
+        third = claim_documents(
+            self.test_session, "vectorize", "worker-0", 3, timedelta(hours=1)
+        )
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertListEqual(third, [])
+        self.assertSetEqual(set(first) | set(second), set(self.docids))
+
+        item = self.test_session.get(WorkQueueItem, ("vectorize", second[0]))
+        self.assertEqual(item.claimed_by, "worker-1")
+        self.assertEqual(item.attempts, 1)
+
+    def test_claim_documents_expired_lease(self):
+        claimed = claim_documents(
+            self.test_session, "vectorize", "worker-0", 5, timedelta(seconds=-1)
+        )
+        reclaimed = claim_documents(
+            self.test_session, "vectorize", "worker-1", 5, timedelta(hours=1)
+        )
+        self.assertSetEqual(set(claimed), set(reclaimed))
+
+        # Worker 0 was too slow, its completion doesn't remove the documents of worker 1
+        complete_documents(self.test_session, "vectorize", "worker-0", claimed)
+        self.assertEqual(self.test_session.query(WorkQueueItem).count(), 5)
+
+        complete_documents(self.test_session, "vectorize", "worker-1", reclaimed)
+        self.assertEqual(self.test_session.query(WorkQueueItem).count(), 0)
+
+    def test_claim_documents_max_attempts(self):
+        for _ in range(2):
+            claim_documents(
+                self.test_session,
+                "vectorize",
+                "worker-0",
+                5,
+                timedelta(seconds=-1),
+                max_attempts=2,
+            )
+        claimed = claim_documents(
+            self.test_session,
+            "vectorize",
+            "worker-0",
+            5,
+            timedelta(hours=1),
+            max_attempts=2,
+        )
+        self.assertListEqual(claimed, [])
+
+    def test_enqueue_documents_keep_attempts(self):
+        claim_documents(
+            self.test_session,
+            "vectorize",
+            "worker-0",
+            5,
+            timedelta(seconds=-1),
+            max_attempts=1,
+        )
+
+        enqueue_documents(self.test_session, "vectorize", self.docids)
+
+        # Documents which always fail are not retried forever
+        self.test_session.expire_all()
+        for item in self.test_session.query(WorkQueueItem).all():
+            self.assertEqual(item.attempts, 1)
+        claimed = claim_documents(
+            self.test_session,
+            "vectorize",
+            "worker-0",
+            5,
+            timedelta(hours=1),
+            max_attempts=1,
+        )
+        self.assertListEqual(claimed, [])
+
+    def test_enqueue_documents_reset_exhausted_documents(self):
+        for _ in range(2):
+            claim_documents(
+                self.test_session,
+                "vectorize",
+                "worker-0",
+                5,
+                timedelta(seconds=-1),
+                max_attempts=2,
+            )
+        # Documents being processed are left as is
+        leased = claim_documents(
+            self.test_session, "vectorize", "worker-1", 1, timedelta(hours=1)
+        )
+
+        enqueue_documents(
+            self.test_session, "vectorize", self.docids, reset_attempts=True
+        )
+
+        self.test_session.expire_all()
+        for item in self.test_session.query(WorkQueueItem).all():
+            if item.document_id in leased:
+                self.assertEqual(item.attempts, 3)
+                self.assertEqual(item.claimed_by, "worker-1")
+            else:
+                self.assertEqual(item.attempts, 0)
+                self.assertIsNone(item.lease_expires_at)
+        claimed = claim_documents(
+            self.test_session,
+            "vectorize",
+            "worker-0",
+            5,
+            timedelta(hours=1),
+            max_attempts=2,
+        )
+        self.assertSetEqual(set(claimed), set(self.docids) - set(leased))
+
+    @patch("welearn_datastack.modules.work_queue.retrieve_ids_from_artifact")
+    def test_iter_documents_to_process_from_queue(
+        self, mock_retrieve_ids_from_artifact
+    ):
+        os.environ["WORK_QUEUE_NAME"] = "vectorize"
+        os.environ["WORK_QUEUE_CLAIM_SIZE"] = "2"
+
+        batches = []
+        for docids in iter_documents_to_process(
+            self.test_session, "batch_ids.csv", None  # type: ignore
+        ):
+            batches.append(docids)
+            # Claimed documents are not available for the other workers
+            self.assertEqual(
+                self.test_session.query(WorkQueueItem)
+                .filter(WorkQueueItem.lease_expires_at > datetime.now())
+                .count(),
+                len(docids),
+            )
+
+        self.assertListEqual([len(b) for b in batches], [2, 2, 1])
+        self.assertEqual(self.test_session.query(WorkQueueItem).count(), 0)
+        mock_retrieve_ids_from_artifact.assert_not_called()
+
+    @patch("welearn_datastack.modules.work_queue.retrieve_ids_from_artifact")
+    def test_iter_documents_to_process_from_csv(self, mock_retrieve_ids_from_artifact):
+        mock_retrieve_ids_from_artifact.return_value = self.docids[:2]
+
+        batches = list(
+            iter_documents_to_process(
+                self.test_session, "batch_ids.csv", None  # type: ignore
+            )
+        )
+
+        self.assertListEqual(batches, [self.docids[:2]])
+        self.assertEqual(self.test_session.query(WorkQueueItem).count(), 5)
@@ -128,7 +128,7 @@ class Test(TestCase):
         "welearn_datastack.nodes_workflow.URLSanitaryCrawler.url_sanitary_crawler.create_db_session"
     )
     @patch(
-        "welearn_datastack.nodes_workflow.URLSanitaryCrawler.url_sanitary_crawler.retrieve_ids_from_csv"
+        "welearn_datastack.nodes_workflow.URLSanitaryCrawler.url_sanitary_crawler.retrieve_ids_from_artifact"
     )
     @patch(
         "welearn_datastack.nodes_workflow.URLSanitaryCrawler.url_sanitary_crawler.check_url"
@@ -357,3 +357,6 @@ PUBLISHERS_TO_AVOID = [
 QDRANT_MULTI_LINGUAL_CODE = "mul"
 
 FORCED_CORPUS_CLASSIFIED = ["uved"]
+
+# Max quantity of ids bound in a single "IN" clause, psycopg 3 refuses more than 65535 parameters per query
+IN_CLAUSE_CHUNK_SIZE = 10000
@@ -1,11 +1,21 @@
 import csv
+import heapq
+import json
 import logging
+import math
 import os
-from itertools import batched
+from itertools import batched, islice
 from pathlib import Path
-from typing import Collection, List
+from typing import Collection, Dict, Iterable, List, Mapping
 
+from welearn_datastack.data.enumerations import BatchManifestFormat
 from welearn_datastack.exceptions import NotBatchFoundError
+from welearn_datastack.utils_.manifest_utils import (
+    MANIFEST_SUFFIX,
+    ManifestInfo,
+    get_manifest_format,
+    write_manifest,
+)
 from welearn_datastack.utils_.path_utils import setup_local_path
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -31,43 +41,193 @@ class BatchGenerator:
         batch_urls_directory: str = "batch_urls",
         output_batch_file_name: str = "batch_urls.csv",
         output_quantity_file: str = "quantity.txt",
+        output_weights_file: str = "weights.json",
+        manifest_format: BatchManifestFormat | None = None,
+        parallelism_budget: int | None = None,
     ):
         self.local_artifact_input, self.local_artifact_output = setup_local_path()
 
         self.output_batch_file = output_batch_file_name
         self.parallelism_threshold = parallelism_threshold
         self.parallelism_max = parallelism_max
+        self.parallelism_budget = parallelism_budget
         self.batch_urls_directory = batch_urls_directory
         self.batches: List[List[str]] = []
         self.output_quantity_file = output_quantity_file
+        self.output_weights_file = output_weights_file
+        self.batches_weights: List[float] = []
+        self.manifest_format = manifest_format or get_manifest_format()
+        self.overflow: List[str] = []
+
+    @property
+    def batches_max(self) -> int:
+        """
+        Max number of batches : parallelism_max, or parallelism_budget when it's greater
+        """
+        return max(self.parallelism_max, self.parallelism_budget or 0)
+
+    @property
+    def capacity(self) -> int:
+        """
+        Max number of ids create_ids_batch puts in batches
+        """
+        return self.parallelism_threshold * self.batches_max
 
     def create_ids_batch(self, documents_ids: Collection[str]) -> List[List[str]]:
         """
-        Create a batch of documents ids
+        Create a batch of documents ids. Past parallelism_max batches, the number of batches grows up to
+        parallelism_budget, the ids which still don't fit are kept in overflow.
         :param documents_ids: List of documents ids
         :return: List of batches of documents ids
         """
         logger.info("Create batch of documents ids")
-        ret: List[List[str]] = []
+        batches = [
+            list(batch) for batch in batched(documents_ids, self.parallelism_threshold)
+        ]
+
+        if (
+            self.parallelism_max < len(batches)
+            and self.parallelism_max < self.batches_max
+        ):
+            logger.info(
+                "Parallelism grown to %s batches, within a budget of %s",
+                min(len(batches), self.batches_max),
+                self.batches_max,
+            )
+        self.batches = batches[: self.batches_max]
+        self.overflow = [
+            docid for batch in batches[self.batches_max :] for docid in batch
+        ]
+        if self.overflow:
+            logger.error(
+                "Max parallelism reached, %s ids don't fit in %s batches",
+                len(self.overflow),
+                self.batches_max,
+            )
+        return self.batches
 
-        batches = batched(documents_ids, self.parallelism_threshold)
+    def create_weighted_ids_batch(
+        self, documents_weights: Dict[str, int]
+    ) -> List[List[str]]:
+        """
+        Create batches of documents ids with about the same total weight. The number of batches is the same as with
+        create_ids_batch, the ids past its capacity are left for the next run.
+        :param documents_weights: Weight (size in bytes) per document id, in the order of priority
+        :return: List of batches of documents ids
+        """
+        logger.info("Create weighted batch of documents ids")
+        if len(documents_weights) > self.capacity:
+            logger.error(
+                "Max parallelism reached, %s ids don't fit in %s batches",
+                len(documents_weights) - self.capacity,
+                self.batches_max,
+            )
+        weights = dict(islice(documents_weights.items(), self.capacity))
+        return self._pack_longest_first(
+            weights, math.ceil(len(weights) / self.parallelism_threshold)
+        )
 
-        for i, batch in enumerate(batches):
-            if i >= self.parallelism_max:
+    def create_duration_ids_batch(
+        self, documents_durations: Dict[str, float], target_duration: float
+    ) -> List[List[str]]:
+        """
+        Create batches of documents ids lasting about the target duration each. The number of batches is the estimated
+        total duration divided by the target, capped by batches_max : the documents that would overflow are left for the
+        next run.
+        :param documents_durations: Estimated duration (seconds) per document id, in the order of priority
+        :param target_duration: Wall-clock duration wanted per batch, in seconds
+        :return: List of batches of documents ids
+        """
+        logger.info("Create batch of documents ids lasting %s seconds", target_duration)
+        if not documents_durations:
+            self.batches = []
+            self.batches_weights = []
+            return self.batches
+        duration_max = target_duration * self.batches_max
+        durations: Dict[str, float] = {}
+        total_duration = 0.0
+        for docid, duration in documents_durations.items():
+            if total_duration + duration > duration_max and durations:
                 logger.error(
-                    "Max parallelism reached, %s ids will be processed in %s batches",
-                    len(documents_ids) * self.parallelism_threshold,
-                    len(documents_ids),
+                    "Max parallelism reached, %s ids don't fit in %s batches",
+                    len(documents_durations) - len(durations),
+                    self.batches_max,
                 )
                 break
-            else:
-                ret.append(list(batch))
+            durations[docid] = duration
+            total_duration += duration
+
+        # Every duration can be estimated to 0, there is still a batch to fill
+        return self._pack_longest_first(
+            durations, max(1, math.ceil(total_duration / target_duration))
+        )
 
-        self.batches = ret  # type: ignore
+    def _pack_longest_first(
+        self, documents_weights: Mapping[str, float], batches_qty: int
+    ) -> List[List[str]]:
+        """
+        Pack documents in batches with the longest processing time first heuristic : the heaviest documents are placed
+        first, each one in the lightest batch so far.
+        :param documents_weights: Weight per document id
+        :param batches_qty: Number of batches to create
+        :return: List of batches of documents ids
+        """
+        batches: List[List[str]] = [[] for _ in range(batches_qty)]
+        batches_weights: List[float] = [0] * batches_qty
+        # (weight, documents quantity, index) : ties go to the batch with less documents
+        heap = [(0.0, 0, i) for i in range(batches_qty)]
+        for docid, weight in sorted(
+            documents_weights.items(), key=lambda x: x[1], reverse=True
+        ):
+            batch_weight, batch_len, i = heapq.heappop(heap)
+            batches[i].append(docid)
+            batches_weights[i] = batch_weight + weight
+            heapq.heappush(heap, (batches_weights[i], batch_len + 1, i))
+
+        for i, batch_weight in enumerate(batches_weights):
+            logger.info(
+                "Batch %s : %s ids, weight %s", i, len(batches[i]), batch_weight
+            )
+        self.batches = batches
+        self.batches_weights = batches_weights
         return self.batches
 
-    def write_batches_to_file(self):
+    def write_weights_to_file(self) -> None:
+        """
+        Write the estimated weight of each batch to a JSON file, the batches must have been created by
+        create_weighted_ids_batch or create_duration_ids_batch
+        :return: None
+        """
+        weights_file: Path = (
+            Path(self.local_artifact_output)
+            / self.batch_urls_directory
+            / self.output_weights_file
+        )
+        weights_file.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(weights_file, "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {
+                        "batch": i,
+                        "file_name": self._batch_file_name(i),
+                        "documents": len(batch),
+                        "weight": weight,
+                    }
+                    for i, (batch, weight) in enumerate(
+                        zip(self.batches, self.batches_weights)
+                    )
+                ],
+                f,
+            )
+        logger.info("Weights of batches written")
+
+    def write_batches_to_file(
+        self, documents_info: Mapping[str, ManifestInfo] | None = None
+    ):
         """
+        Write each batch to a file
+        :param documents_info: Corpus, size and step per document id, written in the binary manifests only
         :return:
         """
         if not self.batches:
@@ -75,14 +235,70 @@ class BatchGenerator:
             raise NotBatchFoundError("No batches to write")
 
         for i, batch in enumerate(self.batches):
-            self._write_batch_to_file(batch, i)
+            self._write_batch_to_file(batch, i, documents_info)
+
+    def write_streamed_batches(self, documents_ids: Iterable[str]) -> int:
+        """
+        Write batches of documents ids to files while consuming an iterator, then the quantity of batches : only one
+        batch is held in memory. The iterator is not consumed beyond parallelism_max batches. Binary manifests written
+        this way only carry the ids.
+        :param documents_ids: Iterator of documents ids, in the order of priority
+        :return: Quantity of batches
+        """
+        logger.info("Write streamed batches of documents ids")
+        qty_max = self.parallelism_threshold * self.parallelism_max
+        qty = 0
+        for i, batch in enumerate(
+            batched(islice(documents_ids, qty_max), self.parallelism_threshold)
+        ):
+            self._write_batch_to_file(list(batch), i)
+            qty += 1
+
+        if qty == self.parallelism_max:
+            logger.warning(
+                "Max parallelism reached, at most %s ids were written in %s batches",
+                qty_max,
+                qty,
+            )
+        self._write_quantity(qty)
+        return qty
+
+    def write_overflow_to_file(self, overflow_file: Path) -> int:
+        """
+        Write the ids left over by create_ids_batch to a CSV file, to be batched first by the next run. The file is
+        removed when there is no overflow.
+        :param overflow_file: Path of the file
+        :return: Quantity of ids written
+        """
+        if not self.overflow:
+            overflow_file.unlink(missing_ok=True)
+            return 0
+
+        overflow_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(overflow_file, "w") as f:
+            spamwriter = csv.writer(
+                f, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
+            )
+            for docid in self.overflow:
+                spamwriter.writerow([docid])
+        logger.info("%s ids written to the overflow backlog", len(self.overflow))
+        return len(self.overflow)
 
     def write_quantity_to_file(self) -> int:
         """
         Write the quantity of batches to a file
         :return: Quantity of batches
         """
-        logger.info(f"Write quantity {len(self.batches)} of batches to a file")
+        self._write_quantity(len(self.batches))
+        return len(self.batches)
+
+    def _write_quantity(self, quantity: int) -> None:
+        """
+        Write a quantity of batches to a file
+        :param quantity: Quantity of batches
+        :return: None
+        """
+        logger.info(f"Write quantity {quantity} of batches to a file")
         quantity_file: Path = (
             Path(self.local_artifact_output)
             / self.batch_urls_directory
@@ -95,16 +311,31 @@ class BatchGenerator:
             "w",
             encoding="utf-8",
         ) as f:
-            f.write(str(len(self.batches)))
+            f.write(str(quantity))
 
         logger.info("Quantity of batches written")
-        return len(self.batches)
 
-    def _write_batch_to_file(self, batch: List[str], i: int) -> None:
+    def _batch_file_name(self, i: int) -> str:
+        """
+        Name of the file of a batch, a binary manifest takes the .npy suffix
+        :param i: Index of the batch
+        :return: File name
+        """
+        if self.manifest_format == BatchManifestFormat.NPY:
+            return f"{str(i)}_{Path(self.output_batch_file).stem}{MANIFEST_SUFFIX}"
+        return f"{str(i)}_{self.output_batch_file}"
+
+    def _write_batch_to_file(
+        self,
+        batch: List[str],
+        i: int,
+        documents_info: Mapping[str, ManifestInfo] | None = None,
+    ) -> None:
         """
         Write a batch of documents ids to a file
         :param batch: List of documents ids
         :param i: Index of the batch
+        :param documents_info: Corpus, size and step per document id, for the binary manifest
         :return: None
         """
         logger.info("Batch %s size: %s", i, len(batch))
@@ -112,10 +343,15 @@ class BatchGenerator:
         batch_file: Path = (
             Path(self.local_artifact_output)
             / self.batch_urls_directory
-            / f"{str(i)}_{self.output_batch_file}"
+            / self._batch_file_name(i)
         )
         batch_file.parent.mkdir(parents=True, exist_ok=True)
 
+        if self.manifest_format == BatchManifestFormat.NPY:
+            write_manifest(batch_file, batch, documents_info)
+            logger.info("%s batch written", i)
+            return
+
         with open(
             batch_file,
             "w",
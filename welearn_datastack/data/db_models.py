@@ -0,0 +1,222 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import ForeignKey, Index, func, types
+from sqlalchemy.dialects.postgresql import ENUM, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+from welearn_database.data.enumeration import DbSchemaEnum, Step
+from welearn_database.data.models import Base
+
+schema_name = DbSchemaEnum.DOCUMENT_RELATED.value
+
+
+class LatestProcessState(Base):
+    """
+    Last process state of each document, one row per document. It's maintained by a trigger on process_state
+    (see the latest_process_state migration) and must not be written by the application.
+    :cvar document_id: The identifier of the document.
+    :cvar process_state_id: The identifier of the last process state of the document.
+    :cvar corpus_id: The identifier of the corpus of the document, for filtering without joining the documents.
+    :cvar title: The title of the last processing step.
+    :cvar created_at: The timestamp when the last process state was created.
+    :cvar operation_order: The operation order of the last process state.
+    """
+
+    __tablename__ = "latest_process_state"
+    __table_args__ = (
+        Index("latest_process_state_title_corpus_id_idx", "title", "corpus_id"),
+        {"schema": schema_name},
+    )
+    __read_only__ = True
+
+    document_id: Mapped[UUID] = mapped_column(
+        types.Uuid,
+        ForeignKey(
+            f"{schema_name}.welearn_document.id",
+            name="latest_process_state_document_id_fkey",
+            ondelete="CASCADE",
+        ),
+        primary_key=True,
+    )
+    process_state_id: Mapped[UUID] = mapped_column(types.Uuid, nullable=False)
+    corpus_id: Mapped[UUID] = mapped_column(types.Uuid, nullable=False)
+    title: Mapped[str] = mapped_column(
+        ENUM(
+            *(e.value.lower() for e in Step),
+            name="step",
+            schema=schema_name,
+            create_type=False,
+        ),
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=False), nullable=False
+    )
+    operation_order = mapped_column(types.BIGINT, nullable=False)
+
+
+class DocumentSize(Base):
+    """
+    Sizes of a document stored at write time, so batches can be weighted without measuring the contents.
+    :cvar document_id: The identifier of the document.
+    :cvar content_bytes: The size in bytes of the document full content, written by the DocumentCollectorHub.
+    :cvar slice_bytes: The size in bytes of the bodies and embeddings of the document slices, written by the
+    DocumentVectorizer.
+    :cvar updated_at: The timestamp of the last update of the sizes.
+    """
+
+    __tablename__ = "document_size"
+    __table_args__ = {"schema": schema_name}
+
+    document_id: Mapped[UUID] = mapped_column(
+        types.Uuid,
+        ForeignKey(
+            f"{schema_name}.welearn_document.id",
+            name="document_size_document_id_fkey",
+            ondelete="CASCADE",
+        ),
+        primary_key=True,
+    )
+    content_bytes = mapped_column(types.BIGINT, nullable=True)
+    slice_bytes = mapped_column(types.BIGINT, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=False),
+        nullable=False,
+        default=func.localtimestamp(),
+        server_default="NOW()",
+    )
+
+
+class WorkQueueItem(Base):
+    """
+    Document waiting to be processed by the workers of a queue. Workers claim items with a lease, an item whose lease
+    expired (worker crashed or too slow) can be claimed again by another worker.
+    :cvar queue_name: The name of the queue, one per node.
+    :cvar document_id: The identifier of the document to process.
+    :cvar enqueued_at: The timestamp when the document was enqueued, items are claimed in this order.
+    :cvar claimed_by: The identifier of the worker which claimed the item last.
+    :cvar lease_expires_at: The timestamp until which the item is reserved for its worker, null if never claimed.
+    :cvar attempts: The number of times the item was claimed.
+    """
+
+    __tablename__ = "work_queue"
+    __table_args__ = (
+        Index("work_queue_queue_name_enqueued_at_idx", "queue_name", "enqueued_at"),
+        {"schema": schema_name},
+    )
+
+    queue_name: Mapped[str] = mapped_column(types.String, primary_key=True)
+    document_id: Mapped[UUID] = mapped_column(
+        types.Uuid,
+        ForeignKey(
+            f"{schema_name}.welearn_document.id",
+            name="work_queue_document_id_fkey",
+            ondelete="CASCADE",
+        ),
+        primary_key=True,
+    )
+    enqueued_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=False),
+        nullable=False,
+        default=func.localtimestamp(),
+        server_default="NOW()",
+    )
+    claimed_by: Mapped[str | None] = mapped_column(types.String, nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=False), nullable=True
+    )
+    attempts: Mapped[int] = mapped_column(
+        types.Integer, nullable=False, default=0, server_default="0"
+    )
+
+
+class ProcessingDuration(Base):
+    """
+    Time spent by a node to process the documents of a corpus, recorded at each run to size the next batches.
+    :cvar id: The identifier of the record.
+    :cvar corpus_id: The identifier of the corpus of the documents.
+    :cvar title: The step reached by the documents when processed, i.e. the node which processed them.
+    :cvar documents_qty: The number of documents processed.
+    :cvar duration_seconds: The time spent to process the documents, in seconds.
+    :cvar created_at: The timestamp when the record was created.
+    """
+
+    __tablename__ = "processing_duration"
+    __table_args__ = (
+        Index(
+            "processing_duration_title_corpus_id_created_at_idx",
+            "title",
+            "corpus_id",
+            "created_at",
+        ),
+        {"schema": schema_name},
+    )
+
+    id: Mapped[UUID] = mapped_column(types.Uuid, primary_key=True)
+    corpus_id: Mapped[UUID] = mapped_column(
+        types.Uuid,
+        ForeignKey(
+            f"{DbSchemaEnum.CORPUS_RELATED.value}.corpus.id",
+            name="processing_duration_corpus_id_fkey",
+            ondelete="CASCADE",
+        ),
+        nullable=False,
+    )
+    title: Mapped[str] = mapped_column(
+        ENUM(
+            *(e.value.lower() for e in Step),
+            name="step",
+            schema=schema_name,
+            create_type=False,
+        ),
+        nullable=False,
+    )
+    documents_qty: Mapped[int] = mapped_column(types.Integer, nullable=False)
+    duration_seconds: Mapped[float] = mapped_column(types.Float, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=False),
+        nullable=False,
+        default=func.localtimestamp(),
+        server_default="NOW()",
+    )
+
+
+class ProcessStateArchive(Base):
+    """
+    Process states superseded by a more recent state of the same document, moved out of the old process_state
+    partitions by ProcessStateArchiver.
+    :cvar id: The identifier of the process state.
+    :cvar document_id: The identifier of the document.
+    :cvar title: The title of the processing step.
+    :cvar created_at: The timestamp when the process state was created.
+    :cvar operation_order: The operation order of the process state.
+    :cvar archived_at: The timestamp when the process state was archived.
+    """
+
+    __tablename__ = "process_state_archive"
+    __table_args__ = (
+        Index("process_state_archive_document_id_idx", "document_id"),
+        {"schema": schema_name},
+    )
+
+    id: Mapped[UUID] = mapped_column(types.Uuid, primary_key=True)
+    document_id: Mapped[UUID] = mapped_column(types.Uuid, nullable=False)
+    title: Mapped[str] = mapped_column(
+        ENUM(
+            *(e.value.lower() for e in Step),
+            name="step",
+            schema=schema_name,
+            create_type=False,
+        ),
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=False), nullable=False
+    )
+    operation_order = mapped_column(types.BIGINT, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=False),
+        nullable=False,
+        default=func.localtimestamp(),
+        server_default="NOW()",
+    )
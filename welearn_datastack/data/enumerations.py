@@ -36,3 +36,14 @@ class URLStatus(Enum):
     UPDATE = 2
     DELETE = 3
     UNKNOWN = 4
+
+
+class BatchingStrategy(Enum):
+    COUNT = auto()
+    WEIGHT = auto()
+    DURATION = auto()
+
+
+class BatchManifestFormat(Enum):
+    CSV = auto()
+    NPY = auto()
@@ -0,0 +1,72 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from qdrant_client.http.models import models
+
+# Payload fields used by delete filters (document_id) and by search filters
+DEFAULT_PAYLOAD_INDEXES: Dict[str, models.PayloadSchemaType] = {
+    "document_id": models.PayloadSchemaType.KEYWORD,
+    "document_corpus": models.PayloadSchemaType.KEYWORD,
+    "document_lang": models.PayloadSchemaType.KEYWORD,
+    "document_sdg": models.PayloadSchemaType.INTEGER,
+    "slice_sdg": models.PayloadSchemaType.INTEGER,
+}
+
+
+@dataclass
+class QdrantCollectionSpec:
+    name: str
+    vector_size: int
+    distance: models.Distance = models.Distance.COSINE
+    on_disk: bool = True
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    scalar_quantization: bool = False
+    quantization_quantile: float = 0.99
+    quantization_always_ram: bool = True
+    payload_indexes: Dict[str, models.PayloadSchemaType] = field(
+        default_factory=lambda: dict(DEFAULT_PAYLOAD_INDEXES)
+    )
+
+    @classmethod
+    def from_dict(cls, spec: dict) -> "QdrantCollectionSpec":
+        spec = dict(spec)
+        if "distance" in spec:
+            spec["distance"] = models.Distance(spec["distance"])
+        if "payload_indexes" in spec:
+            spec["payload_indexes"] = {
+                k: models.PayloadSchemaType(v)
+                for k, v in spec["payload_indexes"].items()
+            }
+        return cls(**spec)
+
+    def vectors_config(self) -> models.VectorParams:
+        return models.VectorParams(
+            size=self.vector_size, distance=self.distance, on_disk=self.on_disk
+        )
+
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self) -> models.ScalarQuantization | None:
+        if not self.scalar_quantization:
+            return None
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=self.quantization_quantile,
+                always_ram=self.quantization_always_ram,
+            )
+        )
+
+
+def load_collections_specs(path: Path) -> List[QdrantCollectionSpec]:
+    """
+    Load collections specifications from a JSON file containing a list of specifications
+    :param path: Path of the JSON file
+    :return: List of collections specifications
+    """
+    with path.open() as f:
+        return [QdrantCollectionSpec.from_dict(spec) for spec in json.load(f)]
@@ -149,6 +149,10 @@ class ErrorWhileInsertingParagraph(Exception):
     """Raised when there is an error while inserting paragraphs"""
 
 
+class QdrantCollectionValidationError(Exception):
+    """Raised when a Qdrant collection is not in the expected state after a rebuild"""
+
+
 class NotBatchFoundError(Exception):
     """Raised when there is no batch found"""
 
@@ -255,3 +259,7 @@ class NoDOIFoundError(NotEnoughData):
 
 class FileTypeUnsupported(WrongFormat):
     """Raised when the file type is not supported"""
+
+
+class QueryBudgetExceededError(Exception):
+    """Raised when more SQL queries than allowed were executed"""
@@ -0,0 +1,81 @@
+import logging
+import os
+from itertools import batched
+from pathlib import Path
+from typing import Callable, List
+
+from welearn_database.data.enumeration import Step
+
+from welearn_datastack.constants import IN_CLAUSE_CHUNK_SIZE
+from welearn_datastack.modules.retrieve_data_from_database import (
+    check_process_state_for_documents,
+)
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_backlog_file() -> Path | None:
+    """
+    Get the overflow backlog file of a batch generator from BATCH_BACKLOG_FILE, it must outlive the workflow (e.g. on
+    a shared volume)
+    :return: Path of the backlog file, None if there is no backlog
+    """
+    backlog_file: str | None = os.getenv("BATCH_BACKLOG_FILE", None)
+    if not backlog_file:
+        return None
+    return Path(backlog_file)
+
+
+def load_backlog(
+    db_session, backlog_file: Path, process_titles: List[Step]
+) -> List[str]:
+    """
+    Ids left over by the previous run which still have to be processed : their last process title is one of
+    process_titles. The backlog is checked by chunks of IN_CLAUSE_CHUNK_SIZE ids.
+    :param db_session: Database session
+    :param backlog_file: Path of the backlog file
+    :param process_titles: Process titles of the documents to process
+    :return: Documents ids, in the order of the backlog
+    """
+    if not backlog_file.exists():
+        return []
+
+    backlog = retrieve_ids_from_artifact(backlog_file.name, backlog_file.parent)
+    still_to_process = set()
+    for chunk in batched(backlog, IN_CLAUSE_CHUNK_SIZE):
+        still_to_process.update(
+            check_process_state_for_documents(db_session, list(chunk), process_titles)
+        )
+    ret = [str(docid) for docid in backlog if docid in still_to_process]
+    logger.info("'%s' ids of the backlog are still to process", len(ret))
+    return ret
+
+
+def retrieve_ids_with_backlog(
+    db_session,
+    backlog_file: Path | None,
+    process_titles: List[Step],
+    capacity: int,
+    retrieve_ids: Callable[[], List[str]],
+) -> List[str]:
+    """
+    Ids to batch, the backlog first. The selection query is only run when the backlog doesn't fill the batches.
+    :param db_session: Database session
+    :param backlog_file: Path of the backlog file, None if there is no backlog
+    :param process_titles: Process titles of the documents to process
+    :param capacity: Max number of ids the batches can hold
+    :param retrieve_ids: Selection query of the ids
+    :return: Documents ids
+    """
+    backlog: List[str] = []
+    if backlog_file is not None:
+        backlog = load_backlog(db_session, backlog_file, process_titles)
+    if len(backlog) >= capacity:
+        logger.info("The backlog fills the batches, no ids are selected")
+        return backlog
+
+    backlog_ids = set(backlog)
+    return backlog + [docid for docid in retrieve_ids() if docid not in backlog_ids]
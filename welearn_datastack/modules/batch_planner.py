@@ -0,0 +1,158 @@
+import logging
+import random
+from dataclasses import dataclass, field
+from typing import Collection, Dict, List, Tuple
+
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import Corpus, WeLearnDocument
+
+from welearn_datastack.data.db_models import LatestProcessState
+from welearn_datastack.modules.retrieve_data_from_database import (
+    _get_process_state_source,
+    _join_last_process_state,
+)
+from welearn_datastack.utils_.database_utils import stream_query_results
+
+logger = logging.getLogger(__name__)
+
+# Step name -> (titles of the documents to process, random pick, corpus of the step)
+# Same selection as the generate_to_*_batch scripts with their default settings
+PLANNED_STEPS_SPECS: Dict[str, Tuple[List[Step], bool, str | None]] = {
+    "collect": ([Step.URL_RETRIEVED], False, None),
+    "vectorize": ([Step.DOCUMENT_SCRAPED], False, None),
+    "classify": ([Step.DOCUMENT_VECTORIZED], False, None),
+    "keywords": ([Step.DOCUMENT_CLASSIFIED_SDG], False, None),
+    "syncronize": (
+        [
+            Step.DOCUMENT_KEYWORDS_EXTRACTED,
+            Step.DOCUMENT_CLASSIFIED_NON_SDG,
+            Step.DOCUMENT_IS_INVALID,
+        ],
+        False,
+        None,
+    ),
+    "sanitize": ([Step.DOCUMENT_IN_QDRANT], True, None),
+    "update": ([Step.DOCUMENT_IN_QDRANT], True, "wikipedia"),
+}
+
+
+@dataclass
+class PlannedStep:
+    """
+    Candidates of a step, filled while scanning the last process states from the most recent one
+    """
+
+    name: str
+    titles: List[Step]
+    qty_max: int
+    is_random: bool = False
+    corpus_name: str = "*"
+    documents_ids: List[str] = field(default_factory=list)
+    candidates_qty: int = 0
+
+    def __post_init__(self):
+        self._titles = {t.value for t in self.titles}
+
+    @property
+    def is_full(self) -> bool:
+        """
+        A random step needs every candidate, an ordered one stops at qty_max
+        """
+        return not self.is_random and len(self.documents_ids) >= self.qty_max
+
+    def offer(
+        self, document_id: str, title: str, corpus_name: str, rng: random.Random
+    ) -> None:
+        """
+        Keep the document if it's a candidate of the step. Random steps keep a uniform sample of their candidates
+        (reservoir sampling), ordered steps the first ones.
+        :param document_id: Document id
+        :param title: Last process title of the document
+        :param corpus_name: Corpus of the document
+        :param rng: Random generator used by the random steps
+        """
+        if title not in self._titles or self.is_full:
+            return
+        if self.corpus_name != "*" and corpus_name != self.corpus_name:
+            return
+
+        self.candidates_qty += 1
+        if len(self.documents_ids) < self.qty_max:
+            self.documents_ids.append(document_id)
+        elif self.is_random:
+            i = rng.randrange(self.candidates_qty)
+            if i < self.qty_max:
+                self.documents_ids[i] = document_id
+
+
+def build_planned_steps(
+    names: Collection[str], qty_max: Dict[str, int], corpus_name: str = "*"
+) -> List[PlannedStep]:
+    """
+    Build the steps to plan from PLANNED_STEPS_SPECS
+    :param names: Names of the steps
+    :param qty_max: Max number of documents per step name
+    :param corpus_name: Corpus of the steps without a fixed corpus
+    :return: Steps to plan
+    """
+    ret: List[PlannedStep] = []
+    for name in names:
+        if name not in PLANNED_STEPS_SPECS:
+            raise ValueError(f"Step not recognized: '{name}'")
+        titles, is_random, step_corpus_name = PLANNED_STEPS_SPECS[name]
+        ret.append(
+            PlannedStep(
+                name=name,
+                titles=titles,
+                qty_max=qty_max[name],
+                is_random=is_random,
+                corpus_name=step_corpus_name or corpus_name,
+            )
+        )
+    return ret
+
+
+def plan_batches(
+    session, steps: List[PlannedStep], rng: random.Random | None = None
+) -> Dict[str, List[str]]:
+    """
+    Select the documents of several steps in one scan of the last process states, most recent first
+    :param session: DB session
+    :param steps: Steps to plan, filled in place
+    :param rng: Random generator used by the random steps
+    :return: Documents ids per step name
+    """
+    rng = rng or random.Random()  # nosec
+    state = _get_process_state_source()
+    titles = {t.value for step in steps for t in step.titles}
+
+    query = _join_last_process_state(
+        session,
+        session.query(state.document_id, state.title, Corpus.source_name),
+        state,
+    )
+    if state is LatestProcessState:
+        query = query.join(Corpus, state.corpus_id == Corpus.id)
+    else:
+        query = query.join(
+            WeLearnDocument, state.document_id == WeLearnDocument.id
+        ).join(Corpus, WeLearnDocument.corpus_id == Corpus.id)
+    query = query.filter(state.title.in_(titles)).order_by(state.operation_order.desc())
+
+    scanned = 0
+    for document_id, title, corpus_name in stream_query_results(query):
+        scanned += 1
+        for step in steps:
+            step.offer(str(document_id), title, corpus_name, rng)
+        if all(step.is_full for step in steps):
+            break
+    logger.info("'%s' process states scanned", scanned)
+
+    for step in steps:
+        logger.info(
+            "Step '%s': %s documents selected among %s candidates",
+            step.name,
+            len(step.documents_ids),
+            step.candidates_qty,
+        )
+    return {step.name: step.documents_ids for step in steps}
@@ -0,0 +1,64 @@
+import logging
+from typing import Collection, Dict, Literal
+from uuid import UUID
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from welearn_database.data.models import DocumentSlice, WeLearnDocument
+
+from welearn_datastack.data.db_models import DocumentSize
+
+logger = logging.getLogger(__name__)
+
+
+def compute_content_bytes(document: WeLearnDocument) -> int:
+    """
+    Compute the size of the full content of a document, as measured by octet_length in the database
+    :param document: Document to measure
+    :return: Size in bytes
+    """
+    return len((document.full_content or "").encode("utf-8"))
+
+
+def compute_slices_bytes(slices: Collection[DocumentSlice]) -> int:
+    """
+    Compute the size of the bodies and embeddings of slices, as measured by octet_length in the database
+    :param slices: Slices to measure
+    :return: Size in bytes
+    """
+    return sum(
+        len((s.body or "").encode("utf-8")) + len(bytes(s.embedding or b""))
+        for s in slices
+    )
+
+
+def upsert_documents_sizes(
+    db_session: Session,
+    sizes: Dict[UUID, int],
+    column: Literal["content_bytes", "slice_bytes"],
+) -> None:
+    """
+    Store one of the sizes of documents, the other size is kept if the document already has one.
+    The session is not committed.
+    :param db_session: Database session
+    :param sizes: Sizes in bytes per document id
+    :param column: Size to store
+    """
+    if not sizes:
+        return
+
+    dialect_insert = (
+        sqlite.insert
+        if db_session.get_bind().dialect.name == "sqlite"
+        else postgresql.insert
+    )
+    stmt = dialect_insert(DocumentSize).values(
+        [{"document_id": doc_id, column: size} for doc_id, size in sizes.items()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DocumentSize.document_id],
+        set_={column: stmt.excluded[column], "updated_at": func.localtimestamp()},
+    )
+    db_session.execute(stmt)
+    logger.info("'%s' documents %s were stored", len(sizes), column)
@@ -18,6 +18,7 @@ from welearn_datastack.regular_expression import (
     BACKLINE_SEQUENCE_REGEX,
     WHITESPACE_SEQUENCE_REGEX,
 )
+from welearn_datastack.utils_.memory_utils import memory_tracker
 from welearn_datastack.utils_.path_utils import generate_ml_models_path
 
 logger = logging.getLogger(__name__)
@@ -89,23 +90,29 @@ def create_content_slices(
     )  # 1M character is the limit from SpaCy
     split_size = round(len(document.full_content) / n_splits)
 
+    def content_bytes() -> int:
+        # Only encoded when the memory is tracked
+        return len(document.full_content.encode("utf-8"))
+
     text_content_slices = []
-    for i in range(0, n_splits):
-        text_content_slices += _split_by_word_respecting_sent_boundary(
-            slice_length=tokenizer.model_max_length,  # type: ignore
-            document_content=document.full_content[
-                i * split_size : (i + 1) * split_size
-            ],  # type: ignore
-            document_lang=document.lang,  # type: ignore
-        )
+    with memory_tracker.phase("slicing", content_bytes):
+        for i in range(0, n_splits):
+            text_content_slices += _split_by_word_respecting_sent_boundary(
+                slice_length=tokenizer.model_max_length,  # type: ignore
+                document_content=document.full_content[
+                    i * split_size : (i + 1) * split_size
+                ],  # type: ignore
+                document_lang=document.lang,  # type: ignore
+            )
 
     slices: List[DocumentSlice] = []
 
-    embeddings: np.ndarray = _compute_embeddings(
-        embedding_model,
-        tokenizer,
-        text_content_slices,
-    )
+    with memory_tracker.phase("inference", content_bytes):
+        embeddings: np.ndarray = _compute_embeddings(
+            embedding_model,
+            tokenizer,
+            text_content_slices,
+        )
 
     # Create Slices objects
     for i, (text, embedding) in enumerate(zip(text_content_slices, embeddings)):
@@ -0,0 +1,135 @@
+import logging
+import os
+import time
+from typing import Dict, Tuple, TypedDict
+from uuid import UUID
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+from welearn_database.data.models import (
+    BiClassifierModel,
+    CorpusBiClassifierModel,
+    CorpusEmbeddingModel,
+    CorpusNClassifierModel,
+    EmbeddingModel,
+    NClassifierModel,
+)
+
+from welearn_datastack.data.enumerations import MLModelsType
+
+logger = logging.getLogger(__name__)
+
+
+class ModelInfo(TypedDict):
+    model_id: UUID
+    model_name: str
+
+
+# (corpus_id, lang) -> most recent model assigned to the corpus for this language
+ModelsAssignment = Dict[Tuple[UUID, str], ModelInfo]
+
+
+def _get_models_tables(ml_type: MLModelsType):
+    """
+    Get the model table, the corpus association table and the association column for a type of model
+    :param ml_type: Type of model
+    :return: (model table, association table, association column)
+    """
+    if ml_type == MLModelsType.BI_CLASSIFIER:
+        return (
+            BiClassifierModel,
+            CorpusBiClassifierModel,
+            CorpusBiClassifierModel.bi_classifier_model_id,
+        )
+    if ml_type == MLModelsType.N_CLASSIFIER:
+        return (
+            NClassifierModel,
+            CorpusNClassifierModel,
+            CorpusNClassifierModel.n_classifier_model_id,
+        )
+    if ml_type == MLModelsType.EMBEDDING:
+        return (
+            EmbeddingModel,
+            CorpusEmbeddingModel,
+            CorpusEmbeddingModel.embedding_model_id,
+        )
+    raise ValueError("ML type not recognized")
+
+
+def load_models_assignment(
+    db_session: Session, ml_type: MLModelsType
+) -> ModelsAssignment:
+    """
+    Load the model in use for each corpus and language, i.e. the one with the most recent used_since in the
+    association table
+    :param db_session: DB session
+    :param ml_type: Type of model to load
+    :return: Model info per (corpus_id, lang)
+    """
+    model_table, join_table, relation_field = _get_models_tables(ml_type)
+    rows = (
+        db_session.query(
+            join_table.corpus_id,
+            model_table.lang,
+            model_table.id,
+            model_table.title,
+        )
+        .join(model_table, model_table.id == relation_field)
+        .order_by(desc(join_table.used_since))
+        .all()
+    )
+
+    ret: ModelsAssignment = {}
+    for corpus_id, lang, model_id, model_title in rows:
+        if lang is None:
+            continue
+        # Rows are ordered by used_since, the first one is the most recent
+        ret.setdefault(
+            (corpus_id, lang), {"model_id": model_id, "model_name": model_title}
+        )
+    return ret
+
+
+class ModelsAssignmentResolver:
+    """
+    Keep the models assignment of each type in memory, reloaded from the database once the TTL is expired or when
+    the session is bound to another database
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[MLModelsType, Tuple[object, float, ModelsAssignment]] = {}
+
+    def get(self, db_session: Session, ml_type: MLModelsType) -> ModelsAssignment:
+        """
+        Get the models assignment of a type of model, loaded from the database if not cached
+        :param db_session: DB session
+        :param ml_type: Type of model
+        :return: Model info per (corpus_id, lang)
+        """
+        bind = db_session.get_bind()
+        now = time.monotonic()
+        cached = self._cache.get(ml_type)
+        if cached and cached[0] is bind and now - cached[1] < self.ttl_seconds:
+            return cached[2]
+
+        assignment = load_models_assignment(db_session, ml_type)
+        logger.info(
+            "%s models assignment loaded for %s (corpus, lang) pairs",
+            ml_type.name,
+            len(assignment),
+        )
+        if self.ttl_seconds > 0:
+            self._cache[ml_type] = (bind, now, assignment)
+        return assignment
+
+    def clear(self) -> None:
+        """
+        Forget the cached assignments, e.g. after a model was assigned to a corpus
+        """
+        self._cache.clear()
+
+
+models_assignment_resolver = ModelsAssignmentResolver(
+    ttl_seconds=float(os.getenv("MODELS_ASSIGNMENT_TTL", 300))
+)
@@ -0,0 +1,146 @@
+import logging
+import re
+from datetime import date
+from typing import Iterable, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from welearn_datastack.regular_expression import PROCESS_STATE_PARTITION_REGEX
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STATE_TABLE = "document_related.process_state"
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Get the first day of the month a number of months after (or before) a month
+    :param month: Starting month, the day is ignored
+    :param months: Number of months to add, negative to go back
+    :return: First day of the resulting month
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """
+    Name of the process_state partition of a month
+    :param month: Month of the partition, the day is ignored
+    :return: Partition name
+    """
+    return f"process_state_y{month.year:04d}m{month.month:02d}"
+
+
+def parse_partition_name(name: str) -> date | None:
+    """
+    Month of a process_state partition from its name
+    :param name: Partition name
+    :return: First day of the month, None if it's not a monthly partition
+    """
+    match = re.match(PROCESS_STATE_PARTITION_REGEX, name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def months_to_create(today: date, months_ahead: int) -> List[date]:
+    """
+    Months which must have a partition : the current one and the next ones
+    :param today: Current date
+    :param months_ahead: Number of months after the current one
+    :return: First day of each month
+    """
+    return [add_months(today, i) for i in range(months_ahead + 1)]
+
+
+def partitions_to_compact(
+    partitions: Iterable[str], today: date, retention_months: int
+) -> List[str]:
+    """
+    Partitions older than the retention : all their states were created before the first day of the month
+    retention_months months ago
+    :param partitions: Partitions names
+    :param today: Current date
+    :param retention_months: Number of months kept complete, the current one included
+    :return: Partitions names, oldest first
+    """
+    limit = add_months(today, -retention_months + 1)
+    months = {
+        name: month
+        for name in partitions
+        if (month := parse_partition_name(name)) is not None
+    }
+    return sorted(
+        (name for name, month in months.items() if add_months(month, 1) <= limit),
+        key=lambda name: months[name],
+    )
+
+
+def list_partitions(db_session: Session) -> List[str]:
+    """
+    Names of the partitions of process_state
+    :param db_session: Database session
+    :return: Partitions names
+    """
+    rows = db_session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table_name AS regclass)"
+        ),
+        {"table_name": PROCESS_STATE_TABLE},
+    )
+    return [row[0] for row in rows]
+
+
+def create_partition(db_session: Session, month: date) -> None:
+    """
+    Create the partition of a month if it doesn't exist. It fails if the default partition already contains states
+    of this month.
+    :param db_session: Database session
+    :param month: Month of the partition
+    """
+    start = add_months(month, 0)
+    end = add_months(month, 1)
+    db_session.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS document_related.{partition_name(start)} "
+            f"PARTITION OF {PROCESS_STATE_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+
+
+def compact_partition(db_session: Session, name: str, archive: bool) -> int:
+    """
+    Remove from a partition the states superseded by a more recent state of the same document in this partition, the
+    last state of each document is kept. The last state of a document overall is never removed.
+    :param db_session: Database session
+    :param name: Partition name
+    :param archive: Move the removed states to process_state_archive instead of deleting them
+    :return: Number of removed states
+    """
+    if parse_partition_name(name) is None:
+        raise ValueError(f"Not a process state partition: {name}")
+
+    # The name is validated by parse_partition_name (PROCESS_STATE_PARTITION_REGEX)
+    delete_superseded = f"""
+        DELETE FROM document_related.{name} ps
+        WHERE EXISTS (
+            SELECT 1 FROM document_related.{name} newer
+            WHERE newer.document_id = ps.document_id
+            AND newer.operation_order > ps.operation_order
+        )
+        RETURNING ps.id, ps.document_id, ps.title, ps.created_at, ps.operation_order
+        """  # nosec B608
+    if archive:
+        statement = f"""
+            WITH superseded AS ({delete_superseded})
+            INSERT INTO document_related.process_state_archive
+                (id, document_id, title, created_at, operation_order)
+            SELECT id, document_id, title, created_at, operation_order FROM superseded
+            """  # nosec B608
+    else:
+        statement = delete_superseded
+    return db_session.execute(text(statement)).rowcount
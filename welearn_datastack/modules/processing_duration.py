@@ -0,0 +1,130 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import batched
+from typing import Collection, Dict, List
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import WeLearnDocument
+
+from welearn_datastack.constants import IN_CLAUSE_CHUNK_SIZE
+from welearn_datastack.data.db_models import ProcessingDuration
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessingDurationRecorder:
+    """
+    Accumulate the time spent per corpus during a node run, to store it once at the end
+    """
+
+    def __init__(self, step: Step):
+        self.step = step
+        self.durations: Dict[UUID, float] = defaultdict(float)
+        self.documents_qty: Dict[UUID, int] = defaultdict(int)
+
+    def add(self, corpus_id: UUID, duration_seconds: float, documents_qty=1) -> None:
+        """
+        Record the time spent to process documents of a corpus
+        :param corpus_id: Corpus of the documents
+        :param duration_seconds: Time spent, in seconds
+        :param documents_qty: Number of documents processed in this time
+        """
+        self.durations[corpus_id] += duration_seconds
+        self.documents_qty[corpus_id] += documents_qty
+
+    def save(self, db_session: Session) -> List[ProcessingDuration]:
+        """
+        Add the recorded durations to the session, the session is not committed
+        :param db_session: Database session
+        :return: Records added to the session
+        """
+        records = [
+            ProcessingDuration(
+                id=uuid.uuid4(),
+                corpus_id=corpus_id,
+                title=self.step.value,
+                documents_qty=self.documents_qty[corpus_id],
+                duration_seconds=duration,
+            )
+            for corpus_id, duration in self.durations.items()
+            if self.documents_qty[corpus_id]
+        ]
+        db_session.add_all(records)
+        logger.info("'%s' processing durations were recorded", len(records))
+        return records
+
+
+def retrieve_mean_processing_durations(
+    db_session: Session, step: Step, since: datetime
+) -> Dict[UUID, float]:
+    """
+    Mean time spent per document for each corpus, on the records of a step since a date
+    :param db_session: Database session
+    :param step: Step reached by the documents when processed
+    :param since: Oldest records to take into account
+    :return: Mean duration in seconds per corpus id
+    """
+    rows = (
+        db_session.query(
+            ProcessingDuration.corpus_id,
+            func.sum(ProcessingDuration.duration_seconds),
+            func.sum(ProcessingDuration.documents_qty),
+        )
+        .filter(
+            ProcessingDuration.title == step.value,
+            ProcessingDuration.created_at >= since,
+        )
+        .group_by(ProcessingDuration.corpus_id)
+        .all()
+    )
+    return {
+        corpus_id: duration / documents_qty
+        for corpus_id, duration, documents_qty in rows
+        if documents_qty
+    }
+
+
+def estimate_documents_durations(
+    db_session: Session,
+    docids: Collection[str],
+    step: Step,
+    default_duration: float,
+    history_days: int = 30,
+) -> Dict[str, float]:
+    """
+    Estimate the time a node will spend on each document, from the mean duration of its corpus. Documents of a corpus
+    without history get the mean duration of all the corpora, or the default duration if there is no history at all.
+    :param db_session: Database session
+    :param docids: Ids of the documents, in the order of priority
+    :param step: Step reached by the documents when processed
+    :param default_duration: Duration used without history, in seconds
+    :param history_days: Number of days of history taken into account
+    :return: Estimated duration in seconds per document id, in the order of priority
+    """
+    means = retrieve_mean_processing_durations(
+        db_session, step, datetime.now() - timedelta(days=history_days)
+    )
+    fallback = sum(means.values()) / len(means) if means else default_duration
+    logger.info(
+        "Mean durations known for %s corpora, %s seconds for the others",
+        len(means),
+        fallback,
+    )
+
+    corpus_per_document: Dict[str, UUID] = {}
+    for chunk in batched(docids, IN_CLAUSE_CHUNK_SIZE):
+        corpus_per_document.update(
+            (str(doc_id), corpus_id)
+            for doc_id, corpus_id in db_session.query(
+                WeLearnDocument.id, WeLearnDocument.corpus_id
+            ).filter(WeLearnDocument.id.in_([UUID(str(d)) for d in chunk]))
+        )
+    return {
+        str(doc_id): means.get(corpus_per_document.get(str(doc_id)), fallback)  # type: ignore
+        for doc_id in docids
+    }
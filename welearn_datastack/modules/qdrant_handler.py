@@ -1,20 +1,31 @@
 import logging
-from typing import Collection, Dict, List, Set, Type
+import time
+from collections import Counter
+from typing import Collection, Dict, List, Sequence, Set, Type
 from uuid import UUID
 
 import numpy
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.grpc import UpdateResult
 from qdrant_client.http.models import models
+from sqlalchemy.orm import Session
 from welearn_database.data.models import DocumentSlice
 
-from welearn_datastack.exceptions import ErrorWhileDeletingChunks
+from welearn_datastack.exceptions import (
+    ErrorWhileDeletingChunks,
+    QdrantCollectionValidationError,
+)
+from welearn_datastack.modules.retrieve_data_from_database import (
+    retrieve_slices_sdgs,
+)
 
 logger = logging.getLogger(__name__)
 
 
 def classify_documents_per_collection(
-    qdrant_connector: QdrantClient, slices: Collection[Type[DocumentSlice]]
+    qdrant_connector: QdrantClient | None,
+    slices: Collection[Type[DocumentSlice]],
+    collections_names: Collection[str] | None = None,
 ) -> Dict[str | None, Set[UUID]]:
     """
     Classify documents per collection in Qdrant.
@@ -22,12 +33,17 @@ def classify_documents_per_collection(
     .. warning::
     It's return the last version of the collection
 
-    :param qdrant_connector: Qdrant client
+    :param qdrant_connector: Qdrant client, only used if collections_names is not given
     :param slices: List of slices
+    :param collections_names: Collections names already retrieved from Qdrant, avoid a call to the server
     :return: Dictionary with the collection names as keys and the document ids as values
     """
-    tmp_collections_names_in_qdrant = qdrant_connector.get_collections().collections
-    collections_names_in_qdrant = [c.name for c in tmp_collections_names_in_qdrant]
+    if collections_names is not None:
+        collections_names_in_qdrant = list(collections_names)
+    elif qdrant_connector is not None:
+        collections_names_in_qdrant = get_collections_names(qdrant_connector)
+    else:
+        raise ValueError("A Qdrant client or a list of collections names is needed")
 
     ret: Dict[str | None, Set[UUID]] = {None: set()}
     for dslice in slices:
@@ -65,6 +81,50 @@ def classify_documents_per_collection(
     return ret
 
 
+def get_collections_names(qdrant_connector: QdrantClient) -> List[str]:
+    """
+    Retrieve the names of all collections and aliases available in Qdrant
+    :param qdrant_connector: Qdrant client
+    :return: List of collections and aliases names
+    """
+    collections = qdrant_connector.get_collections().collections
+    aliases = qdrant_connector.get_aliases().aliases
+    return [c.name for c in collections] + [a.alias_name for a in aliases]
+
+
+async def async_get_collections_names(qdrant_connector: AsyncQdrantClient) -> List[str]:
+    """
+    Retrieve the names of all collections and aliases available in Qdrant
+    :param qdrant_connector: Async Qdrant client
+    :return: List of collections and aliases names
+    """
+    collections = await qdrant_connector.get_collections()
+    aliases = await qdrant_connector.get_aliases()
+    return [c.name for c in collections.collections] + [
+        a.alias_name for a in aliases.aliases
+    ]
+
+
+def _documents_ids_selector(documents_ids: List[UUID]) -> models.FilterSelector:
+    """
+    Build the points selector matching every point related to the given documents
+    :param documents_ids: Documents ids
+    :return: Filter selector on the document_id payload field
+    """
+    return models.FilterSelector(
+        filter=models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="document_id",
+                    match=models.MatchAny(
+                        any=[str(doc_id) for doc_id in documents_ids]
+                    ),
+                ),
+            ],
+        )
+    )
+
+
 def delete_points_related_to_document(
     collection_name: str,
     qdrant_connector: QdrantClient,
@@ -84,18 +144,7 @@ def delete_points_related_to_document(
     try:
         op_res = qdrant_connector.delete(
             collection_name=f"{collection_name}",
-            points_selector=models.FilterSelector(
-                filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="document_id",
-                            match=models.MatchAny(
-                                any=[str(doc_id) for doc_id in documents_ids]
-                            ),
-                        ),
-                    ],
-                )
-            ),
+            points_selector=_documents_ids_selector(documents_ids),
             wait=qdrant_wait,
         )
     except Exception as e:
@@ -111,6 +160,39 @@ def delete_points_related_to_document(
     return op_res
 
 
+async def async_delete_points_related_to_document(
+    collection_name: str,
+    qdrant_connector: AsyncQdrantClient,
+    documents_ids: List[UUID],
+    qdrant_wait: bool,
+) -> UpdateResult | None:
+    """
+    Deletes all points related to a document in a collection, async version of delete_points_related_to_document
+    :param qdrant_wait: Flag to wait for the insertion to be done
+    :param collection_name: Name of the collection
+    :param qdrant_connector: Async Qdrant connector
+    :param documents_ids: Urls of the documents to delete
+    """
+    logger.info("Deletion started")
+    logger.debug(f"Deleting points related to {documents_ids} in {collection_name}")
+
+    try:
+        op_res = await qdrant_connector.delete(
+            collection_name=f"{collection_name}",
+            points_selector=_documents_ids_selector(documents_ids),
+            wait=qdrant_wait,
+        )
+    except Exception as e:
+        raise ErrorWhileDeletingChunks(f"Error while deleting chunk: {e}")
+
+    if not op_res:
+        raise ErrorWhileDeletingChunks(
+            f"Error while deleting chunk, no answer from server"
+        )
+    logger.info("Deletion finished")
+    return op_res
+
+
 def convert_slice_in_qdrant_point(
     slice_to_convert: Type[DocumentSlice], document_sdgs: List[int], slice_sdg: int
 ) -> models.PointStruct:
@@ -136,3 +218,190 @@ def convert_slice_in_qdrant_point(
     )
 
     return ret
+
+
+def group_slices_per_document(
+    slices: Sequence[Type[DocumentSlice]],
+) -> Dict[UUID, List[Type[DocumentSlice]]]:
+    """
+    Group slices by document id
+    :param slices: Slices to group
+    :return: Dictionary with document id as key and its slices as value
+    """
+    slices_per_doc: Dict[UUID, List[Type[DocumentSlice]]] = {}
+    for s in slices:
+        if s.document_id not in slices_per_doc:
+            slices_per_doc[s.document_id] = []  # type: ignore
+        slices_per_doc[s.document_id].append(s)  # type: ignore
+    return slices_per_doc
+
+
+def build_points_for_documents(
+    db_session: Session,
+    docs_ids: Collection[UUID],
+    slices_per_doc: Dict[UUID, List[Type[DocumentSlice]]],
+) -> List[models.PointStruct]:
+    """
+    Convert the slices of the given documents in Qdrant points, slices without SDG are ignored
+    :param db_session: Database session
+    :param docs_ids: Documents to convert
+    :param slices_per_doc: Slices grouped by document id
+    :return: List of points ready to be upserted
+    """
+    points: List[models.PointStruct] = []
+    for docid in docs_ids:
+        document_slices = slices_per_doc.get(docid, [])
+        slices_sdgs = retrieve_slices_sdgs(db_session, document_slices)
+        all_document_sdgs = [
+            slices_sdgs[s.id]  # type: ignore
+            for s in document_slices
+            if s.id in slices_sdgs
+        ]
+        accurate_sdgs = [sdg for sdg, _ in Counter(all_document_sdgs).most_common(2)]
+        for doc_slice in document_slices:
+            # Filter slices with no SDG
+            if doc_slice.id in slices_sdgs:
+                points.append(
+                    convert_slice_in_qdrant_point(
+                        slice_to_convert=doc_slice,
+                        document_sdgs=accurate_sdgs,
+                        slice_sdg=slices_sdgs[doc_slice.id],  # type: ignore
+                    )
+                )
+    return points
+
+
+def get_alias_target(qdrant_connector: QdrantClient, alias_name: str) -> str | None:
+    """
+    Get the name of the collection an alias points to
+    :param qdrant_connector: Qdrant client
+    :param alias_name: Name of the alias
+    :return: Collection name or None if the alias doesn't exist
+    """
+    for alias in qdrant_connector.get_aliases().aliases:
+        if alias.alias_name == alias_name:
+            return alias.collection_name
+    return None
+
+
+def create_bulk_load_collection(
+    qdrant_connector: QdrantClient,
+    collection_name: str,
+    vectors_config: models.VectorParams,
+    hnsw_config: models.HnswConfigDiff | None = None,
+    quantization_config: models.ScalarQuantization | None = None,
+) -> None:
+    """
+    Create a collection tuned for bulk loading : indexing is disabled until enable_collection_indexing is called
+    :param qdrant_connector: Qdrant client
+    :param collection_name: Name of the collection to create
+    :param vectors_config: Vectors configuration of the collection
+    :param hnsw_config: HNSW configuration, server default if None
+    :param quantization_config: Quantization configuration, no quantization if None
+    """
+    if qdrant_connector.collection_exists(collection_name):
+        raise ValueError(f"Collection {collection_name} already exists")
+
+    logger.info("Create collection %s with indexing disabled", collection_name)
+    qdrant_connector.create_collection(
+        collection_name=collection_name,
+        vectors_config=vectors_config,
+        hnsw_config=hnsw_config,
+        quantization_config=quantization_config,
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+    )
+
+
+def enable_collection_indexing(
+    qdrant_connector: QdrantClient,
+    collection_name: str,
+    indexing_threshold: int,
+    timeout: int,
+    poll_interval: float = 2.0,
+) -> None:
+    """
+    Re-enable HNSW indexing on a collection and wait for the optimization to be done
+    :param qdrant_connector: Qdrant client
+    :param collection_name: Name of the collection
+    :param indexing_threshold: Indexing threshold (in kB) to set back
+    :param timeout: Max time to wait for the collection to be green, in seconds
+    :param poll_interval: Time between two status checks, in seconds
+    """
+    logger.info("Enable indexing on collection %s", collection_name)
+    qdrant_connector.update_collection(
+        collection_name=collection_name,
+        optimizers_config=models.OptimizersConfigDiff(
+            indexing_threshold=indexing_threshold
+        ),
+    )
+
+    deadline = time.monotonic() + timeout
+    while True:
+        status = qdrant_connector.get_collection(collection_name).status
+        if status == models.CollectionStatus.GREEN:
+            break
+        if time.monotonic() > deadline:
+            raise QdrantCollectionValidationError(
+                f"Collection {collection_name} is still {status} after {timeout}s"
+            )
+        logger.info("Collection %s status: %s, waiting", collection_name, status)
+        time.sleep(poll_interval)
+    logger.info("Collection %s indexed", collection_name)
+
+
+def validate_collection_points_count(
+    qdrant_connector: QdrantClient, collection_name: str, expected_count: int
+) -> None:
+    """
+    Check the quantity of points in a collection
+    :param qdrant_connector: Qdrant client
+    :param collection_name: Name of the collection
+    :param expected_count: Expected quantity of points
+    """
+    count = qdrant_connector.count(collection_name=collection_name, exact=True).count
+    logger.info(
+        "Collection %s contains %s points, %s expected",
+        collection_name,
+        count,
+        expected_count,
+    )
+    if count != expected_count:
+        raise QdrantCollectionValidationError(
+            f"Collection {collection_name} contains {count} points but {expected_count} were expected"
+        )
+
+
+def swap_collection_alias(
+    qdrant_connector: QdrantClient, alias_name: str, collection_name: str
+) -> str | None:
+    """
+    Atomically point an alias to a collection
+    :param qdrant_connector: Qdrant client
+    :param alias_name: Name of the alias
+    :param collection_name: Name of the collection the alias must point to
+    :return: Name of the collection previously pointed by the alias, None if the alias didn't exist
+    """
+    previous_target = get_alias_target(qdrant_connector, alias_name)
+    operations: List[
+        models.CreateAliasOperation
+        | models.DeleteAliasOperation
+        | models.RenameAliasOperation
+    ] = []
+    if previous_target is not None:
+        operations.append(
+            models.DeleteAliasOperation(
+                delete_alias=models.DeleteAlias(alias_name=alias_name)
+            )
+        )
+    operations.append(
+        models.CreateAliasOperation(
+            create_alias=models.CreateAlias(
+                collection_name=collection_name, alias_name=alias_name
+            )
+        )
+    )
+    qdrant_connector.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(
+        "Alias %s swapped from %s to %s", alias_name, previous_target, collection_name
+    )
+    return previous_target
@@ -0,0 +1,152 @@
+import logging
+from typing import Dict, List
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import models
+
+from welearn_datastack.data.qdrant_collection_spec import QdrantCollectionSpec
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_payload_indexes(
+    qdrant_connector: QdrantClient,
+    collection_name: str,
+    payload_indexes: Dict[str, models.PayloadSchemaType],
+) -> List[str]:
+    """
+    Create the missing payload indexes of a collection, indexes with a wrong type are recreated
+    :param qdrant_connector: Qdrant client
+    :param collection_name: Name of the collection
+    :param payload_indexes: Expected payload indexes, field name as key and schema type as value
+    :return: List of done actions
+    """
+    actions: List[str] = []
+    current_schema = qdrant_connector.get_collection(collection_name).payload_schema
+    for field_name, field_schema in payload_indexes.items():
+        current = current_schema.get(field_name)
+        if current is not None and current.data_type == field_schema:
+            continue
+        if current is not None:
+            qdrant_connector.delete_payload_index(
+                collection_name=collection_name, field_name=field_name, wait=True
+            )
+            actions.append(f"drop index {field_name} ({current.data_type.value})")
+        qdrant_connector.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+            wait=True,
+        )
+        actions.append(f"create index {field_name} ({field_schema.value})")
+    return actions
+
+
+def provision_collection(
+    qdrant_connector: QdrantClient, spec: QdrantCollectionSpec
+) -> List[str]:
+    """
+    Create or migrate a collection according to its specification. Calling it several times with the same
+    specification does nothing after the first call.
+
+    Vectors size and distance can't be migrated, the collection must be rebuilt to change them.
+
+    :param qdrant_connector: Qdrant client
+    :param spec: Specification of the collection
+    :return: List of done actions
+    """
+    actions: List[str] = []
+    if not qdrant_connector.collection_exists(spec.name):
+        qdrant_connector.create_collection(
+            collection_name=spec.name,
+            vectors_config=spec.vectors_config(),
+            hnsw_config=spec.hnsw_config(),
+            quantization_config=spec.quantization_config(),
+        )
+        actions.append("create collection")
+    else:
+        config = qdrant_connector.get_collection(spec.name).config
+        vectors = config.params.vectors
+        if not isinstance(vectors, models.VectorParams):
+            raise ValueError(f"Collection {spec.name} uses named vectors")
+        if vectors.size != spec.vector_size or vectors.distance != spec.distance:
+            raise ValueError(
+                f"Collection {spec.name} has vectors {vectors.size}/{vectors.distance}, "
+                f"{spec.vector_size}/{spec.distance} expected, it must be rebuilt"
+            )
+
+        update: dict = {}
+        if bool(vectors.on_disk) != spec.on_disk:
+            update["vectors_config"] = {
+                "": models.VectorParamsDiff(on_disk=spec.on_disk)
+            }
+            actions.append(f"set vectors on_disk to {spec.on_disk}")
+        if (
+            config.hnsw_config.m != spec.hnsw_m
+            or config.hnsw_config.ef_construct != spec.hnsw_ef_construct
+        ):
+            update["hnsw_config"] = spec.hnsw_config()
+            actions.append(
+                f"set hnsw to m={spec.hnsw_m} ef_construct={spec.hnsw_ef_construct}"
+            )
+        quantization = spec.quantization_config()
+        if config.quantization_config != quantization:
+            update["quantization_config"] = quantization or models.Disabled.DISABLED
+            actions.append(f"set quantization to {quantization}")
+        if update:
+            qdrant_connector.update_collection(collection_name=spec.name, **update)
+
+    actions.extend(
+        ensure_payload_indexes(qdrant_connector, spec.name, spec.payload_indexes)
+    )
+    logger.info("Collection %s provisioned: %s", spec.name, actions or "up to date")
+    return actions
+
+
+def build_index_coverage_report(
+    qdrant_connector: QdrantClient, specs: List[QdrantCollectionSpec]
+) -> List[dict]:
+    """
+    Report, per collection, the indexed payload fields and the missing ones according to the specifications
+    :param qdrant_connector: Qdrant client
+    :param specs: Specifications of the collections
+    :return: One JSON serializable report per collection
+    """
+    report: List[dict] = []
+    for spec in specs:
+        if not qdrant_connector.collection_exists(spec.name):
+            report.append({"collection": spec.name, "exists": False})
+            continue
+        info = qdrant_connector.get_collection(spec.name)
+        indexed = {
+            name: schema.data_type.value for name, schema in info.payload_schema.items()
+        }
+        vectors = info.config.params.vectors
+        report.append(
+            {
+                "collection": spec.name,
+                "exists": True,
+                "points_count": info.points_count,
+                "indexed_fields": indexed,
+                "missing_fields": [
+                    name
+                    for name, schema in spec.payload_indexes.items()
+                    if indexed.get(name) != schema.value
+                ],
+                "hnsw": {
+                    "m": info.config.hnsw_config.m,
+                    "ef_construct": info.config.hnsw_config.ef_construct,
+                },
+                "vectors_on_disk": (
+                    bool(vectors.on_disk)
+                    if isinstance(vectors, models.VectorParams)
+                    else None
+                ),
+                "quantization": (
+                    info.config.quantization_config.model_dump(mode="json")
+                    if info.config.quantization_config
+                    else None
+                ),
+            }
+        )
+    return report
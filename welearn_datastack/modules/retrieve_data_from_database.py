@@ -1,18 +1,28 @@
 import logging
+import os
 from datetime import datetime, timedelta
-from typing import Collection, Dict, List, Literal, Type, TypedDict
+from itertools import batched
+from typing import Collection, Dict, Iterator, List, Literal, Type
 from uuid import UUID
 
-from sqlalchemy import Column, desc
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    Float,
+    case,
+    cast,
+    desc,
+    select,
+    tablesample,
+    text,
+    tuple_,
+)
 from sqlalchemy.orm import Query
 from sqlalchemy.sql import and_, func
 from welearn_database.data.enumeration import Step
 from welearn_database.data.models import (
     BiClassifierModel,
     Corpus,
-    CorpusBiClassifierModel,
-    CorpusEmbeddingModel,
-    CorpusNClassifierModel,
     DocumentSlice,
     EmbeddingModel,
     NClassifierModel,
@@ -21,6 +31,8 @@ from welearn_database.data.models import (
     WeLearnDocument,
 )
 
+from welearn_datastack.constants import IN_CLAUSE_CHUNK_SIZE
+from welearn_datastack.data.db_models import DocumentSize, LatestProcessState
 from welearn_datastack.data.enumerations import (
     MLModelsType,
     URLRetrievalType,
@@ -28,16 +40,17 @@ from welearn_datastack.data.enumerations import (
 )
 from welearn_datastack.exceptions import NoModelFoundError
 from welearn_datastack.local_types import QuerySizeLimitDocument, QuerySizeLimitSlice
+from welearn_datastack.modules.models_assignment import (
+    ModelInfo,
+    models_assignment_resolver,
+)
+from welearn_datastack.utils_.database_utils import stream_query_results
+from welearn_datastack.utils_.manifest_utils import ManifestInfo
 
 logger = logging.getLogger(__name__)
 
 
 # Typing
-class ModelInfo(TypedDict):
-    model_id: UUID
-    model_name: str
-
-
 ModelsDict = Dict[UUID, ModelInfo]
 
 # logic
@@ -60,6 +73,88 @@ def _generate_process_state_sub_query(session):
     return subquery
 
 
+def _get_process_state_source() -> Type[ProcessState] | Type[LatestProcessState]:
+    """
+    Get the entity to query for the last process state of documents : the maintained latest_process_state table if
+    USE_LATEST_PROCESS_STATE is true, the full process state history otherwise.
+    Both entities have the same attributes (document_id, title, created_at, operation_order).
+    :return: ProcessState or LatestProcessState
+    """
+    if os.getenv("USE_LATEST_PROCESS_STATE", "False").lower() == "true":
+        return LatestProcessState
+    return ProcessState
+
+
+def _join_last_process_state(
+    session, query: Query, state: Type[ProcessState] | Type[LatestProcessState]
+) -> Query:
+    """
+    Restrict a query on process states to the last process state of each document. Only the full history needs
+    it, latest_process_state already contains one row per document.
+    :param session: DB session
+    :param query: Query selecting from state
+    :param state: Entity returned by _get_process_state_source
+    :return: Query
+    """
+    if state is LatestProcessState:
+        return query
+
+    subquery = _generate_process_state_sub_query(session)
+    return query.join(
+        subquery,
+        (state.document_id == subquery.c.document_id)
+        & (state.operation_order == subquery.c.operation_order),
+    )
+
+
+def _get_corpora_weights() -> Dict[str, float] | None:
+    """
+    Get the corpora weights for the corpus fair selection, from CORPUS_FAIR_SELECTION and CORPUS_WEIGHTS
+    (e.g. "wikipedia:3,openalex:1", the corpora not listed have a weight of 1).
+    :return: Weight per corpus name, None if the corpus fair selection is disabled
+    """
+    if os.getenv("CORPUS_FAIR_SELECTION", "False").lower() != "true":
+        return None
+
+    weights: Dict[str, float] = {}
+    for corpus_weight in filter(None, os.getenv("CORPUS_WEIGHTS", "").split(",")):
+        corpus_name, weight = corpus_weight.split(":")
+        weights[corpus_name.strip()] = float(weight)
+    return weights
+
+
+def _corpus_fair_rank(
+    session, corpus_id: Column, operation_order: Column
+) -> ColumnElement | None:
+    """
+    Rank of the documents inside their corpus, divided by the corpus weight. Ordering on it interleaves the corpora :
+    a corpus with a weight of 3 gets 3 documents for each document of a corpus with a weight of 1, whatever the size
+    of their backlogs.
+    :param session: DB session
+    :param corpus_id: Corpus id column of the query
+    :param operation_order: Operation order column of the query, the order inside each corpus
+    :return: Rank expression, None if the corpus fair selection is disabled
+    """
+    weights = _get_corpora_weights()
+    if weights is None:
+        return None
+
+    rank = cast(
+        func.row_number().over(partition_by=corpus_id, order_by=desc(operation_order)),
+        Float,
+    )
+    corpora_ids: Dict[UUID, float] = {
+        c_id: weights[source_name]
+        for c_id, source_name in session.query(Corpus.id, Corpus.source_name).filter(
+            Corpus.source_name.in_(weights)
+        )
+    }
+    if corpora_ids:
+        rank = rank / case(corpora_ids, value=corpus_id, else_=1.0)
+    logger.info("Corpus fair selection, weights : %s", weights)
+    return rank
+
+
 def _generate_query_size_limit(
     session, generated_query_goal: WeighedScope, corpus_name="*"
 ) -> Query:
@@ -69,44 +164,50 @@ def _generate_query_size_limit(
     :param corpus_name:
     :return:
     """
-    subquery = _generate_process_state_sub_query(session)
+    state = _get_process_state_source()
 
     if generated_query_goal == WeighedScope.DOCUMENT:
-        query = (
+        query = _join_last_process_state(
+            session,
             session.query(
-                ProcessState.document_id,
-                ProcessState.title,
-                func.octet_length(WeLearnDocument.full_content),
-            )
-            .join(
-                subquery,
-                (ProcessState.document_id == subquery.c.document_id)
-                & (ProcessState.operation_order == subquery.c.operation_order),
-            )
-            .join(WeLearnDocument, ProcessState.document_id == WeLearnDocument.id)
+                state.document_id,
+                state.title,
+                func.coalesce(
+                    DocumentSize.content_bytes,
+                    func.octet_length(WeLearnDocument.full_content),
+                ),
+            ),
+            state,
         )
+        query = query.join(
+            WeLearnDocument, state.document_id == WeLearnDocument.id
+        ).outerjoin(DocumentSize, state.document_id == DocumentSize.document_id)
     elif generated_query_goal == WeighedScope.SLICE:
         query = (
-            session.query(
-                ProcessState.document_id,
-                ProcessState.title,
-                func.octet_length(DocumentSlice.body),
-                func.octet_length(DocumentSlice.embedding),
-            )
-            .join(
-                subquery,
-                (ProcessState.document_id == subquery.c.document_id)
-                & (ProcessState.operation_order == subquery.c.operation_order),
+            _join_last_process_state(
+                session,
+                session.query(
+                    state.document_id,
+                    state.title,
+                    func.octet_length(DocumentSlice.body),
+                    func.octet_length(DocumentSlice.embedding),
+                ),
+                state,
             )
-            .join(DocumentSlice, ProcessState.document_id == DocumentSlice.document_id)
-            .order_by(ProcessState.document_id, desc(ProcessState.operation_order))
+            .join(DocumentSlice, state.document_id == DocumentSlice.document_id)
+            .order_by(state.document_id, desc(state.operation_order))
         )
     else:
         raise ValueError("Generated query goal not recognized")
 
     # Filter on corpus
     if corpus_name != "*":
-        query = query.join(Corpus).filter(Corpus.source_name == corpus_name)  # type: ignore
+        if state is LatestProcessState:
+            # Corpus is denormalized, filter is served by the (title, corpus_id) index
+            query = query.join(Corpus, state.corpus_id == Corpus.id)
+        else:
+            query = query.join(Corpus)  # type: ignore
+        query = query.filter(Corpus.source_name == corpus_name)
 
     return query
 
@@ -123,13 +224,19 @@ def retrieve_urls_ids(
     :return: List of url ids
     """
 
+    state = _get_process_state_source()
     query = _generate_query_size_limit(
         session=session,
         generated_query_goal=WeighedScope.DOCUMENT,
         corpus_name=corpus_name,
     )
 
-    query = query.order_by(desc(ProcessState.operation_order))
+    fair_rank = _corpus_fair_rank(
+        session, WeLearnDocument.corpus_id, state.operation_order
+    )
+    if fair_rank is not None:
+        query = query.order_by(fair_rank)
+    query = query.order_by(desc(state.operation_order))
 
     # Determine filter
     match mode:
@@ -138,7 +245,7 @@ def retrieve_urls_ids(
 
             # The last process state is url_retrieved
             query = query.filter(
-                ProcessState.title == "url_retrieved",
+                state.title == "url_retrieved",
             )
         case URLRetrievalType.UPDATE_MODE:
             logger.info("Retrieve updated URLs")
@@ -147,8 +254,8 @@ def retrieve_urls_ids(
             # Having at least 1 url_retrieved and other process flag
             query = query.filter(
                 and_(
-                    ProcessState.title == "document_in_qdrant",
-                    ProcessState.created_at < two_weeks_ago,
+                    state.title == "document_in_qdrant",
+                    state.created_at < two_weeks_ago,
                 )
             )
         case _:
@@ -182,6 +289,7 @@ def retrieve_documents_ids_according_process_title(
     :return: List of url ids
     """
     titles = [step.value for step in process_titles]
+    state = _get_process_state_source()
 
     query = _generate_query_size_limit(
         session=session,
@@ -189,76 +297,345 @@ def retrieve_documents_ids_according_process_title(
         generated_query_goal=weighed_scope,
     )
 
-    query = query.order_by(desc(ProcessState.operation_order))
+    query = query.filter(state.title.in_(titles))
 
-    # Retrieve data from DB If the weighed scope is document, the query will return a list of tuples with the
-    # document id, the process title and the size of the document.
-    # If the weighed scope is slice, the query will
-    # return a list of tuples with the document id, the process title, the size of the body and the size of the
-    # embedding.
-    db_data: List[QuerySizeLimitDocument] | List[QuerySizeLimitSlice] = (
-        query.filter(ProcessState.title.in_(titles)).limit(qty_max).all()
-    )
+    if size_total_max is None and _get_corpora_weights() is not None:
+        logger.info("No size limit set")
+        db_data = _generate_query_documents_sizes(  # type: ignore
+            session=session,
+            titles=titles,
+            corpus_name=corpus_name,
+            state=state,
+            weighed_scope=weighed_scope,
+            qty_max=qty_max,
+        ).all()
+    elif size_total_max is None:
+        logger.info("No size limit set")
+        # If the weighed scope is document, the query will return a list of tuples with the document id, the
+        # process title and the size of the document.
+        # If the weighed scope is slice, the query will return a list of tuples with the document id, the process
+        # title, the size of the body and the size of the embedding.
+        db_data: List[QuerySizeLimitDocument] | List[QuerySizeLimitSlice] = (
+            query.order_by(desc(state.operation_order)).limit(qty_max).all()
+        )
+    else:
+        logger.info("Filtering on total size, %s bytes max", size_total_max)
+        db_data = _apply_size_budget(  # type: ignore
+            session,
+            _generate_query_documents_sizes(
+                session=session,
+                titles=titles,
+                corpus_name=corpus_name,
+                state=state,
+                weighed_scope=weighed_scope,
+                qty_max=qty_max,
+            ),
+            size_total_max,
+        ).all()
     session.close()
 
-    # Filter on total size
-    if size_total_max is not None:
-        logger.info("Filtering on total size")
+    logger.info("Found %s results", len(db_data))
 
-        if weighed_scope == WeighedScope.DOCUMENT:
-            logger.info(
-                "Filtering on document size, every values are in bytes an concern the full_content field"
-            )
-            total_size = compute_total_size(db_data)
-        elif weighed_scope == WeighedScope.SLICE:
-            # Sum of body and embedding
-            logger.info(
-                "Filtering on slice size, evey values are in bytes an concern the body and embedding fields"
-            )
-            total_size = sum([x[2] + x[3] for x in db_data])  # type: ignore
+    return [str(x[0]) for x in db_data]
+
+
+def iter_documents_ids_according_process_title(
+    session,
+    process_titles: List[Step],
+    corpus_name="*",
+    qty_max: int | None = None,
+    page_size: int | None = None,
+) -> Iterator[str]:
+    """
+    Stream Document IDs from DB according to the last process title, most recent states first. Ids are read page per
+    page with a keyset pagination on (operation_order, document_id) and each page through a server-side cursor, so
+    only one page is held in memory whatever the number of documents.
+    The corpus fair selection and the size limits are not applied.
+    :param session: DB session
+    :param process_titles: List of process titles to retrieve
+    :param corpus_name: Name of corpus to retrieve
+    :param qty_max: Max number of ids to retrieve, all of them if None
+    :param page_size: Number of ids per page, STREAM_PAGE_SIZE if None
+    :return: Iterator of document ids
+    """
+    titles = [step.value for step in process_titles]
+    state = _get_process_state_source()
+    page_size = page_size or int(os.getenv("STREAM_PAGE_SIZE", 10000))
+
+    query = _join_last_process_state(
+        session, session.query(state.document_id, state.operation_order), state
+    ).filter(state.title.in_(titles))
+    if corpus_name != "*":
+        if state is LatestProcessState:
+            query = query.join(Corpus, state.corpus_id == Corpus.id)
         else:
-            raise ValueError("Weighed scope not recognized")
-
-        # If total size is bigger than the limit, filter
-        if total_size > size_total_max:
-            logger.info("Total size of the batch is too big, filtering")
-            size_accumulated = 0
-            db_data_filtered = []
-            for doc in db_data:
-                if weighed_scope == WeighedScope.DOCUMENT:
-                    size = doc[2] or 0
-                elif weighed_scope == WeighedScope.SLICE:
-                    # Sum of body and embedding
-                    size = (doc[2] or 0) + (doc[3] or 0)  # type: ignore
-                else:
-                    raise ValueError("Weighed scope not recognized")
-
-                if size_accumulated + size > size_total_max:
-                    break
-
-                size_accumulated += size
-                db_data_filtered.append(doc)
-            logger.info(
-                "Filtered batch size: %s", sum([x[2] for x in db_data_filtered])
+            query = query.join(
+                WeLearnDocument, state.document_id == WeLearnDocument.id
+            ).join(Corpus, WeLearnDocument.corpus_id == Corpus.id)
+        query = query.filter(Corpus.source_name == corpus_name)
+    query = query.order_by(desc(state.operation_order), desc(state.document_id))
+
+    last_key: tuple | None = None
+    retrieved = 0
+    while qty_max is None or retrieved < qty_max:
+        page = query
+        if last_key is not None:
+            page = page.filter(
+                tuple_(state.operation_order, state.document_id) < tuple_(*last_key)
+            )
+        limit = page_size if qty_max is None else min(page_size, qty_max - retrieved)
+
+        page_len = 0
+        for document_id, operation_order in stream_query_results(page.limit(limit)):
+            page_len += 1
+            last_key = (operation_order, document_id)
+            yield str(document_id)
+
+        retrieved += page_len
+        logger.info("%s ids streamed", retrieved)
+        if page_len < limit:
+            break
+
+
+def _generate_query_documents_sizes(
+    session,
+    titles: List[str],
+    corpus_name: str,
+    state: Type[ProcessState] | Type[LatestProcessState],
+    weighed_scope: WeighedScope,
+    qty_max: int | None,
+) -> Query:
+    """
+    Generate query returning the documents in the order of their last process states (interleaved by corpus with the
+    corpus fair selection), with their size.
+    Sizes are read from document_size, they're measured on the contents only for the documents without stored size.
+    :param session: DB session
+    :param titles: Process titles to retrieve
+    :param corpus_name: Name of corpus to retrieve
+    :param state: Entity returned by _get_process_state_source
+    :param weighed_scope: Weighed scope of the query (document or slice)
+    :param qty_max: Max number of documents to retrieve
+    :return: Query returning the documents ids, the operation order of their last state and their size, plus their
+    priority with the corpus fair selection
+    """
+    query = _generate_query_size_limit(
+        session=session,
+        corpus_name=corpus_name,
+        generated_query_goal=WeighedScope.DOCUMENT,
+    ).filter(state.title.in_(titles))
+
+    if weighed_scope == WeighedScope.DOCUMENT:
+        logger.info("Document size is the size of the full_content field")
+        size = func.coalesce(
+            DocumentSize.content_bytes,
+            func.octet_length(WeLearnDocument.full_content),
+            0,
+        )
+    elif weighed_scope == WeighedScope.SLICE:
+        logger.info("Document size is the sum of its slices body and embedding fields")
+        measured_slices_size = (
+            session.query(
+                func.sum(
+                    func.coalesce(func.octet_length(DocumentSlice.body), 0)
+                    + func.coalesce(func.octet_length(DocumentSlice.embedding), 0)
+                )
             )
-            logger.info("Batch size: %s Bytes", size_accumulated)
-            db_data = db_data_filtered  # type: ignore
+            .filter(DocumentSlice.document_id == state.document_id)
+            .scalar_subquery()
+        )
+        size = func.coalesce(DocumentSize.slice_bytes, measured_slices_size)
+        # Same as the join on slices : documents without slice are not weighed
+        query = query.filter(
+            session.query(DocumentSlice.id)
+            .filter(DocumentSlice.document_id == state.document_id)
+            .exists()
+        )
     else:
-        logger.info("No size limit set")
+        raise ValueError("Weighed scope not recognized")
+
+    entities = [
+        state.document_id.label("document_id"),
+        state.operation_order.label("operation_order"),
+        size.label("size"),
+    ]
+    order: List = [desc(state.operation_order), state.document_id]
+    fair_rank = _corpus_fair_rank(
+        session, WeLearnDocument.corpus_id, state.operation_order
+    )
+    if fair_rank is not None:
+        entities.append(fair_rank.label("priority"))
+        order.insert(0, fair_rank)
+
+    return query.with_entities(*entities).order_by(*order).limit(qty_max)
+
+
+def _apply_size_budget(session, sizes_query: Query, size_total_max: int) -> Query:
+    """
+    Keep, in the order of the sizes query, the documents whose cumulated size fits in the budget. The budget
+    is applied in the database with a running sum, so only the kept documents are returned.
+    :param session: DB session
+    :param sizes_query: Query generated by _generate_query_documents_sizes
+    :param size_total_max: Max size of the batch, in bytes
+    :return: Query returning the kept documents ids, their running size and their size
+    """
+    candidates = sizes_query.subquery()
+    order: List = [desc(candidates.c.operation_order), candidates.c.document_id]
+    if "priority" in candidates.c:
+        order.insert(0, candidates.c.priority)
+
+    running = (
+        session.query(
+            candidates.c.document_id,
+            func.sum(candidates.c.size).over(order_by=order).label("running_size"),
+            candidates.c.size,
+        )
+    ).subquery()
+
+    return (
+        session.query(running.c.document_id, running.c.running_size, running.c.size)
+        .filter(running.c.running_size <= size_total_max)
+        .order_by(running.c.running_size)
+    )
+
+
+def retrieve_documents_sizes_according_process_title(
+    session,
+    process_titles: List[Step],
+    weighed_scope: WeighedScope,
+    corpus_name="*",
+    qty_max=100,
+    size_total_max: int | None = None,
+) -> Dict[str, int]:
+    """
+    Get Document IDs from DB according to the last process title, with their size to weight the batches
+    :param session: DB session
+    :param process_titles: List of process titles to retrieve
+    :param weighed_scope: Weighed scope of the query (document or slice)
+    :param corpus_name: Name of corpus to retrieve
+    :param qty_max: Max number of documents to retrieve
+    :param size_total_max: Max size of all the documents, in bytes
+    :return: Size in bytes per document id, in the order of the last process states
+    """
+    titles = [step.value for step in process_titles]
+    state = _get_process_state_source()
+
+    query = _generate_query_documents_sizes(
+        session=session,
+        titles=titles,
+        corpus_name=corpus_name,
+        state=state,
+        weighed_scope=weighed_scope,
+        qty_max=qty_max,
+    )
+    if size_total_max is not None:
+        logger.info("Filtering on total size, %s bytes max", size_total_max)
+        query = _apply_size_budget(session, query, size_total_max)
+
+    db_data = query.all()
+    session.close()
 
     logger.info("Found %s results", len(db_data))
 
-    return [str(x[0]) for x in db_data]
+    return {str(x.document_id): int(x.size or 0) for x in db_data}
 
 
-def compute_total_size(
-    db_data: list[tuple[UUID, str, int]] | list[tuple[UUID, str, int, int]],
-) -> int:
-    ret = 0
-    for x in db_data:
-        if x[2]:
-            ret += x[2]
-    return ret
+def _get_random_sampling_method() -> str | None:
+    """
+    Get the TABLESAMPLE method used to pick random documents, from RANDOM_SAMPLING_METHOD : SYSTEM (pages), BERNOULLI
+    (rows) or nothing to sort all the candidates by random()
+    :return: Sampling method or None
+    """
+    method = os.getenv("RANDOM_SAMPLING_METHOD", "").upper()
+    if method in ("SYSTEM", "BERNOULLI"):
+        return method
+    return None
+
+
+def _estimate_rows_count(session, table) -> int:
+    """
+    Estimate the number of rows of a table from the PostgreSQL statistics, without counting them
+    :param session: DB session
+    :param table: Table to estimate
+    :return: Estimated number of rows, 0 if the table was never analyzed
+    """
+    rows_count = session.execute(
+        text(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table_name AS regclass)"
+        ),
+        {"table_name": table.fullname},
+    ).scalar()
+    return max(rows_count or 0, 0)
+
+
+def _next_sample_percent(
+    percent: float, found: int, qty_max: int, oversampling: float
+) -> float:
+    """
+    Compute the sample size of the next attempt when a sample didn't contain enough candidates. The share of candidates
+    in the table is estimated from the last sample, without any candidate the sample is 10 times larger.
+    :param percent: Percentage of the table sampled by the last attempt
+    :param found: Number of candidates found in the last sample
+    :param qty_max: Number of documents wanted
+    :param oversampling: Margin applied to the estimated sample size
+    :return: Percentage of the table to sample, 100 means the whole table
+    """
+    if found:
+        next_percent = percent * qty_max * oversampling / found
+    else:
+        next_percent = percent * 10
+    return min(100.0, max(next_percent, percent * 2))
+
+
+def _filter_on_sample(query: Query, method: str, percent: float) -> Query:
+    """
+    Keep the documents of a TABLESAMPLE of the document table in a query
+    :param query: Query on the last process states
+    :param method: SYSTEM or BERNOULLI
+    :param percent: Percentage of the table to sample
+    :return: Filtered query
+    """
+    state = _get_process_state_source()
+    sample = tablesample(
+        WeLearnDocument.__table__,  # type: ignore
+        getattr(func, method.lower())(percent),
+    )
+    return query.filter(state.document_id.in_(select(sample.c.id)))
+
+
+def _retrieve_sampled_documents(
+    session, query: Query, method: str, qty_max: int
+) -> List:
+    """
+    Pick random rows of a query from growing samples of the document table, only the sample is sorted by random().
+    The first sample is sized from the estimated number of documents, the next ones from the share of candidates found,
+    the whole query is sorted as before when the sample would cover the whole table.
+    :param session: DB session
+    :param query: Query on the last process states, already filtered
+    :param method: SYSTEM or BERNOULLI
+    :param qty_max: Number of rows wanted
+    :return: Random rows of the query
+    """
+    oversampling = float(os.getenv("RANDOM_SAMPLING_OVERSAMPLING", 3))
+    rows_count = _estimate_rows_count(session, WeLearnDocument.__table__)
+    percent = (
+        min(100.0, 100.0 * qty_max * oversampling / rows_count) if rows_count else 100.0
+    )
+
+    while percent < 100:
+        db_data = (
+            _filter_on_sample(query, method, percent)
+            .order_by(func.random())
+            .limit(qty_max)
+            .all()
+        )
+        if len(db_data) >= qty_max:
+            return db_data
+        logger.info(
+            "%s/%s documents found in a %s%% sample", len(db_data), qty_max, percent
+        )
+        percent = _next_sample_percent(percent, len(db_data), qty_max, oversampling)
+
+    return query.order_by(func.random()).limit(qty_max).all()
 
 
 def retrieve_random_documents_ids_according_process_title(
@@ -276,6 +653,7 @@ def retrieve_random_documents_ids_according_process_title(
     :return: List of url ids
     """
     titles = [step.value for step in process_titles]
+    state = _get_process_state_source()
 
     query = _generate_query_size_limit(
         session=session,
@@ -283,13 +661,15 @@ def retrieve_random_documents_ids_according_process_title(
         generated_query_goal=WeighedScope.DOCUMENT,
     )
 
+    query = query.filter(state.title.in_(titles))
+    sampling_method = _get_random_sampling_method()
+
     # Retrieve random data from DB
-    db_data: List[QuerySizeLimitDocument] | List[QuerySizeLimitSlice] = (
-        query.filter(ProcessState.title.in_(titles))
-        .order_by(func.random())
-        .limit(qty_max)
-        .all()
-    )
+    db_data: List[QuerySizeLimitDocument] | List[QuerySizeLimitSlice]
+    if sampling_method and session.get_bind().dialect.name == "postgresql":
+        db_data = _retrieve_sampled_documents(session, query, sampling_method, qty_max)
+    else:
+        db_data = query.order_by(func.random()).limit(qty_max).all()
 
     logger.info("Found %s results", len(db_data))
 
@@ -301,71 +681,28 @@ def retrieve_models(
 ) -> ModelsDict:
     """
     Retrieve the most recent model (per document) based on corpus and used_since.
+    The model in use only depends on the corpus and the language of the document, it's resolved from the cached
+    models assignment instead of being computed for each document.
 
     :param documents_ids: List of document UUIDs
     :param db_session: DB session
     :param ml_type: Type of model to retrieve (BI_CLASSIFIER or N_CLASSIFIER)
     :return: Dict with UUID in key and model name in value
     """
-    if ml_type == MLModelsType.BI_CLASSIFIER:
-        model_table = BiClassifierModel  # type: ignore
-        join_table = CorpusBiClassifierModel  # type: ignore
-        relation_field = join_table.bi_classifier_model_id  # type: ignore
-    elif ml_type == MLModelsType.N_CLASSIFIER:
-        model_table = NClassifierModel  # type: ignore
-        join_table = CorpusNClassifierModel  # type: ignore
-        relation_field = join_table.n_classifier_model_id  # type: ignore
-    elif ml_type == MLModelsType.EMBEDDING:
-        model_table = EmbeddingModel  # type: ignore
-        join_table = CorpusEmbeddingModel  # type: ignore
-        relation_field = join_table.embedding_model_id  # type: ignore
-    else:
-        raise ValueError("ML type not recognized")
-
-    # Subquery to get the most recent model for each document based on used_since
-    # and partition by document id and corpus id
-    # We use row_number to get the most recent model per document
-    # and corpus, ordered by used_since in descending order.
-    # We use a subquery to filter the results later
-    subquery = (
-        db_session.query(
-            WeLearnDocument.id.label("document_id"),
-            join_table.used_since,
-            model_table.id.label("model_id"),
-            model_table.title.label("model_title"),
-            model_table.lang,
-            func.row_number()
-            .over(
-                partition_by=(WeLearnDocument.id, WeLearnDocument.corpus_id),
-                order_by=desc(join_table.used_since),
-            )
-            .label("rn"),
-        )
-        .join(join_table, join_table.corpus_id == WeLearnDocument.corpus_id)
-        .join(model_table, model_table.id == relation_field)
-        .filter(
-            WeLearnDocument.id.in_(documents_ids),
-            model_table.lang == WeLearnDocument.lang,
-        )
-    ).subquery()
-
-    # Main query to filter the subquery results where rn = 1
-    # This means we only keep the most recent model for each document
-    query = db_session.query(
-        subquery.c.document_id,
-        subquery.c.model_id,
-        subquery.c.model_title,
-    ).filter(subquery.c.rn == 1)
+    assignment = models_assignment_resolver.get(db_session, ml_type)
+    if not assignment:
+        return {}
 
-    # List of (document_id, model_id, model_title)
-    ret_from_db = query.all()
+    # List of (document_id, corpus_id, lang)
+    documents = db_session.query(
+        WeLearnDocument.id, WeLearnDocument.corpus_id, WeLearnDocument.lang
+    ).filter(WeLearnDocument.id.in_(documents_ids))
 
     ret: ModelsDict = {}
-    for i in ret_from_db:
-        ret[i[0]] = {
-            "model_id": i[1],
-            "model_name": i[2],
-        }
+    for document_id, corpus_id, lang in documents:
+        model = assignment.get((corpus_id, lang))
+        if model:
+            ret[document_id] = model
 
     return ret
 
@@ -382,27 +719,62 @@ def check_process_state_for_documents(
     :return: List of documents IDs with the last step in steps
     """
     steps_in_str = [step.value for step in steps]
-
-    subquery = _generate_process_state_sub_query(db_session)
+    state = _get_process_state_source()
 
     # Return docs ids with the last step in steps
-    query = (
-        db_session.query(ProcessState.document_id)
-        .join(
-            subquery,
-            (ProcessState.document_id == subquery.c.document_id)
-            & (ProcessState.operation_order == subquery.c.operation_order),
-        )
-        .filter(
-            ProcessState.title.in_(steps_in_str),
-            ProcessState.document_id.in_(documents_ids),
-        )
+    query = _join_last_process_state(
+        db_session, db_session.query(state.document_id), state
+    ).filter(
+        state.title.in_(steps_in_str),
+        state.document_id.in_(documents_ids),
     )
 
     docs_ids = [x[0] for x in query.all()]
     return docs_ids
 
 
+def retrieve_documents_manifest_info(
+    db_session, documents_ids: Collection[str]
+) -> Dict[str, ManifestInfo]:
+    """
+    Retrieve the corpus, the size and the last process title of documents, for the binary batch manifests. The
+    documents are queried by chunks of IN_CLAUSE_CHUNK_SIZE ids.
+
+    :param db_session: Database session
+    :param documents_ids: Documents IDs
+    :return: Manifest info per document id
+    """
+    state = _get_process_state_source()
+    query = (
+        _join_last_process_state(
+            db_session,
+            db_session.query(
+                state.document_id,
+                state.title,
+                Corpus.source_name,
+                func.coalesce(
+                    DocumentSize.content_bytes,
+                    func.octet_length(WeLearnDocument.full_content),
+                    0,
+                ),
+            ),
+            state,
+        )
+        .join(WeLearnDocument, state.document_id == WeLearnDocument.id)
+        .join(Corpus, WeLearnDocument.corpus_id == Corpus.id)
+        .outerjoin(DocumentSize, state.document_id == DocumentSize.document_id)
+    )
+
+    ret: Dict[str, ManifestInfo] = {}
+    for chunk in batched(documents_ids, IN_CLAUSE_CHUNK_SIZE):
+        chunk_query = query.filter(state.document_id.in_([UUID(str(d)) for d in chunk]))
+        for document_id, title, corpus_name, size in chunk_query.all():
+            ret[str(document_id)] = ManifestInfo(
+                corpus=corpus_name, size=size, step=title
+            )
+    return ret
+
+
 def retrieve_slices_sdgs(
     db_session, slices: Collection[Type[DocumentSlice]]
 ) -> Dict[UUID | Column["UUID"], int]:
@@ -464,3 +836,104 @@ def get_model_classification_model_by_id(
     raise NoModelFoundError(
         f"Model not found in the database according this id : {model_id}"
     )
+
+
+def _generate_collection_slices_query(
+    db_session,
+    embedding_model_title: str,
+    lang: str | None,
+    process_titles: List[Step],
+) -> Query:
+    """
+    Generate query on the slices belonging to a Qdrant collection : slices embedded with the given model, classified
+    with an SDG and whose document last process state is in process_titles
+    :param db_session: DB session
+    :param embedding_model_title: Title of the embedding model of the collection
+    :param lang: Language of the collection, None for a multilingual collection
+    :param process_titles: Accepted last process titles
+    :return: Query, without selected entities
+    """
+    titles = [step.value for step in process_titles]
+    state = _get_process_state_source()
+
+    query = _join_last_process_state(
+        db_session,
+        db_session.query()
+        .select_from(DocumentSlice)
+        .join(EmbeddingModel, DocumentSlice.embedding_model_id == EmbeddingModel.id)
+        .join(WeLearnDocument, DocumentSlice.document_id == WeLearnDocument.id)
+        .join(Sdg, Sdg.slice_id == DocumentSlice.id)
+        .join(state, state.document_id == DocumentSlice.document_id),
+        state,
+    ).filter(
+        EmbeddingModel.title == embedding_model_title,
+        state.title.in_(titles),
+    )
+    if lang is not None:
+        query = query.filter(WeLearnDocument.lang == lang)
+    return query
+
+
+def retrieve_documents_ids_for_collection(
+    db_session,
+    embedding_model_title: str,
+    lang: str | None,
+    process_titles: List[Step],
+    documents_ids: Collection[UUID] | None = None,
+) -> List[UUID]:
+    """
+    Get the ids of the documents which must be in a Qdrant collection
+
+    :param db_session: DB session
+    :param embedding_model_title: Title of the embedding model of the collection
+    :param lang: Language of the collection, None for a multilingual collection
+    :param process_titles: Accepted last process titles
+    :param documents_ids: Restrict the search to these documents
+    :return: List of documents ids
+    """
+    query = _generate_collection_slices_query(
+        db_session, embedding_model_title, lang, process_titles
+    ).with_entities(DocumentSlice.document_id)
+    if documents_ids is not None:
+        query = query.filter(DocumentSlice.document_id.in_(documents_ids))
+
+    ret = [x[0] for x in stream_query_results(query.distinct())]
+    logger.info("Found %s documents for collection", len(ret))
+    return ret
+
+
+def count_slices_for_collection(
+    db_session,
+    embedding_model_title: str,
+    lang: str | None,
+    process_titles: List[Step],
+) -> int:
+    """
+    Count the slices which must be in a Qdrant collection, i.e. the expected quantity of points
+
+    :param db_session: DB session
+    :param embedding_model_title: Title of the embedding model of the collection
+    :param lang: Language of the collection, None for a multilingual collection
+    :param process_titles: Accepted last process titles
+    :return: Quantity of slices
+    """
+    query = _generate_collection_slices_query(
+        db_session, embedding_model_title, lang, process_titles
+    ).with_entities(func.count(func.distinct(DocumentSlice.id)))
+    return query.scalar() or 0
+
+
+def retrieve_documents_ids_with_state_since(db_session, since: datetime) -> List[UUID]:
+    """
+    Get the ids of the documents with at least one process state created since the given date
+
+    :param db_session: DB session
+    :param since: Date from which process states are considered
+    :return: List of documents ids
+    """
+    query = (
+        db_session.query(ProcessState.document_id)
+        .filter(ProcessState.created_at >= since)
+        .distinct()
+    )
+    return [x[0] for x in query.all()]
@@ -5,6 +5,12 @@ from pathlib import Path
 from typing import List
 from uuid import UUID
 
+from welearn_datastack.utils_.manifest_utils import (
+    MANIFEST_SUFFIX,
+    manifest_ids,
+    read_manifest,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,3 +29,26 @@ def retrieve_ids_from_csv(input_artifact: str, input_directory: Path) -> List[UU
         ids_urls: List[UUID] = [uuid.UUID(row[0]) for row in spamreader]
         logger.info("'%s' IDs URLs were retrieved", len(ids_urls))
     return ids_urls
+
+
+def retrieve_ids_from_artifact(
+    input_artifact: str, input_directory: Path
+) -> List[UUID]:
+    """
+    Retrieve IDs from a batch file, a binary manifest (.npy) or a CSV file. When the CSV file is missing, the manifest
+    with the same name is read instead.
+    :param input_artifact: Path to the input file
+    :param input_directory: Path to the local artifacts folder
+    :return: IDs
+    """
+    artifact_path = input_directory / input_artifact
+    manifest_path = artifact_path.with_suffix(MANIFEST_SUFFIX)
+    if artifact_path.suffix != MANIFEST_SUFFIX and (
+        artifact_path.exists() or not manifest_path.exists()
+    ):
+        return retrieve_ids_from_csv(input_artifact, input_directory)
+
+    logger.info("Retrieve IDs from manifest")
+    ids = manifest_ids(read_manifest(manifest_path))
+    logger.info("'%s' IDs were retrieved", len(ids))
+    return ids
@@ -0,0 +1,148 @@
+import io
+import logging
+import os
+import uuid
+from typing import Any, Collection, Dict, List
+from uuid import UUID
+
+from sqlalchemy import Table, insert
+from sqlalchemy.orm import Session
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import ErrorRetrieval, ProcessState
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STATE_COLUMNS = ("id", "document_id", "title")
+ERROR_RETRIEVAL_COLUMNS = ("id", "document_id", "http_error_code", "error_info")
+
+
+def _to_copy_text(value: Any) -> str:
+    """
+    Format a value for the text format of COPY
+    :param value: Value to format
+    :return: Formatted value
+    """
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(
+    db_session: Session, table: Table, columns: Collection[str], rows: List[tuple]
+) -> None:
+    """
+    Insert rows in the transaction of the session, with COPY on PostgreSQL and a multi-row INSERT otherwise
+    :param db_session: Database session
+    :param table: Table to insert in
+    :param columns: Names of the columns, in the order of the values of the rows
+    :param rows: Values of the rows
+    """
+    connection = db_session.connection()
+    driver = connection.dialect.driver
+    statement = f"COPY {table.fullname} ({', '.join(columns)}) FROM STDIN"
+
+    if driver == "psycopg":
+        with connection.connection.driver_connection.cursor() as cursor:  # type: ignore
+            with cursor.copy(statement) as copy:
+                for row in rows:
+                    copy.write_row(row)
+    elif driver == "psycopg2":
+        lines = "".join("\t".join(_to_copy_text(v) for v in row) + "\n" for row in rows)
+        with connection.connection.driver_connection.cursor() as cursor:  # type: ignore
+            cursor.copy_expert(statement, io.StringIO(lines))
+    else:
+        connection.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+class StateWriter:
+    """
+    Buffer the process states and retrieval errors of a node and write them in bulk, in chunks of chunk_size rows.
+    Rows are written in the transaction of the session, committing stays the responsibility of the node.
+    """
+
+    def __init__(self, db_session: Session, chunk_size: int | None = None):
+        self.db_session = db_session
+        self.chunk_size = chunk_size or int(os.getenv("STATE_WRITER_CHUNK_SIZE", 5000))
+        self.states: List[tuple] = []
+        self.errors: List[tuple] = []
+        self.written: Dict[str, int] = {"states": 0, "errors": 0}
+
+    def add_state(self, document_id: UUID, step: Step | str) -> None:
+        """
+        Buffer a new process state for a document
+        :param document_id: Document id
+        :param step: Step reached by the document
+        """
+        title = step.value if isinstance(step, Step) else step
+        self.states.append((uuid.uuid4(), document_id, title))
+        if len(self.states) >= self.chunk_size:
+            self.flush()
+
+    def add_states(self, documents_ids: Collection[UUID], step: Step | str) -> None:
+        """
+        Buffer a new process state for each given document
+        :param documents_ids: Documents ids
+        :param step: Step reached by the documents
+        """
+        for document_id in documents_ids:
+            self.add_state(document_id, step)
+
+    def add_error(
+        self,
+        document_id: UUID,
+        http_error_code: int | None = None,
+        error_info: str | None = None,
+    ) -> None:
+        """
+        Buffer a retrieval error for a document
+        :param document_id: Document id
+        :param http_error_code: HTTP code returned when retrieving the document
+        :param error_info: Description of the error
+        """
+        self.errors.append((uuid.uuid4(), document_id, http_error_code, error_info))
+        if len(self.errors) >= self.chunk_size:
+            self.flush()
+
+    def add_error_retrieval(self, error: ErrorRetrieval) -> None:
+        """
+        Buffer a retrieval error built as an ORM object
+        :param error: Error to write
+        """
+        self.add_error(error.document_id, error.http_error_code, error.error_info)  # type: ignore
+
+    def flush(self) -> None:
+        """
+        Write the buffered rows. Pending ORM objects are flushed first, so the rows are written after them.
+        """
+        if not self.states and not self.errors:
+            return
+        self.db_session.flush()
+        if self.states:
+            copy_rows(
+                self.db_session,
+                ProcessState.__table__,  # type: ignore
+                PROCESS_STATE_COLUMNS,
+                self.states,
+            )
+            self.written["states"] += len(self.states)
+            self.states = []
+        if self.errors:
+            copy_rows(
+                self.db_session,
+                ErrorRetrieval.__table__,  # type: ignore
+                ERROR_RETRIEVAL_COLUMNS,
+                self.errors,
+            )
+            self.written["errors"] += len(self.errors)
+            self.errors = []
+        logger.info(
+            "'%s' process states and '%s' errors were written",
+            self.written["states"],
+            self.written["errors"],
+        )
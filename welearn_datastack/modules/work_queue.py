@@ -0,0 +1,231 @@
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from itertools import batched
+from pathlib import Path
+from typing import Collection, Iterator, List
+from uuid import UUID
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from welearn_datastack.constants import IN_CLAUSE_CHUNK_SIZE
+from welearn_datastack.data.db_models import WorkQueueItem
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_documents(
+    db_session: Session,
+    queue_name: str,
+    docids: Collection[UUID | str],
+    reset_attempts: bool = False,
+) -> None:
+    """
+    Add documents to a queue, documents already waiting in the queue keep their place and their attempts, so a
+    document which always fails is claimed at most max_attempts times. The ids are inserted by chunks, to stay under
+    the bind parameters limit of the database.
+    :param db_session: Database session
+    :param queue_name: Name of the queue
+    :param docids: Ids of the documents to enqueue
+    :param reset_attempts: Requeue the documents already in the queue, unless they are being processed : their
+    attempts and lease are reset, so documents which exhausted their attempts are claimed again
+    """
+    if not docids:
+        return
+
+    dialect_insert = (
+        sqlite.insert
+        if db_session.get_bind().dialect.name == "sqlite"
+        else postgresql.insert
+    )
+    now = datetime.now()
+    index_elements = [WorkQueueItem.queue_name, WorkQueueItem.document_id]
+    # Each row binds 3 parameters
+    for chunk in batched(docids, IN_CLAUSE_CHUNK_SIZE // 3):
+        stmt = dialect_insert(WorkQueueItem).values(
+            [
+                {
+                    "queue_name": queue_name,
+                    "document_id": UUID(str(doc_id)),
+                    "enqueued_at": now,
+                }
+                for doc_id in chunk
+            ]
+        )
+        if reset_attempts:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={"attempts": 0, "claimed_by": None, "lease_expires_at": None},
+                where=or_(
+                    WorkQueueItem.lease_expires_at.is_(None),
+                    WorkQueueItem.lease_expires_at < now,
+                ),
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        db_session.execute(stmt)
+    db_session.commit()
+    logger.info("'%s' documents were enqueued in %s", len(docids), queue_name)
+
+
+def claim_documents(
+    db_session: Session,
+    queue_name: str,
+    worker_id: str,
+    qty: int,
+    lease_duration: timedelta,
+    max_attempts: int = 3,
+) -> List[UUID]:
+    """
+    Atomically claim the next documents of a queue. The rows being claimed by another worker are skipped instead of
+    waited for (FOR UPDATE SKIP LOCKED), and the claimed ones are leased so they're not claimed again until the lease
+    expires.
+    :param db_session: Database session
+    :param queue_name: Name of the queue
+    :param worker_id: Identifier of the worker claiming the documents
+    :param qty: Max number of documents to claim
+    :param lease_duration: Time after which the documents can be claimed by another worker
+    :param max_attempts: Documents already claimed this number of times are left in the queue
+    :return: Ids of the claimed documents, empty when the queue is drained
+    """
+    now = datetime.now()
+    candidates = (
+        select(WorkQueueItem.document_id)
+        .where(
+            WorkQueueItem.queue_name == queue_name,
+            or_(
+                WorkQueueItem.lease_expires_at.is_(None),
+                WorkQueueItem.lease_expires_at < now,
+            ),
+            WorkQueueItem.attempts < max_attempts,
+        )
+        .order_by(WorkQueueItem.enqueued_at, WorkQueueItem.document_id)
+        .limit(qty)
+        .with_for_update(skip_locked=True)
+    )
+    docids: List[UUID] = list(db_session.execute(candidates).scalars().all())
+
+    if docids:
+        db_session.execute(
+            update(WorkQueueItem)
+            .where(
+                WorkQueueItem.queue_name == queue_name,
+                WorkQueueItem.document_id.in_(docids),
+            )
+            .values(
+                claimed_by=worker_id,
+                lease_expires_at=now + lease_duration,
+                attempts=WorkQueueItem.attempts + 1,
+            )
+        )
+    # Release the row locks as soon as the lease is written
+    db_session.commit()
+    logger.info(
+        "'%s' documents were claimed in %s by %s", len(docids), queue_name, worker_id
+    )
+    return docids
+
+
+def complete_documents(
+    db_session: Session, queue_name: str, worker_id: str, docids: Collection[UUID]
+) -> None:
+    """
+    Remove processed documents from a queue. Documents claimed since by another worker, because the lease expired,
+    are left to it.
+    :param db_session: Database session
+    :param queue_name: Name of the queue
+    :param worker_id: Identifier of the worker which processed the documents
+    :param docids: Ids of the processed documents
+    """
+    if not docids:
+        return
+
+    deleted = (
+        db_session.query(WorkQueueItem)
+        .filter(
+            WorkQueueItem.queue_name == queue_name,
+            WorkQueueItem.claimed_by == worker_id,
+            WorkQueueItem.document_id.in_(docids),
+        )
+        .delete(synchronize_session=False)
+    )
+    db_session.commit()
+    if deleted != len(docids):
+        logger.warning(
+            "'%s' documents were claimed by another worker before being completed",
+            len(docids) - deleted,
+        )
+
+
+def iter_claimed_documents(
+    db_session: Session,
+    queue_name: str,
+    worker_id: str,
+    claim_size: int,
+    lease_duration: timedelta,
+    max_attempts: int = 3,
+) -> Iterator[List[UUID]]:
+    """
+    Claim documents of a queue until it's drained. Each batch is completed when the next one is requested, if the
+    processing of a batch fails its lease expires and another worker claims it again.
+    :param db_session: Database session
+    :param queue_name: Name of the queue
+    :param worker_id: Identifier of the worker
+    :param claim_size: Number of documents claimed at once
+    :param lease_duration: Time after which a claimed batch can be claimed by another worker
+    :param max_attempts: Documents already claimed this number of times are left in the queue
+    :return: Batches of documents ids
+    """
+    while True:
+        docids = claim_documents(
+            db_session=db_session,
+            queue_name=queue_name,
+            worker_id=worker_id,
+            qty=claim_size,
+            lease_duration=lease_duration,
+            max_attempts=max_attempts,
+        )
+        if not docids:
+            logger.info("Queue %s is drained", queue_name)
+            return
+        yield docids
+        complete_documents(db_session, queue_name, worker_id, docids)
+
+
+def iter_documents_to_process(
+    db_session: Session, input_artifact: str, input_directory: Path
+) -> Iterator[List[UUID]]:
+    """
+    Batches of documents a node has to process : the ids of its CSV artifact, or, when WORK_QUEUE_NAME is set, the
+    documents claimed in this queue until it's drained.
+    :param db_session: Database session
+    :param input_artifact: Name of the CSV artifact, used without queue
+    :param input_directory: Path to the local artifacts folder
+    :return: Batches of documents ids
+    """
+    queue_name: str | None = os.getenv("WORK_QUEUE_NAME", None)
+    if not queue_name:
+        yield retrieve_ids_from_artifact(
+            input_artifact=input_artifact, input_directory=input_directory
+        )
+        return
+
+    worker_id: str = os.getenv("WORK_QUEUE_WORKER_ID", socket.gethostname())
+    claim_size: int = int(os.getenv("WORK_QUEUE_CLAIM_SIZE", 100))
+    lease_seconds: int = int(os.getenv("WORK_QUEUE_LEASE_SECONDS", 3600))
+    max_attempts: int = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", 3))
+    logger.info("Claim documents from queue %s as %s", queue_name, worker_id)
+    yield from iter_claimed_documents(
+        db_session=db_session,
+        queue_name=queue_name,
+        worker_id=worker_id,
+        claim_size=claim_size,
+        lease_duration=timedelta(seconds=lease_seconds),
+        max_attempts=max_attempts,
+    )
@@ -0,0 +1,38 @@
+-- Measure the content and the slices of the given documents and store their sizes
+INSERT
+	INTO
+	document_related.document_size (document_id,
+	content_bytes,
+	slice_bytes,
+	updated_at)
+SELECT
+	wd.id,
+	octet_length(wd.full_content),
+	(
+	SELECT
+		sum(octet_length(s.body) + octet_length(s.embedding))
+	FROM
+		document_related.document_slice s
+	WHERE
+		s.document_id = wd.id
+    ),
+	NOW()
+FROM
+	document_related.welearn_document wd
+WHERE
+	-- Only process the provided document IDs
+	wd.id = ANY(:ids)
+	-- Safety check: ensure the migration revision is applied
+	AND EXISTS (
+	SELECT
+		1
+	FROM
+		alembic_version
+	WHERE
+		version_num = :revision_id
+        )
+ON CONFLICT (document_id) DO UPDATE
+SET
+	content_bytes = EXCLUDED.content_bytes,
+	slice_bytes = EXCLUDED.slice_bytes,
+	updated_at = EXCLUDED.updated_at
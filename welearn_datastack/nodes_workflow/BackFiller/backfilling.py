@@ -1,7 +1,5 @@
-import csv
 import logging
 import os
-import uuid
 from pathlib import Path
 from typing import List
 from uuid import UUID
@@ -12,8 +10,12 @@ from welearn_datastack.modules.query_utils import (
     resolve_query,
     resolve_query_on_given_ids,
 )
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
 from welearn_datastack.utils_.database_utils import create_db_session
 from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -44,12 +46,9 @@ def main() -> None:
     local_artifcat_input, _ = setup_local_path()
 
     # Input IDs
-    with (local_artifcat_input / input_artifact_id_url).open(
-        "r"
-    ) as artifact_file_input:
-        spamreader = csv.reader(artifact_file_input, delimiter=",", quotechar='"')
-        ids_urls: List[UUID] = [uuid.UUID(row[0]) for row in spamreader]
-        logger.info("'%s' IDs URLs were retrieved", len(ids_urls))
+    ids_urls: List[UUID] = retrieve_ids_from_artifact(
+        input_artifact=input_artifact_id_url, input_directory=local_artifcat_input
+    )
 
     # Database management
     logger.info("Create DB session")
@@ -75,4 +74,4 @@ def main() -> None:
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
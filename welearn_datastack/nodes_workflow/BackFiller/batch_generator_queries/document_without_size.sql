@@ -0,0 +1,35 @@
+-- Documents whose sizes were never stored, or stored before they were vectorized, or stored by the vectorizer only
+SELECT
+	wd.id
+FROM
+	document_related.welearn_document wd
+LEFT JOIN document_related.document_size ds ON
+	ds.document_id = wd.id
+WHERE
+	(
+		ds.document_id IS NULL
+		OR ds.content_bytes IS NULL
+		OR (
+			ds.slice_bytes IS NULL
+			AND EXISTS (
+			SELECT
+				1
+			FROM
+				document_related.document_slice s
+			WHERE
+				s.document_id = wd.id
+            )
+        )
+    )
+	AND EXISTS (
+	-- Check if revision is the one we want before performing operation
+	SELECT
+		1
+	FROM
+		alembic_version
+	WHERE
+		version_num = :revision_id
+      )
+ORDER BY
+	wd.id
+LIMIT :batch_size
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from welearn_datastack.data.batch_generator import BatchGenerator
 from welearn_datastack.modules.query_utils import resolve_batched_query
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -94,4 +95,4 @@ def main() -> None:
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
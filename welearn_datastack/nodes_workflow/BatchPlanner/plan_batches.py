@@ -0,0 +1,99 @@
+import logging
+import os
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from welearn_datastack.data.batch_generator import BatchGenerator
+from welearn_datastack.data.enumerations import BatchManifestFormat
+from welearn_datastack.modules import retrieve_data_from_database
+from welearn_datastack.modules.batch_planner import (
+    PLANNED_STEPS_SPECS,
+    build_planned_steps,
+    plan_batches,
+)
+from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
+from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
+
+log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
+log_format: str = os.getenv(
+    "LOG_FORMAT", "[%(asctime)s][%(name)s][%(levelname)s] - %(message)s"
+)
+
+if not isinstance(log_level, int):
+    raise ValueError(f"Log level is not recognized: '{log_level}'")
+
+logging.basicConfig(
+    level=logging.getLevelName(log_level),
+    format=log_format,
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("BatchPlanner starting...")
+    output_batch_file = os.getenv("OUTPUT_FILE_NAME", "batch_ids.csv")
+
+    # Environment variables
+    logger.info("Load environment variables")
+    parallelism_threshold: int = int(os.getenv("PARALLELISM_THRESHOLD", 100))
+    parallelism_max: int = int(os.getenv("PARALLELISM_URL_MAX", 15))
+    batch_urls_directory: str = os.getenv("BATCH_URLS_DIRECTORY", "batch_urls")
+    corpus_name: str = os.getenv("PICK_CORPUS_NAME", "*")
+    steps_names = [
+        name.strip()
+        for name in os.getenv("PLANNER_STEPS", ",".join(PLANNED_STEPS_SPECS)).split(",")
+        if name.strip()
+    ]
+
+    # A step never takes more documents than its batches can hold
+    default_qty_max: int = int(
+        os.getenv("PICK_QTY_MAX", parallelism_threshold * parallelism_max)
+    )
+    qty_max: Dict[str, int] = {
+        name: min(
+            int(os.getenv(f"PLANNER_QTY_MAX_{name.upper()}", default_qty_max)),
+            parallelism_threshold * parallelism_max,
+        )
+        for name in steps_names
+    }
+    logger.info("Environment variables loaded")
+
+    steps = build_planned_steps(steps_names, qty_max, corpus_name)
+
+    # Database management
+    logger.info("Create DB session")
+    db_session: Session = create_db_session()
+    logger.info("DB session created")
+
+    logger.info("Plan batches of steps: %s", ", ".join(steps_names))
+    planned_ids = plan_batches(db_session, steps)
+
+    # One directory per step, read by the workflow of the step
+    for name, ids_to_batch in planned_ids.items():
+        batch_generator = BatchGenerator(
+            parallelism_threshold=parallelism_threshold,
+            parallelism_max=parallelism_max,
+            batch_urls_directory=f"{batch_urls_directory}/{name}",
+            output_batch_file_name=output_batch_file,
+        )
+        batch_generator.create_ids_batch(ids_to_batch)
+        qty = batch_generator.write_quantity_to_file()
+        if qty:
+            batch_generator.write_batches_to_file(
+                retrieve_data_from_database.retrieve_documents_manifest_info(
+                    db_session, ids_to_batch
+                )
+                if batch_generator.manifest_format == BatchManifestFormat.NPY
+                else None
+            )
+        logger.info("Step '%s': %s batches written", name, qty)
+    db_session.close()
+
+    logger.info("BatchPlanner finished")
+
+
+if __name__ == "__main__":
+    load_dotenv_local()
+    profile_node(main)()
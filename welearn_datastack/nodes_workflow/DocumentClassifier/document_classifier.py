@@ -1,24 +1,29 @@
 import logging
 import os
-import uuid
 from itertools import groupby
 from typing import List
 from uuid import UUID
 
 from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
-from welearn_database.data.models import DocumentSlice, ProcessState, Sdg
+from welearn_database.data.models import DocumentSlice, Sdg
 
 from welearn_datastack.constants import FORCED_CORPUS_CLASSIFIED
 from welearn_datastack.data.enumerations import MLModelsType
 from welearn_datastack.modules.retrieve_data_from_database import retrieve_models
-from welearn_datastack.modules.retrieve_data_from_files import retrieve_ids_from_csv
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
 from welearn_datastack.modules.sdgs_classifiers import (
     bi_classify_slice,
     n_classify_slice,
 )
+from welearn_datastack.modules.state_writer import StateWriter
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.memory_utils import memory_tracker, track_node_memory
+from welearn_datastack.utils_.metrics_utils import export_node_metrics, metrics
 from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -35,6 +40,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+documents_counter = metrics.counter(
+    "classifier_documents", "Documents classified", ["status"]
+)
+slices_counter = metrics.counter("classifier_slices", "Slices classified")
+inference_duration = metrics.histogram(
+    "classifier_inference_duration_seconds",
+    "Time spent classifying a slice",
+    ["classifier"],
+)
+db_write_duration = metrics.histogram(
+    "classifier_db_write_duration_seconds", "Time spent writing the SDGs of a batch"
+)
+
 
 def main() -> None:
     logger.info("DocumentClassifier starting...")
@@ -43,7 +61,7 @@ def main() -> None:
 
     input_directory, local_artifcat_output = setup_local_path()
 
-    docids = retrieve_ids_from_csv(
+    docids = retrieve_ids_from_artifact(
         input_artifact=input_artifact, input_directory=input_directory
     )
 
@@ -54,11 +72,12 @@ def main() -> None:
 
     # Retrieve Slices from database
     logger.info("Retrieve Slices from database")
-    slices = (
-        db_session.query(DocumentSlice)
-        .filter(DocumentSlice.document_id.in_(docids))
-        .all()
-    )
+    with memory_tracker.phase("db_load"):
+        slices = (
+            db_session.query(DocumentSlice)
+            .filter(DocumentSlice.document_id.in_(docids))
+            .all()
+        )
     logger.info(f"'{len(slices)}' Slices were retrieved")
 
     bi_model_by_docid = retrieve_models(docids, db_session, MLModelsType.BI_CLASSIFIER)
@@ -114,86 +133,83 @@ def main() -> None:
             continue
         logger.info("n-classifying document %s with model %s", key_doc_id, n_model_name)
 
-        for s in doc_slices:
-            if not isinstance(s.document.details, dict):
-                logger.error(f"Details is not a dict in this slice :{s.id}")
-                raise ValueError(f"Details is not a dict in this slice :{s.id}")
-
-            externaly_classified_flag = (
-                key_external_sdg in s.document.details
-                and s.document.details[key_external_sdg]
-            )
-            if externaly_classified_flag:
-                logger.info(f"Document {key_doc_id} is externally classified ")
-
-            if (
-                externaly_classified_flag
-                or is_forced_corpus
-                or bi_classify_slice(slice_=s, classifier_model_name=bi_model_name)
-            ):
-                logger.info(
-                    f"Document {key_doc_id} is classified as SDG by bi-classifier"
-                )
-                specific_sdg = n_classify_slice(
-                    _slice=s,
-                    classifier_model_name=n_model_name,
-                    forced_sdg=(
-                        s.document.details[key_external_sdg]
-                        if externaly_classified_flag
-                        else None
-                    ),
-                    bi_classifier_id=bi_model_id,
-                    n_classifier_id=n_model_id,
-                    is_forced_corpus=is_forced_corpus,
+        with memory_tracker.phase(
+            "inference",
+            lambda: sum(len((s.body or "").encode("utf-8")) for s in doc_slices),
+        ):
+            for s in doc_slices:
+                if not isinstance(s.document.details, dict):
+                    logger.error(f"Details is not a dict in this slice :{s.id}")
+                    raise ValueError(f"Details is not a dict in this slice :{s.id}")
+
+                externaly_classified_flag = (
+                    key_external_sdg in s.document.details
+                    and s.document.details[key_external_sdg]
                 )
-                if not specific_sdg:
-                    continue
-                logger.info(
-                    f"Document {key_doc_id} is classified as SDG {specific_sdg.sdg_number} by n-classifier"
-                )
-                specific_sdgs.append(specific_sdg)
-                sdg_docs_ids.add(key_doc_id)
+                if externaly_classified_flag:
+                    logger.info(f"Document {key_doc_id} is externally classified ")
+
+                slices_counter.inc()
+                is_sdg = externaly_classified_flag or is_forced_corpus
+                if not is_sdg:
+                    with inference_duration.time(classifier="bi"):
+                        is_sdg = bi_classify_slice(
+                            slice_=s, classifier_model_name=bi_model_name
+                        )
+                if is_sdg:
+                    logger.info(
+                        f"Document {key_doc_id} is classified as SDG by bi-classifier"
+                    )
+                    with inference_duration.time(classifier="n"):
+                        specific_sdg = n_classify_slice(
+                            _slice=s,
+                            classifier_model_name=n_model_name,
+                            forced_sdg=(
+                                s.document.details[key_external_sdg]
+                                if externaly_classified_flag
+                                else None
+                            ),
+                            bi_classifier_id=bi_model_id,
+                            n_classifier_id=n_model_id,
+                            is_forced_corpus=is_forced_corpus,
+                        )
+                    if not specific_sdg:
+                        continue
+                    logger.info(
+                        f"Document {key_doc_id} is classified as SDG {specific_sdg.sdg_number} by n-classifier"
+                    )
+                    specific_sdgs.append(specific_sdg)
+                    sdg_docs_ids.add(key_doc_id)
 
     non_sdg_docs_ids = {
         k.document_id for k in slices_per_docs if k.document_id not in sdg_docs_ids
     }
 
-    # Delete old slices
-    logger.info("Delete old SDGs")
-    db_session.query(Sdg).filter(
-        Sdg.slice_id.in_([s.slice_id for s in specific_sdgs])
-    ).delete()
-    db_session.commit()
-
-    # Update SDGs
-    logger.info("Updating SDGs")
-    db_session.add_all(specific_sdgs)
-
-    # Create process states
-    logger.info("Creating process states")
-    # Create process state for Non sdg docs
-    for doc_id in non_sdg_docs_ids:
-        db_session.add(
-            ProcessState(
-                id=uuid.uuid4(),
-                document_id=doc_id,
-                title=Step.DOCUMENT_CLASSIFIED_NON_SDG.value,
-            )
-        )
-
-    # Create process state for sdg docs
-    for doc_id in sdg_docs_ids:
-        db_session.add(
-            ProcessState(
-                id=uuid.uuid4(),
-                document_id=doc_id,
-                title=Step.DOCUMENT_CLASSIFIED_SDG.value,
-            )
-        )
-    db_session.commit()
+    documents_counter.inc(len(sdg_docs_ids), status="sdg")
+    documents_counter.inc(len(non_sdg_docs_ids), status="non_sdg")
+
+    with memory_tracker.phase("writes"), db_write_duration.time():
+        # Delete old slices
+        logger.info("Delete old SDGs")
+        db_session.query(Sdg).filter(
+            Sdg.slice_id.in_([s.slice_id for s in specific_sdgs])
+        ).delete()
+        db_session.commit()
+
+        # Update SDGs
+        logger.info("Updating SDGs")
+        db_session.add_all(specific_sdgs)
+
+        # Create process states
+        logger.info("Creating process states")
+        state_writer = StateWriter(db_session)
+        state_writer.add_states(non_sdg_docs_ids, Step.DOCUMENT_CLASSIFIED_NON_SDG)
+        state_writer.add_states(sdg_docs_ids, Step.DOCUMENT_CLASSIFIED_SDG)
+        state_writer.flush()
+        db_session.commit()
     db_session.close()
 
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    track_node_memory(export_node_metrics(profile_node(main)))()
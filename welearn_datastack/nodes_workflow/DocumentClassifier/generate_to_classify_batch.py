@@ -1,13 +1,23 @@
 import logging
 import os
+from typing import Dict
 
 from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
 
 from welearn_datastack.data.batch_generator import BatchGenerator
-from welearn_datastack.data.enumerations import WeighedScope
+from welearn_datastack.data.enumerations import (
+    BatchingStrategy,
+    BatchManifestFormat,
+    WeighedScope,
+)
 from welearn_datastack.modules import retrieve_data_from_database
+from welearn_datastack.modules.batch_backlog import (
+    get_backlog_file,
+    retrieve_ids_with_backlog,
+)
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -33,9 +43,14 @@ def main() -> None:
     logger.info("Load environment variables")
     parallelism_threshold: int = int(os.getenv("PARALLELISM_THRESHOLD", 100))
     parallelism_max: int = int(os.getenv("PARALLELISM_URL_MAX", 15))
+    parallelism_budget: int | None = int(os.getenv("PARALLELISM_BUDGET", 0)) or None
     batch_urls_directory: str = os.getenv("BATCH_URLS_DIRECTORY", "batch_urls")
     corpus_name: str = os.getenv("PICK_CORPUS_NAME", "*")
     qty_max_str: str | None = os.getenv("PICK_QTY_MAX", None)
+    batching_strategy = BatchingStrategy[
+        os.getenv("BATCHING_STRATEGY", BatchingStrategy.COUNT.name).upper()
+    ]
+    stream_batches: bool = os.getenv("STREAM_BATCHES", "False").lower() == "true"
 
     qty_max: int | None = None
     if qty_max_str is not None:
@@ -48,6 +63,7 @@ def main() -> None:
         parallelism_max=parallelism_max,
         batch_urls_directory=batch_urls_directory,
         output_batch_file_name=output_batch_file,
+        parallelism_budget=parallelism_budget,
     )
 
     # Database management
@@ -55,22 +71,60 @@ def main() -> None:
     db_session: Session = create_db_session()
     logger.info("DB session created")
 
+    if stream_batches and batching_strategy == BatchingStrategy.COUNT:
+        logger.info("Stream ids from DB to batches")
+        batch_generator.write_streamed_batches(
+            retrieve_data_from_database.iter_documents_ids_according_process_title(
+                db_session,
+                qty_max=qty_max,
+                process_titles=[Step.DOCUMENT_VECTORIZED],
+                corpus_name=corpus_name,
+            )
+        )
+        logger.info(f"{__name__} generate batch ids finished")
+        return
+
+    # Ids left over by the previous run are batched first, only with the count strategy
+    backlog_file = (
+        get_backlog_file() if batching_strategy == BatchingStrategy.COUNT else None
+    )
+
     # Get URLs from DB
     logger.info("Retrieve ids from DB")
-    ids_to_batch = (
-        retrieve_data_from_database.retrieve_documents_ids_according_process_title(
+    documents_weights: Dict[str, int] = {}
+    if batching_strategy == BatchingStrategy.WEIGHT:
+        documents_weights = retrieve_data_from_database.retrieve_documents_sizes_according_process_title(
             db_session,
             qty_max=qty_max,
             process_titles=[Step.DOCUMENT_VECTORIZED],
             weighed_scope=WeighedScope.DOCUMENT,
             corpus_name=corpus_name,
         )
-    )
+        ids_to_batch = list(documents_weights)
+    else:
+        ids_to_batch = retrieve_ids_with_backlog(
+            db_session,
+            backlog_file,
+            [Step.DOCUMENT_VECTORIZED],
+            batch_generator.capacity,
+            lambda: retrieve_data_from_database.retrieve_documents_ids_according_process_title(
+                db_session,
+                qty_max=qty_max,
+                process_titles=[Step.DOCUMENT_VECTORIZED],
+                weighed_scope=WeighedScope.DOCUMENT,
+                corpus_name=corpus_name,
+            ),
+        )
     logger.info("'%s' Docsids were retrieved", len(ids_to_batch))
 
     # Create batch
     logger.info("Create batch")
-    batch_generator.create_ids_batch(ids_to_batch)
+    if batching_strategy == BatchingStrategy.WEIGHT:
+        batch_generator.create_weighted_ids_batch(documents_weights)
+    else:
+        batch_generator.create_ids_batch(ids_to_batch)
+        if backlog_file is not None:
+            batch_generator.write_overflow_to_file(backlog_file)
     logger.info("Batch created")
 
     logger.info("Write quantity")
@@ -80,11 +134,19 @@ def main() -> None:
 
     if qty:
         logger.info("Write batches to file")
-        batch_generator.write_batches_to_file()
+        batch_generator.write_batches_to_file(
+            retrieve_data_from_database.retrieve_documents_manifest_info(
+                db_session, ids_to_batch
+            )
+            if batch_generator.manifest_format == BatchManifestFormat.NPY
+            else None
+        )
         logger.info("Batches written")
+        if batching_strategy == BatchingStrategy.WEIGHT:
+            batch_generator.write_weights_to_file()
     logger.info(f"{__name__} generate batch ids finished")
 
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
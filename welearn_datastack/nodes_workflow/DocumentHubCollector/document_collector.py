@@ -1,6 +1,6 @@
-import csv
 import logging
 import os
+import time
 import uuid
 from typing import Dict, List, Tuple
 from uuid import UUID
@@ -17,10 +17,22 @@ from welearn_datastack.modules.computed_metadata import (
     compute_readability,
     identify_document_language,
 )
+from welearn_datastack.modules.document_size import (
+    compute_content_bytes,
+    upsert_documents_sizes,
+)
+from welearn_datastack.modules.processing_duration import ProcessingDurationRecorder
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
+from welearn_datastack.modules.state_writer import StateWriter
 from welearn_datastack.modules.validation import validate_non_null_fields_document
 from welearn_datastack.plugins.interface import IPlugin
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.memory_utils import memory_tracker, track_node_memory
+from welearn_datastack.utils_.metrics_utils import export_node_metrics, metrics
 from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -37,6 +49,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+documents_counter = metrics.counter(
+    "collector_documents", "Documents collected", ["corpus", "status"]
+)
+collect_duration = metrics.histogram(
+    "collector_plugin_duration_seconds",
+    "Time spent by the plugin to collect the documents of a corpus",
+    ["corpus"],
+)
+db_write_duration = metrics.histogram(
+    "collector_db_write_duration_seconds", "Time spent writing the collected documents"
+)
+
 
 def main() -> None:
     logger.info("DocumentCollectorHub starting...")
@@ -45,16 +69,10 @@ def main() -> None:
 
     local_artifcat_input, local_artifcat_output = setup_local_path()
 
-    # retrieve url data from files
-    logger.info("Retrieve URLs from file")
-
     # Input IDs
-    with (local_artifcat_input / input_artifact_id_url).open(
-        "r"
-    ) as artifact_file_input:
-        spamreader = csv.reader(artifact_file_input, delimiter=",", quotechar='"')
-        ids_urls: List[UUID] = [uuid.UUID(row[0]) for row in spamreader]
-        logger.info("'%s' IDs URLs were retrieved", len(ids_urls))
+    ids_urls: List[UUID] = retrieve_ids_from_artifact(
+        input_artifact=input_artifact_id_url, input_directory=local_artifcat_input
+    )
 
     # Database management
     logger.info("Create DB session")
@@ -63,9 +81,12 @@ def main() -> None:
 
     # Retrieve WeLearnDocument from database
     logger.info("Retrieve WeLearnDocument from database")
-    welearn_documents: List = (
-        db_session.query(WeLearnDocument).filter(WeLearnDocument.id.in_(ids_urls)).all()
-    )
+    with memory_tracker.phase("db_load"):
+        welearn_documents: List = (
+            db_session.query(WeLearnDocument)
+            .filter(WeLearnDocument.id.in_(ids_urls))
+            .all()
+        )
     logger.info("'%s' WeLearnDocuments were retrieved", len(welearn_documents))
 
     if len(ids_urls) != len(welearn_documents):
@@ -80,7 +101,10 @@ def main() -> None:
 
     # Data extraction
     logger.info("Data extraction - Retrieve URLs and documents")
-    batch_documents, errors, states = extract_data_from_urls(welearn_documents)
+    durations = ProcessingDurationRecorder(Step.DOCUMENT_SCRAPED)
+    batch_documents, errors, states = extract_data_from_urls(
+        welearn_documents, durations
+    )
     logger.info("Data extraction - URLs and documents were retrieved")
 
     # Compute some metadata
@@ -93,18 +117,29 @@ def main() -> None:
         compute_readability(doc)
         flag_modified(doc, "details")
 
-    db_session.add_all(states)
-    db_session.add_all(errors)
-    db_session.add_all(batch_documents)
-    db_session.commit()
+    content_bytes = {doc.id: compute_content_bytes(doc) for doc in batch_documents}
+    with memory_tracker.phase("writes", sum(content_bytes.values())):
+        state_writer = StateWriter(db_session)
+        for state in states:
+            state_writer.add_state(state.document_id, state.title)  # type: ignore
+        for error in errors:
+            state_writer.add_error_retrieval(error)
+        db_session.add_all(batch_documents)
+        upsert_documents_sizes(db_session, content_bytes, "content_bytes")
+        durations.save(db_session)
+        with db_write_duration.time():
+            state_writer.flush()
+            db_session.commit()
 
 
 def extract_data_from_urls(
     welearn_documents: List[WeLearnDocument],
+    durations: ProcessingDurationRecorder | None = None,
 ) -> Tuple[List[WeLearnDocument], List[ErrorRetrieval], List[ProcessState]]:
     """
     Extract_data_from_urls
     :param welearn_documents: input docs
+    :param durations: Recorder of the time spent per corpus
     :return: URLs and documents retrieved from DB and web
     """
     batch_docs: Dict[str, List] = {}
@@ -154,7 +189,23 @@ def extract_data_from_urls(
     for corpus_name in batch_docs:
         # Get data
         corpus_collector = corpus_plugin[corpus_name]
-        documents = corpus_collector.run(documents=batch_docs[corpus_name])  # type: ignore
+        start = time.monotonic()
+        with (
+            memory_tracker.phase("extraction") as memory_phase,
+            collect_duration.time(corpus=corpus_name),
+        ):
+            documents = corpus_collector.run(documents=batch_docs[corpus_name])  # type: ignore
+            # The size of what was extracted is only known once the documents are collected, and only computed
+            # when the memory is tracked
+            memory_phase.input_bytes = lambda: sum(
+                compute_content_bytes(d.document) for d in documents
+            )
+        if durations is not None:
+            durations.add(
+                batch_docs[corpus_name][0].corpus_id,
+                time.monotonic() - start,
+                len(batch_docs[corpus_name]),
+            )
 
         for wrapper_document in documents:
             is_none_valid = validate_non_null_fields_document(wrapper_document.document)
@@ -173,6 +224,7 @@ def extract_data_from_urls(
                 ret_documents.append(wrapper_document.document)
             else:
                 error_docs.append(wrapper_document.to_error_retrieval())
+            documents_counter.inc(corpus=corpus_name, status=state_title)
             states.append(
                 ProcessState(
                     id=uuid.uuid4(),
@@ -191,4 +243,4 @@ def extract_data_from_urls(
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    track_node_memory(export_node_metrics(profile_node(main)))()
@@ -2,11 +2,18 @@ import logging
 import os
 
 from sqlalchemy.orm import Session
+from welearn_database.data.enumeration import Step
 
 from welearn_datastack.data.batch_generator import BatchGenerator
-from welearn_datastack.data.enumerations import URLRetrievalType
+from welearn_datastack.data.enumerations import (
+    BatchingStrategy,
+    BatchManifestFormat,
+    URLRetrievalType,
+)
 from welearn_datastack.modules import retrieve_data_from_database
+from welearn_datastack.modules.processing_duration import estimate_documents_durations
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -36,6 +43,12 @@ def main() -> None:
     mode_str: str = os.getenv("RETRIEVAL_MODE", "NEW_MODE")
     corpus_name: str = os.getenv("PICK_CORPUS_NAME", "*")
     qty_max_str: str | None = os.getenv("PICK_QTY_MAX", None)
+    batching_strategy = BatchingStrategy[
+        os.getenv("BATCHING_STRATEGY", BatchingStrategy.COUNT.name).upper()
+    ]
+    batch_target_duration: float = float(os.getenv("BATCH_TARGET_DURATION", 1800))
+    default_document_duration: float = float(os.getenv("DEFAULT_DOCUMENT_DURATION", 1))
+    duration_history_days: int = int(os.getenv("DURATION_HISTORY_DAYS", 30))
 
     qty_max: int | None = None
     if qty_max_str is not None:
@@ -71,7 +84,19 @@ def main() -> None:
 
     # Create batch
     logger.info("Create batch")
-    batch_generator.create_ids_batch(ids_to_batch)
+    if batching_strategy == BatchingStrategy.DURATION:
+        batch_generator.create_duration_ids_batch(
+            estimate_documents_durations(
+                db_session,
+                ids_to_batch,
+                Step.DOCUMENT_SCRAPED,
+                default_duration=default_document_duration,
+                history_days=duration_history_days,
+            ),
+            target_duration=batch_target_duration,
+        )
+    else:
+        batch_generator.create_ids_batch(ids_to_batch)
     logger.info("Batch created")
 
     logger.info("Write quantity")
@@ -81,12 +106,20 @@ def main() -> None:
 
     if qty:
         logger.info("Write batches to file")
-        batch_generator.write_batches_to_file()
+        batch_generator.write_batches_to_file(
+            retrieve_data_from_database.retrieve_documents_manifest_info(
+                db_session, ids_to_batch
+            )
+            if batch_generator.manifest_format == BatchManifestFormat.NPY
+            else None
+        )
         logger.info("Batches written")
+        if batching_strategy == BatchingStrategy.DURATION:
+            batch_generator.write_weights_to_file()
 
     logger.info(f"{__name__} generate batch ids finished")
 
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
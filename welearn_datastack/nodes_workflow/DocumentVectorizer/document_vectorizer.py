@@ -1,18 +1,29 @@
 import logging
 import os
-import uuid
+import time
+from typing import List
+from uuid import UUID
 
 from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
-from welearn_database.data.models import DocumentSlice, ProcessState, WeLearnDocument
+from welearn_database.data.models import DocumentSlice, WeLearnDocument
 
 from welearn_datastack.data.enumerations import MLModelsType
 from welearn_datastack.exceptions import NoModelFoundError
+from welearn_datastack.modules.document_size import (
+    compute_slices_bytes,
+    upsert_documents_sizes,
+)
 from welearn_datastack.modules.embedding_model_helpers import create_content_slices
+from welearn_datastack.modules.processing_duration import ProcessingDurationRecorder
 from welearn_datastack.modules.retrieve_data_from_database import retrieve_models
-from welearn_datastack.modules.retrieve_data_from_files import retrieve_ids_from_csv
+from welearn_datastack.modules.state_writer import StateWriter
+from welearn_datastack.modules.work_queue import iter_documents_to_process
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.memory_utils import memory_tracker, track_node_memory
+from welearn_datastack.utils_.metrics_utils import export_node_metrics, metrics
 from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -29,28 +40,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+documents_counter = metrics.counter(
+    "vectorizer_documents", "Documents vectorized", ["status"]
+)
+slices_counter = metrics.counter("vectorizer_slices", "Slices created")
+inference_duration = metrics.histogram(
+    "vectorizer_inference_duration_seconds",
+    "Time spent cutting a document into slices and computing their embeddings",
+)
+db_write_duration = metrics.histogram(
+    "vectorizer_db_write_duration_seconds", "Time spent writing the slices of a batch"
+)
 
-def main() -> None:
-    logger.info("DocumentCollectorHub starting...")
-    input_artifact = os.getenv("ARTIFACT_ID_URL_CSV_NAME", "batch_ids.csv")
-    logger.info("Input artifact url json name: %s", input_artifact)
-
-    input_directory, local_artifact_output = setup_local_path()
-
-    docids = retrieve_ids_from_csv(
-        input_artifact=input_artifact, input_directory=input_directory
-    )
-
-    # Database management
-    logger.info("Create DB session")
-    db_session: Session = create_db_session()
-    logger.info("DB session created")
 
+def vectorize_documents(db_session: Session, docids: List[UUID]) -> None:
+    """
+    Cut documents into slices with their embeddings and store them with the new process states
+    :param db_session: Database session
+    :param docids: Ids of the documents to vectorize
+    """
     # Retrieve WeLearnDocument from database
     logger.info("Retrieve WeLearnDocument from database")
-    welearn_documents: list[WeLearnDocument] = (  # type: ignore
-        db_session.query(WeLearnDocument).filter(WeLearnDocument.id.in_(docids)).all()
-    )
+    with memory_tracker.phase("db_load"):
+        welearn_documents: list[WeLearnDocument] = (  # type: ignore
+            db_session.query(WeLearnDocument)
+            .filter(WeLearnDocument.id.in_(docids))
+            .all()
+        )
 
     logger.info("'%s' WeLearnDocuments were retrieved", len(welearn_documents))
 
@@ -72,9 +88,12 @@ def main() -> None:
     docids_processed = 0
     docsids_not_processed = 0
     bulk_slices: list[DocumentSlice] = []
-    bulk_process_state: list[ProcessState] = []
+    state_writer = StateWriter(db_session)
+    slices_bytes: dict[UUID, int] = {}
+    durations = ProcessingDurationRecorder(Step.DOCUMENT_VECTORIZED)
     for i, document in enumerate(welearn_documents):
         logger.info("Processing document %s/%s", i, len(welearn_documents))
+        start = time.monotonic()
         try:
             embedding_model_name = embedding_models_dict.get(document.id, dict()).get(
                 "model_name", None
@@ -86,7 +105,9 @@ def main() -> None:
                 raise NoModelFoundError(
                     f"No embedding model found for document {document.id}"
                 )
-            slices = create_content_slices(document, embedding_model_name=embedding_model_name, embedding_model_id=embedding_model_id)  # type: ignore
+            with inference_duration.time():
+                slices = create_content_slices(document, embedding_model_name=embedding_model_name, embedding_model_id=embedding_model_id)  # type: ignore
+            slices_counter.inc(len(slices))
             logger.info("'%s' slices were created", len(slices))
             logger.info("Delete old slices")
             db_session.query(DocumentSlice).filter(
@@ -96,44 +117,60 @@ def main() -> None:
 
             logger.info("Adding slices to bulk")
             bulk_slices.extend(slices)
+            slices_bytes[document.id] = compute_slices_bytes(slices)
 
             logger.info("Adding process state to bulk")
-            bulk_process_state.append(
-                ProcessState(
-                    id=uuid.uuid4(),
-                    document_id=document.id,
-                    title=Step.DOCUMENT_VECTORIZED.value,
-                )
-            )
+            state_writer.add_state(document.id, Step.DOCUMENT_VECTORIZED)
 
             docids_processed += 1
+            documents_counter.inc(status="vectorized")
+            durations.add(document.corpus_id, time.monotonic() - start)
         except NoModelFoundError:
             logger.error("No model found for document %s", document.id)
-            bulk_process_state.append(
-                ProcessState(
-                    id=uuid.uuid4(),
-                    document_id=document.id,
-                    title=Step.KEPT_FOR_TRACE.value,
-                )
-            )
+            state_writer.add_state(document.id, Step.KEPT_FOR_TRACE)
             docsids_not_processed += 1
+            documents_counter.inc(status="no_model")
             continue
 
     logger.info("'%s' documents were processed", docids_processed)
     logger.info("'%s' documents were not processed", docsids_not_processed)
 
-    db_session.bulk_save_objects(bulk_slices)
-    logger.info("'%s' slices were added to the session", len(bulk_slices))
-    db_session.bulk_save_objects(bulk_process_state)
-    logger.info(
-        "'%s' process states were added to the session", len(bulk_process_state)
-    )
+    with (
+        memory_tracker.phase("writes", sum(slices_bytes.values())),
+        db_write_duration.time(),
+    ):
+        db_session.bulk_save_objects(bulk_slices)
+        logger.info("'%s' slices were added to the session", len(bulk_slices))
+        upsert_documents_sizes(db_session, slices_bytes, "slice_bytes")
+        durations.save(db_session)
+        state_writer.flush()
+
+        db_session.commit()
+
+
+def main() -> None:
+    logger.info("DocumentVectorizer starting...")
+    input_artifact = os.getenv("ARTIFACT_ID_URL_CSV_NAME", "batch_ids.csv")
+    logger.info("Input artifact url json name: %s", input_artifact)
+
+    input_directory, local_artifact_output = setup_local_path()
+
+    # Database management
+    logger.info("Create DB session")
+    db_session: Session = create_db_session()
+    logger.info("DB session created")
+
+    for docids in iter_documents_to_process(
+        db_session=db_session,
+        input_artifact=input_artifact,
+        input_directory=input_directory,
+    ):
+        vectorize_documents(db_session, docids)
 
-    db_session.commit()
     db_session.close()
     logger.info("DocumentVectorizer finished")
 
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    track_node_memory(export_node_metrics(profile_node(main)))()
@@ -1,13 +1,25 @@
 import logging
 import os
+from typing import Dict
 
 from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
 
 from welearn_datastack.data.batch_generator import BatchGenerator
-from welearn_datastack.data.enumerations import WeighedScope
+from welearn_datastack.data.enumerations import (
+    BatchingStrategy,
+    BatchManifestFormat,
+    WeighedScope,
+)
 from welearn_datastack.modules import retrieve_data_from_database
+from welearn_datastack.modules.batch_backlog import (
+    get_backlog_file,
+    retrieve_ids_with_backlog,
+)
+from welearn_datastack.modules.processing_duration import estimate_documents_durations
+from welearn_datastack.modules.work_queue import enqueue_documents
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -33,10 +45,22 @@ def main() -> None:
     logger.info("Load environment variables")
     parallelism_threshold: int = int(os.getenv("PARALLELISM_THRESHOLD", 100))
     parallelism_max: int = int(os.getenv("PARALLELISM_URL_MAX", 15))
+    parallelism_budget: int | None = int(os.getenv("PARALLELISM_BUDGET", 0)) or None
     batch_urls_directory: str = os.getenv("BATCH_URLS_DIRECTORY", "batch_urls")
     qty_max_str: str | None = os.getenv("PICK_QTY_MAX", None)
     corpus_name: str = os.getenv("PICK_CORPUS_NAME", "*")
     size_limit_str: str | None = os.getenv("SIZE_TOTAL_LIMIT", None)
+    work_queue_name: str | None = os.getenv("WORK_QUEUE_NAME", None)
+    work_queue_reset_attempts: bool = (
+        os.getenv("WORK_QUEUE_RESET_ATTEMPTS", "False").lower() == "true"
+    )
+    batching_strategy = BatchingStrategy[
+        os.getenv("BATCHING_STRATEGY", BatchingStrategy.COUNT.name).upper()
+    ]
+    batch_target_duration: float = float(os.getenv("BATCH_TARGET_DURATION", 1800))
+    default_document_duration: float = float(os.getenv("DEFAULT_DOCUMENT_DURATION", 1))
+    duration_history_days: int = int(os.getenv("DURATION_HISTORY_DAYS", 30))
+    stream_batches: bool = os.getenv("STREAM_BATCHES", "False").lower() == "true"
 
     qty_max: int | None = None
     if qty_max_str is not None:
@@ -54,6 +78,7 @@ def main() -> None:
         parallelism_max=parallelism_max,
         batch_urls_directory=batch_urls_directory,
         output_batch_file_name=output_batch_file,
+        parallelism_budget=parallelism_budget,
     )
 
     # Database management
@@ -61,10 +86,37 @@ def main() -> None:
     db_session: Session = create_db_session()
     logger.info("DB session created")
 
+    if (
+        stream_batches
+        and batching_strategy == BatchingStrategy.COUNT
+        and size_limit is None
+        and not work_queue_name
+    ):
+        logger.info("Stream ids from DB to batches")
+        batch_generator.write_streamed_batches(
+            retrieve_data_from_database.iter_documents_ids_according_process_title(
+                db_session,
+                qty_max=qty_max,
+                process_titles=[Step.DOCUMENT_SCRAPED],
+                corpus_name=corpus_name,
+            )
+        )
+        logger.info(f"{__name__} generate batch ids finished")
+        return
+
+    # Ids left over by the previous run are batched first, only with the count strategy. The work queue holds every
+    # id, it needs no backlog.
+    backlog_file = (
+        get_backlog_file()
+        if batching_strategy == BatchingStrategy.COUNT and not work_queue_name
+        else None
+    )
+
     # Get URLs from DB
     logger.info("Retrieve ids from DB")
-    ids_to_batch = (
-        retrieve_data_from_database.retrieve_documents_ids_according_process_title(
+    documents_weights: Dict[str, int] = {}
+    if batching_strategy == BatchingStrategy.WEIGHT:
+        documents_weights = retrieve_data_from_database.retrieve_documents_sizes_according_process_title(
             db_session,
             qty_max=qty_max,
             process_titles=[Step.DOCUMENT_SCRAPED],
@@ -72,12 +124,43 @@ def main() -> None:
             weighed_scope=WeighedScope.DOCUMENT,
             corpus_name=corpus_name,
         )
-    )
+        ids_to_batch = list(documents_weights)
+    else:
+        ids_to_batch = retrieve_ids_with_backlog(
+            db_session,
+            backlog_file,
+            [Step.DOCUMENT_SCRAPED],
+            batch_generator.capacity,
+            lambda: retrieve_data_from_database.retrieve_documents_ids_according_process_title(
+                db_session,
+                qty_max=qty_max,
+                process_titles=[Step.DOCUMENT_SCRAPED],
+                size_total_max=size_limit,
+                weighed_scope=WeighedScope.DOCUMENT,
+                corpus_name=corpus_name,
+            ),
+        )
     logger.info("'%s' Docsids were retrieved", len(ids_to_batch))
 
     # Create batch
     logger.info("Create batch")
-    batch_generator.create_ids_batch(ids_to_batch)
+    if batching_strategy == BatchingStrategy.WEIGHT:
+        batch_generator.create_weighted_ids_batch(documents_weights)
+    elif batching_strategy == BatchingStrategy.DURATION:
+        batch_generator.create_duration_ids_batch(
+            estimate_documents_durations(
+                db_session,
+                ids_to_batch,
+                Step.DOCUMENT_VECTORIZED,
+                default_duration=default_document_duration,
+                history_days=duration_history_days,
+            ),
+            target_duration=batch_target_duration,
+        )
+    else:
+        batch_generator.create_ids_batch(ids_to_batch)
+        if backlog_file is not None:
+            batch_generator.write_overflow_to_file(backlog_file)
     logger.info("Batch created")
 
     logger.info("Write quantity")
@@ -85,14 +168,30 @@ def main() -> None:
 
     logger.info("Quantity written")
 
-    if qty:
+    if qty and work_queue_name:
+        # Workers claim their documents from the queue, the quantity is the number of workers to start
+        enqueue_documents(
+            db_session,
+            work_queue_name,
+            ids_to_batch,
+            reset_attempts=work_queue_reset_attempts,
+        )
+    elif qty:
         logger.info("Write batches to file")
-        batch_generator.write_batches_to_file()
+        batch_generator.write_batches_to_file(
+            retrieve_data_from_database.retrieve_documents_manifest_info(
+                db_session, ids_to_batch
+            )
+            if batch_generator.manifest_format == BatchManifestFormat.NPY
+            else None
+        )
         logger.info("Batches written")
+        if batching_strategy != BatchingStrategy.COUNT:
+            batch_generator.write_weights_to_file()
 
     logger.info(f"{__name__} generate batch ids finished")
 
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
@@ -5,9 +5,14 @@ from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
 
 from welearn_datastack.data.batch_generator import BatchGenerator
-from welearn_datastack.data.enumerations import WeighedScope
+from welearn_datastack.data.enumerations import BatchManifestFormat, WeighedScope
 from welearn_datastack.modules import retrieve_data_from_database
+from welearn_datastack.modules.batch_backlog import (
+    get_backlog_file,
+    retrieve_ids_with_backlog,
+)
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -33,8 +38,10 @@ def main() -> None:
     logger.info("Load environment variables")
     parallelism_threshold: int = int(os.getenv("PARALLELISM_THRESHOLD", "100"))
     parallelism_max: int = int(os.getenv("PARALLELISM_URL_MAX", "15"))
+    parallelism_budget: int | None = int(os.getenv("PARALLELISM_BUDGET", "0")) or None
     batch_urls_directory: str = os.getenv("BATCH_URLS_DIRECTORY", "batch_urls")
     qty_max_str: str | None = os.getenv("PICK_QTY_MAX", None)
+    stream_batches: bool = os.getenv("STREAM_BATCHES", "False").lower() == "true"
 
     qty_max: int | None = None
     if qty_max_str is not None:
@@ -47,6 +54,7 @@ def main() -> None:
         parallelism_max=parallelism_max,
         batch_urls_directory=batch_urls_directory,
         output_batch_file_name=output_batch_file,
+        parallelism_budget=parallelism_budget,
     )
 
     # Database management
@@ -54,22 +62,47 @@ def main() -> None:
     db_session: Session = create_db_session()
     logger.info("DB session created")
 
-    # Get URLs from DB
+    if stream_batches:
+        logger.info("Stream ids from DB to batches")
+        batch_generator.write_streamed_batches(
+            retrieve_data_from_database.iter_documents_ids_according_process_title(
+                db_session,
+                qty_max=qty_max,
+                process_titles=[Step.DOCUMENT_CLASSIFIED_SDG],
+            )
+        )
+        logger.info("%s generate batch ids finished", __name__)
+        return
+
+    # Get URLs from DB, the ids left over by the previous run first
     logger.info("Retrieve ids from DB")
-    ids_to_batch = (
-        retrieve_data_from_database.retrieve_documents_ids_according_process_title(
+    backlog_file = get_backlog_file()
+    ids_to_batch = retrieve_ids_with_backlog(
+        db_session,
+        backlog_file,
+        [Step.DOCUMENT_CLASSIFIED_SDG],
+        batch_generator.capacity,
+        lambda: retrieve_data_from_database.retrieve_documents_ids_according_process_title(
             db_session,
             qty_max=qty_max,
             process_titles=[Step.DOCUMENT_CLASSIFIED_SDG],
             weighed_scope=WeighedScope.DOCUMENT,
-        )
+        ),
     )
     logger.info("'%s' Docsids were retrieved", len(ids_to_batch))
 
     # Create batch
     logger.info("Create batch")
     batch_generator.create_ids_batch(ids_to_batch)
-    batch_generator.write_batches_to_file()
+    if backlog_file is not None:
+        batch_generator.write_overflow_to_file(backlog_file)
+    batch_generator.write_batches_to_file(
+        retrieve_data_from_database.retrieve_documents_manifest_info(
+            db_session, ids_to_batch
+        )
+        if batch_generator.manifest_format == BatchManifestFormat.NPY
+        else None
+    )
     logger.info("Batch created")
 
     logger.info("Write quantity")
@@ -81,4 +114,4 @@ def main() -> None:
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
@@ -7,7 +7,6 @@ from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
 from welearn_database.data.models import (
     Keyword,
-    ProcessState,
     WeLearnDocument,
     WeLearnDocumentKeyword,
 )
@@ -15,9 +14,15 @@ from welearn_database.data.models import (
 from welearn_datastack.data.enumerations import MLModelsType
 from welearn_datastack.modules.keywords_extractor import extract_keywords
 from welearn_datastack.modules.retrieve_data_from_database import retrieve_models
-from welearn_datastack.modules.retrieve_data_from_files import retrieve_ids_from_csv
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
+from welearn_datastack.modules.state_writer import StateWriter
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.memory_utils import memory_tracker, track_node_memory
+from welearn_datastack.utils_.metrics_utils import export_node_metrics, metrics
 from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -34,6 +39,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+documents_counter = metrics.counter(
+    "keywords_documents", "Documents whose keywords were extracted", ["status"]
+)
+keywords_counter = metrics.counter("keywords_extracted", "Keywords extracted")
+inference_duration = metrics.histogram(
+    "keywords_inference_duration_seconds",
+    "Time spent extracting the keywords of a document",
+)
+db_write_duration = metrics.histogram(
+    "keywords_db_write_duration_seconds", "Time spent writing the process states"
+)
+
 
 def main() -> None:
     logger.info("KeywordsExtractor starting...")
@@ -42,7 +59,7 @@ def main() -> None:
 
     input_directory, _ = setup_local_path()
 
-    docids = retrieve_ids_from_csv(
+    docids = retrieve_ids_from_artifact(
         input_artifact=input_artifact, input_directory=input_directory
     )
 
@@ -53,9 +70,12 @@ def main() -> None:
 
     # Retrieve WeLearnDocument from database
     logger.info("Retrieve WeLearnDocument from database")
-    welearn_documents: List = (
-        db_session.query(WeLearnDocument).filter(WeLearnDocument.id.in_(docids)).all()
-    )
+    with memory_tracker.phase("db_load"):
+        welearn_documents: List = (
+            db_session.query(WeLearnDocument)
+            .filter(WeLearnDocument.id.in_(docids))
+            .all()
+        )
     logger.info("'%s' WeLearnDocuments were retrieved", len(welearn_documents))
 
     # Check if welearn_documents is empty
@@ -82,11 +102,20 @@ def main() -> None:
                 "No embedding model found for document ID '%s'. Skipping keywords extraction.",
                 wld.id,
             )
+            documents_counter.inc(status="no_model")
             continue
-        kwds = extract_keywords(
-            wld,
-            embedding_model_name_from_db=embedding_model_name_from_db,
-        )
+        with (
+            memory_tracker.phase(
+                "inference", lambda: len((wld.description or "").encode("utf-8"))
+            ),
+            inference_duration.time(),
+        ):
+            kwds = extract_keywords(
+                wld,
+                embedding_model_name_from_db=embedding_model_name_from_db,
+            )
+        documents_counter.inc(status="extracted")
+        keywords_counter.inc(len(kwds))
         for kw in kwds:
             existing_keyword = db_session.query(Keyword).filter_by(keyword=kw).first()
             if not existing_keyword:
@@ -110,18 +139,14 @@ def main() -> None:
 
     # Create process states
     logger.info("Creating process states")
-    for doc_id in docids:
-        db_session.add(
-            ProcessState(
-                id=uuid.uuid4(),
-                document_id=doc_id,
-                title=Step.DOCUMENT_KEYWORDS_EXTRACTED.value,
-            )
-        )
-    db_session.commit()
+    state_writer = StateWriter(db_session)
+    state_writer.add_states(docids, Step.DOCUMENT_KEYWORDS_EXTRACTED)
+    with memory_tracker.phase("writes"), db_write_duration.time():
+        state_writer.flush()
+        db_session.commit()
     db_session.close()
 
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    track_node_memory(export_node_metrics(profile_node(main)))()
@@ -0,0 +1,80 @@
+import logging
+import os
+from datetime import date
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from welearn_datastack.modules.process_state_partitions import (
+    compact_partition,
+    create_partition,
+    list_partitions,
+    months_to_create,
+    partition_name,
+    partitions_to_compact,
+)
+from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
+from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
+
+log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
+log_format: str = os.getenv(
+    "LOG_FORMAT", "[%(asctime)s][%(name)s][%(levelname)s] - %(message)s"
+)
+
+if not isinstance(log_level, int):
+    raise ValueError(f"Log level is not recognized: '{log_level}'")
+
+logging.basicConfig(
+    level=logging.getLevelName(log_level),
+    format=log_format,
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("ProcessStateArchiver starting...")
+
+    logger.info("Load environment variables")
+    months_ahead: int = int(os.getenv("PROCESS_STATE_PARTITIONS_AHEAD", 2))
+    retention_months: int = int(os.getenv("PROCESS_STATE_RETENTION_MONTHS", 6))
+    archive: bool = os.getenv("PROCESS_STATE_ARCHIVE", "False").lower() == "true"
+    logger.info("Environment variables loaded")
+
+    today = date.today()
+    db_session: Session = create_db_session()
+    try:
+        # Partitions of the next months, so no state falls into the default partition
+        partitions = set(list_partitions(db_session))
+        for month in months_to_create(today, months_ahead):
+            if partition_name(month) in partitions:
+                continue
+            try:
+                create_partition(db_session, month)
+                db_session.commit()
+                logger.info("Partition '%s' created", partition_name(month))
+            except SQLAlchemyError as e:
+                db_session.rollback()
+                logger.error(
+                    "Partition '%s' can't be created: %s", partition_name(month), e
+                )
+
+        # Old partitions are reduced to the last state of each document
+        for name in partitions_to_compact(partitions, today, retention_months):
+            removed = compact_partition(db_session, name, archive)
+            db_session.commit()
+            logger.info(
+                "'%s' superseded states were %s from partition '%s'",
+                removed,
+                "archived" if archive else "deleted",
+                name,
+            )
+    finally:
+        db_session.close()
+
+    logger.info("ProcessStateArchiver finished")
+
+
+if __name__ == "__main__":
+    load_dotenv_local()
+    profile_node(main)()
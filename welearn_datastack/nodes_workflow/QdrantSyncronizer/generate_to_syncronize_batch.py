@@ -1,13 +1,19 @@
 import logging
 import os
+from typing import Dict
 
 from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
 
 from welearn_datastack.data.batch_generator import BatchGenerator
-from welearn_datastack.data.enumerations import WeighedScope
+from welearn_datastack.data.enumerations import (
+    BatchingStrategy,
+    BatchManifestFormat,
+    WeighedScope,
+)
 from welearn_datastack.modules import retrieve_data_from_database
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -36,6 +42,9 @@ def main() -> None:
     batch_urls_directory: str = os.getenv("BATCH_URLS_DIRECTORY", "batch_urls")
     qty_max_str: str | None = os.getenv("PICK_QTY_MAX", None)
     size_limit_str: str | None = os.getenv("SIZE_TOTAL_LIMIT", None)
+    batching_strategy = BatchingStrategy[
+        os.getenv("BATCHING_STRATEGY", BatchingStrategy.COUNT.name).upper()
+    ]
 
     qty_max: int | None = None
     if qty_max_str is not None:
@@ -62,8 +71,9 @@ def main() -> None:
 
     # Get URLs from DB
     logger.info("Retrieve ids from DB")
-    ids_to_batch = (
-        retrieve_data_from_database.retrieve_documents_ids_according_process_title(
+    documents_weights: Dict[str, int] = {}
+    if batching_strategy == BatchingStrategy.WEIGHT:
+        documents_weights = retrieve_data_from_database.retrieve_documents_sizes_according_process_title(
             db_session,
             qty_max=qty_max,
             process_titles=[
@@ -74,13 +84,30 @@ def main() -> None:
             size_total_max=size_limit,
             weighed_scope=WeighedScope.DOCUMENT,
         )
-    )
+        ids_to_batch = list(documents_weights)
+    else:
+        ids_to_batch = (
+            retrieve_data_from_database.retrieve_documents_ids_according_process_title(
+                db_session,
+                qty_max=qty_max,
+                process_titles=[
+                    Step.DOCUMENT_KEYWORDS_EXTRACTED,
+                    Step.DOCUMENT_CLASSIFIED_NON_SDG,
+                    Step.DOCUMENT_IS_INVALID,
+                ],
+                size_total_max=size_limit,
+                weighed_scope=WeighedScope.DOCUMENT,
+            )
+        )
     ids_to_batch = list(set(ids_to_batch))
     logger.info("'%s' Docsids were retrieved", len(ids_to_batch))
 
     # Create batch
     logger.info("Create batch")
-    batch_generator.create_ids_batch(ids_to_batch)
+    if batching_strategy == BatchingStrategy.WEIGHT:
+        batch_generator.create_weighted_ids_batch(documents_weights)
+    else:
+        batch_generator.create_ids_batch(ids_to_batch)
     logger.info("Batch created")
 
     logger.info("Write quantity")
@@ -90,8 +117,16 @@ def main() -> None:
 
     if qty:
         logger.info("Write batches to file")
-        batch_generator.write_batches_to_file()
+        batch_generator.write_batches_to_file(
+            retrieve_data_from_database.retrieve_documents_manifest_info(
+                db_session, ids_to_batch
+            )
+            if batch_generator.manifest_format == BatchManifestFormat.NPY
+            else None
+        )
         logger.info("Batches written")
+        if batching_strategy == BatchingStrategy.WEIGHT:
+            batch_generator.write_weights_to_file()
 
     logger.info(f"{__name__} generate batch ids finished")
 
@@ -100,4 +135,4 @@ def main() -> None:
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
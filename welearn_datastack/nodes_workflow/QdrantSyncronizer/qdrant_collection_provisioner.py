@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+from qdrant_client import QdrantClient
+
+from welearn_datastack.data.qdrant_collection_spec import load_collections_specs
+from welearn_datastack.modules.qdrant_provisioning import (
+    build_index_coverage_report,
+    provision_collection,
+)
+from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
+from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
+
+log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
+log_format: str = os.getenv(
+    "LOG_FORMAT", "[%(asctime)s][%(name)s][%(levelname)s] - %(message)s"
+)
+
+if not isinstance(log_level, int):
+    raise ValueError("Log level is not recognized : '%s'", log_level)
+
+logging.basicConfig(
+    level=logging.getLevelName(log_level),
+    format=log_format,
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("QdrantCollectionProvisioner starting...")
+
+    logger.info("Load environment variables")
+    qdrant_timeout: int = int(os.getenv("QDRANT_TIMEOUT", "60"))
+    qdrant_grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    qdrant_http_port: int = int(os.getenv("QDRANT_HTTP_PORT", "6333"))
+    qdrant_url: str = os.getenv("QDRANT_URL", "localhost")
+    qdrant_prefers_grpc: bool = (
+        os.getenv("QDRANT_PREFERS_GRPC", "False").lower() == "true"
+    )
+    specs_path: str | None = os.getenv("QDRANT_COLLECTIONS_SPEC_PATH", None)
+    report_only: bool = os.getenv("QDRANT_REPORT_ONLY", "False").lower() == "true"
+
+    if not specs_path:
+        raise ValueError(
+            "Missing required environment variable: QDRANT_COLLECTIONS_SPEC_PATH"
+        )
+    logger.info("Environment variables loaded")
+
+    _, output_directory = setup_local_path()
+    specs = load_collections_specs(Path(specs_path))
+    logger.info("'%s' collections specifications loaded", len(specs))
+
+    qdrant_client = QdrantClient(
+        url=qdrant_url,
+        port=qdrant_http_port,
+        grpc_port=qdrant_grpc_port,
+        prefer_grpc=qdrant_prefers_grpc,
+        timeout=qdrant_timeout,
+        https=True,
+    )
+
+    if not report_only:
+        for spec in specs:
+            provision_collection(qdrant_client, spec)
+
+    report = build_index_coverage_report(qdrant_client, specs)
+    for collection_report in report:
+        if collection_report.get("missing_fields") or not collection_report["exists"]:
+            logger.warning("Collection not fully provisioned: %s", collection_report)
+
+    report_path = output_directory / "qdrant_index_coverage.json"
+    with report_path.open("w") as f:
+        json.dump(report, f, indent=2)
+    logger.info("Index coverage report written in %s", report_path)
+
+    logger.info("QdrantCollectionProvisioner finished")
+
+
+if __name__ == "__main__":
+    load_dotenv_local()
+    profile_node(main)()
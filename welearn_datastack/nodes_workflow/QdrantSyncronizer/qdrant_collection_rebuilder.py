@@ -0,0 +1,397 @@
+import logging
+import os
+import time
+from datetime import datetime
+from itertools import batched
+from pathlib import Path
+from typing import List, Sequence, Type
+from uuid import UUID
+
+import numpy
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import models
+from sqlalchemy.orm import Session
+from welearn_database.data.enumeration import Step
+from welearn_database.data.models import DocumentSlice, EmbeddingModel
+
+from welearn_datastack.data.qdrant_collection_spec import (
+    DEFAULT_PAYLOAD_INDEXES,
+    QdrantCollectionSpec,
+    load_collections_specs,
+)
+from welearn_datastack.modules.qdrant_handler import (
+    build_points_for_documents,
+    create_bulk_load_collection,
+    delete_points_related_to_document,
+    enable_collection_indexing,
+    group_slices_per_document,
+    swap_collection_alias,
+    validate_collection_points_count,
+)
+from welearn_datastack.modules.qdrant_provisioning import ensure_payload_indexes
+from welearn_datastack.modules.retrieve_data_from_database import (
+    count_slices_for_collection,
+    retrieve_documents_ids_for_collection,
+    retrieve_documents_ids_with_state_since,
+)
+from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
+from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
+
+log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
+log_format: str = os.getenv(
+    "LOG_FORMAT", "[%(asctime)s][%(name)s][%(levelname)s] - %(message)s"
+)
+
+if not isinstance(log_level, int):
+    raise ValueError("Log level is not recognized : '%s'", log_level)
+
+logging.basicConfig(
+    level=logging.getLevelName(log_level),
+    format=log_format,
+)
+logger = logging.getLogger(__name__)
+
+# Documents in these states are the ones served by the collection
+INDEXED_STEPS = [Step.DOCUMENT_IN_QDRANT]
+
+
+def _resolve_vectors_config(
+    db_session: Session,
+    qdrant_client: QdrantClient,
+    alias_name: str,
+    docids: List[UUID],
+) -> models.VectorParams:
+    """
+    Get the vectors configuration of the new collection : same as the collection currently served if it exists,
+    deduced from the stored embeddings otherwise
+    :param db_session: Database session
+    :param qdrant_client: Qdrant client
+    :param alias_name: Alias of the collection
+    :param docids: Documents which gonna be loaded in the collection
+    :return: Vectors configuration
+    """
+    if qdrant_client.collection_exists(alias_name):
+        vectors = qdrant_client.get_collection(alias_name).config.params.vectors
+        if isinstance(vectors, models.VectorParams):
+            return vectors
+
+    if not docids:
+        raise ValueError(
+            f"Can't deduce vectors size for {alias_name}, no collection and no documents found"
+        )
+    first_slice = (
+        db_session.query(DocumentSlice)
+        .filter(DocumentSlice.document_id == docids[0])
+        .first()
+    )
+    vector_size = numpy.frombuffer(
+        bytes(first_slice.embedding), dtype=numpy.float32  # type: ignore
+    ).shape[0]
+    return models.VectorParams(size=vector_size, distance=models.Distance.COSINE)
+
+
+def load_documents_in_collection(
+    db_session: Session,
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    embedding_model_title: str,
+    docids: List[UUID],
+    chunk_size: int,
+) -> int:
+    """
+    Bulk load the slices of the given documents in a collection. Only the last upsert waits for the operations to
+    be applied.
+    :param db_session: Database session
+    :param qdrant_client: Qdrant client
+    :param collection_name: Collection to load
+    :param embedding_model_title: Title of the embedding model of the collection
+    :param docids: Documents to load
+    :param chunk_size: Quantity of documents per upsert
+    :return: Quantity of points upserted
+    """
+    chunks = list(batched(docids, chunk_size))
+    points_qty = 0
+    start = time.monotonic()
+    for i, chunk in enumerate(chunks):
+        slices: Sequence[Type[DocumentSlice]] = (
+            db_session.query(DocumentSlice)  # type: ignore
+            .join(EmbeddingModel, DocumentSlice.embedding_model_id == EmbeddingModel.id)
+            .filter(
+                DocumentSlice.document_id.in_(chunk),
+                EmbeddingModel.title == embedding_model_title,
+            )
+            .all()
+        )
+        points = build_points_for_documents(
+            db_session, chunk, group_slices_per_document(slices)
+        )
+        if points:
+            qdrant_client.upsert(
+                collection_name=collection_name,
+                points=points,
+                wait=i == len(chunks) - 1,
+            )
+        points_qty += len(points)
+        # Loaded slices are not needed anymore, keep the session small
+        db_session.expunge_all()
+        logger.info(
+            "Chunk #%s/%s loaded, %s points so far", i + 1, len(chunks), points_qty
+        )
+
+    elapsed = time.monotonic() - start
+    logger.info(
+        "'%s' points loaded in %.1fs (%.1f points/s)",
+        points_qty,
+        elapsed,
+        points_qty / elapsed if elapsed else 0,
+    )
+    return points_qty
+
+
+def _catch_up_modified_documents(
+    db_session: Session,
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    embedding_model_title: str,
+    lang: str | None,
+    since: datetime,
+    chunk_size: int,
+) -> None:
+    """
+    Reload in a collection the documents which got a new process state since a date : their points are deleted and
+    the ones still indexed are loaded again
+    :param db_session: Database session
+    :param qdrant_client: Qdrant client
+    :param collection_name: Collection to catch up
+    :param embedding_model_title: Title of the embedding model of the collection
+    :param lang: Language of the collection, None for a multilingual collection
+    :param since: Date from which the documents are considered modified
+    :param chunk_size: Quantity of documents loaded per chunk
+    """
+    modified_docids = retrieve_documents_ids_with_state_since(db_session, since)
+    logger.info("'%s' documents were modified since %s", len(modified_docids), since)
+    if not modified_docids:
+        return
+    delete_points_related_to_document(
+        collection_name=collection_name,
+        qdrant_connector=qdrant_client,
+        documents_ids=modified_docids,
+        qdrant_wait=True,
+    )
+    load_documents_in_collection(
+        db_session,
+        qdrant_client,
+        collection_name,
+        embedding_model_title,
+        retrieve_documents_ids_for_collection(
+            db_session,
+            embedding_model_title,
+            lang,
+            INDEXED_STEPS,
+            documents_ids=modified_docids,
+        ),
+        chunk_size,
+    )
+
+
+def rebuild_collection(
+    db_session: Session,
+    qdrant_client: QdrantClient,
+    embedding_model_title: str,
+    lang: str | None,
+    version: str,
+    chunk_size: int = 1000,
+    indexing_threshold: int = 20000,
+    indexing_timeout: int = 3600,
+    replace_collection: bool = False,
+    drop_old_collection: bool = False,
+    spec: QdrantCollectionSpec | None = None,
+) -> str:
+    """
+    Blue/green rebuild of a collection : a new versioned collection is bulk loaded with indexing disabled, indexed,
+    validated against the database and then the stable alias is atomically swapped to it.
+
+    Documents whose process state changed during the load are synchronized again before the swap.
+
+    :param db_session: Database session
+    :param qdrant_client: Qdrant client
+    :param embedding_model_title: Title of the embedding model of the collection
+    :param lang: Language of the collection, None for a multilingual collection
+    :param version: Version suffix of the new collection
+    :param chunk_size: Quantity of documents per upsert
+    :param indexing_threshold: Indexing threshold set on the collection once loaded
+    :param indexing_timeout: Max time to wait for the indexing, in seconds
+    :param replace_collection: Allow to delete a collection named like the alias, needed the first time a collection
+    is rebuilt if it was created by hand. The collection is unavailable between its deletion and the alias creation.
+    :param drop_old_collection: Delete the collection previously pointed by the alias
+    :param spec: Specification of the collection (vectors, HNSW, quantization, payload indexes), the vectors
+    configuration of the current collection and the default payload indexes are used if None
+    :return: Name of the new collection
+    """
+    rebuild_start = datetime.now()
+    alias_name = f"collection_welearn_{lang or 'mul'}_{embedding_model_title}"
+    new_collection = f"{alias_name}_{version}"
+    logger.info("Rebuild %s in %s", alias_name, new_collection)
+
+    physical_collections = [c.name for c in qdrant_client.get_collections().collections]
+    if alias_name in physical_collections and not replace_collection:
+        raise ValueError(
+            f"{alias_name} is a collection and not an alias, allow its replacement for the first rebuild"
+        )
+
+    docids = retrieve_documents_ids_for_collection(
+        db_session, embedding_model_title, lang, INDEXED_STEPS
+    )
+    if spec is not None:
+        create_bulk_load_collection(
+            qdrant_client,
+            new_collection,
+            spec.vectors_config(),
+            hnsw_config=spec.hnsw_config(),
+            quantization_config=spec.quantization_config(),
+        )
+        payload_indexes = spec.payload_indexes
+    else:
+        vectors_config = _resolve_vectors_config(
+            db_session, qdrant_client, alias_name, docids
+        )
+        create_bulk_load_collection(qdrant_client, new_collection, vectors_config)
+        payload_indexes = DEFAULT_PAYLOAD_INDEXES
+    # Payload indexes are created before the load, they are built along the points
+    ensure_payload_indexes(qdrant_client, new_collection, payload_indexes)
+    load_documents_in_collection(
+        db_session,
+        qdrant_client,
+        new_collection,
+        embedding_model_title,
+        docids,
+        chunk_size,
+    )
+
+    # Catch up the documents modified during the load
+    catch_up_start = datetime.now()
+    _catch_up_modified_documents(
+        db_session,
+        qdrant_client,
+        new_collection,
+        embedding_model_title,
+        lang,
+        rebuild_start,
+        chunk_size,
+    )
+
+    enable_collection_indexing(
+        qdrant_client, new_collection, indexing_threshold, indexing_timeout
+    )
+    # The indexing can be long, catch up again the documents modified since the first catch up started
+    _catch_up_modified_documents(
+        db_session,
+        qdrant_client,
+        new_collection,
+        embedding_model_title,
+        lang,
+        catch_up_start,
+        chunk_size,
+    )
+    validate_collection_points_count(
+        qdrant_client,
+        new_collection,
+        count_slices_for_collection(
+            db_session, embedding_model_title, lang, INDEXED_STEPS
+        ),
+    )
+
+    if alias_name in physical_collections:
+        logger.warning("Delete collection %s to replace it by an alias", alias_name)
+        qdrant_client.delete_collection(alias_name)
+
+    previous_collection = swap_collection_alias(
+        qdrant_client, alias_name, new_collection
+    )
+    if drop_old_collection and previous_collection:
+        logger.info("Delete old collection %s", previous_collection)
+        qdrant_client.delete_collection(previous_collection)
+
+    return new_collection
+
+
+def main() -> None:
+    logger.info("QdrantCollectionRebuilder starting...")
+
+    logger.info("Load environment variables")
+    qdrant_timeout: int = int(os.getenv("QDRANT_TIMEOUT", "60"))
+    qdrant_grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    qdrant_http_port: int = int(os.getenv("QDRANT_HTTP_PORT", "6333"))
+    qdrant_url: str = os.getenv("QDRANT_URL", "localhost")
+    qdrant_prefers_grpc: bool = (
+        os.getenv("QDRANT_PREFERS_GRPC", "False").lower() == "true"
+    )
+    qdrant_chunk_size = int(os.getenv("QDRANT_CHUNK_SIZE", 1000))
+    embedding_model_title: str | None = os.getenv("REBUILD_EMBEDDING_MODEL", None)
+    lang: str | None = os.getenv("REBUILD_LANG", None)
+    version: str = os.getenv(
+        "REBUILD_VERSION", datetime.now().strftime("v%Y%m%d%H%M%S")
+    )
+    indexing_threshold = int(os.getenv("REBUILD_INDEXING_THRESHOLD", "20000"))
+    indexing_timeout = int(os.getenv("REBUILD_INDEXING_TIMEOUT", "3600"))
+    replace_collection = (
+        os.getenv("REBUILD_REPLACE_COLLECTION", "False").lower() == "true"
+    )
+    drop_old_collection = (
+        os.getenv("REBUILD_DROP_OLD_COLLECTION", "False").lower() == "true"
+    )
+
+    specs_path: str | None = os.getenv("QDRANT_COLLECTIONS_SPEC_PATH", None)
+
+    if not embedding_model_title:
+        raise ValueError(
+            "Missing required environment variable: REBUILD_EMBEDDING_MODEL"
+        )
+    if lang == "mul":
+        lang = None
+    logger.info("Environment variables loaded")
+
+    spec: QdrantCollectionSpec | None = None
+    if specs_path:
+        alias_name = f"collection_welearn_{lang or 'mul'}_{embedding_model_title}"
+        specs = {s.name: s for s in load_collections_specs(Path(specs_path))}
+        spec = specs.get(alias_name)
+        logger.info("Specification found for %s: %s", alias_name, spec is not None)
+
+    # Database management
+    logger.info("Create DB session")
+    db_session: Session = create_db_session()
+    logger.info("DB session created")
+
+    qdrant_client = QdrantClient(
+        url=qdrant_url,
+        port=qdrant_http_port,
+        grpc_port=qdrant_grpc_port,
+        prefer_grpc=qdrant_prefers_grpc,
+        timeout=qdrant_timeout,
+        https=True,
+    )
+
+    new_collection = rebuild_collection(
+        db_session=db_session,
+        qdrant_client=qdrant_client,
+        embedding_model_title=embedding_model_title,
+        lang=lang,
+        version=version,
+        chunk_size=qdrant_chunk_size,
+        indexing_threshold=indexing_threshold,
+        indexing_timeout=indexing_timeout,
+        replace_collection=replace_collection,
+        drop_old_collection=drop_old_collection,
+        spec=spec,
+    )
+    logger.info("Collection %s is now served", new_collection)
+
+    db_session.close()
+    logger.info("QdrantCollectionRebuilder finished")
+
+
+if __name__ == "__main__":
+    load_dotenv_local()
+    profile_node(main)()
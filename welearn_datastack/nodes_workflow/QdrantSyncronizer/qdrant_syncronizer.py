@@ -1,30 +1,40 @@
+import asyncio
 import logging
 import os
-import uuid
-from collections import Counter
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from itertools import batched
-from typing import Dict, List, Sequence, Type
+from typing import Callable, Collection, Dict, List, Sequence, Set, Type, TypeVar
 from uuid import UUID
 
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http.models import PointStruct, UpdateStatus
 from qdrant_client.qdrant_remote import QdrantRemote
 from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
-from welearn_database.data.models import DocumentSlice, ProcessState
+from welearn_database.data.models import DocumentSlice
 
+from welearn_datastack.exceptions import ErrorWhileDeletingChunks
 from welearn_datastack.modules.qdrant_handler import (
+    async_delete_points_related_to_document,
+    async_get_collections_names,
+    build_points_for_documents,
     classify_documents_per_collection,
-    convert_slice_in_qdrant_point,
     delete_points_related_to_document,
+    group_slices_per_document,
 )
 from welearn_datastack.modules.retrieve_data_from_database import (
     check_process_state_for_documents,
-    retrieve_slices_sdgs,
 )
-from welearn_datastack.modules.retrieve_data_from_files import retrieve_ids_from_csv
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
+from welearn_datastack.modules.state_writer import StateWriter
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.metrics_utils import export_node_metrics, metrics
 from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -41,56 +51,192 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-def main() -> None:
-    logger.info("QdrantSyncronizer starting...")
+SUCCESSFUL_UPDATE_STATUS = [UpdateStatus.ACKNOWLEDGED, UpdateStatus.COMPLETED]
 
-    logger.info("Load environment variables")
-    qdrant_timeout: int = int(os.getenv("QDRANT_TIMEOUT", "60"))
-    qdrant_grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
-    qdrant_http_port: int = int(os.getenv("QDRANT_HTTP_PORT", "6333"))
-    qdrant_url: str = os.getenv("QDRANT_URL", "localhost")
-    qdrant_prefers_grpc: bool = (
-        os.getenv("QDRANT_PREFERS_GRPC", "False").lower() == "true"
-    )
-    qdrant_wait: bool = os.getenv("QDRANT_WAIT", "False").lower() == "true"
-    qdrant_chunk_size = int(os.getenv("QDRANT_CHUNK_SIZE", 1000))
-    input_artifact = os.getenv("ARTIFACT_ID_URL_CSV_NAME", "batch_ids.csv")
+documents_counter = metrics.counter(
+    "qdrant_documents", "Documents synchronized, per step reached", ["step"]
+)
+points_counter = metrics.counter(
+    "qdrant_points", "Points upserted in Qdrant", ["collection"]
+)
+upsert_duration = metrics.histogram(
+    "qdrant_upsert_duration_seconds",
+    "Time spent upserting the points of a chunk in a collection",
+    ["collection"],
+)
+db_read_duration = metrics.histogram(
+    "qdrant_db_read_duration_seconds",
+    "Time spent reading the slices of a chunk and building its points",
+)
 
-    logger.info("Environment variables loaded")
-    logger.info("Input artifact url json name: %s", input_artifact)
-    logger.info("Qdrant URL: %s", qdrant_url)
-    logger.info("Qdrant GRPC Port: %s", qdrant_grpc_port)
-    logger.info("Qdrant HTTP Port: %s", qdrant_http_port)
-    logger.info("Qdrant Prefers GRPC: %s", qdrant_prefers_grpc)
-    logger.info("Qdrant chunk Size: %s", qdrant_chunk_size)
 
-    input_directory, _ = setup_local_path()
+@dataclass
+class PreparedChunk:
+    """
+    Everything needed from the database to synchronize one chunk of documents with Qdrant
+    """
 
-    docids = retrieve_ids_from_csv(
-        input_artifact=input_artifact, input_directory=input_directory
+    index: int
+    no_collection_docs_ids: Set[UUID] = field(default_factory=set)
+    docs_ids_per_collection: Dict[str, Set[UUID]] = field(default_factory=dict)
+    docs_ids_to_insert_per_collection: Dict[str, List[UUID]] = field(
+        default_factory=dict
     )
+    points_per_collection: Dict[str, List[PointStruct]] = field(default_factory=dict)
 
-    # Database management
-    logger.info("Create DB session")
-    db_session: Session = create_db_session()
-    logger.info("DB session created")
 
-    qdrant_chunk: batched[UUID] = batched(iterable=docids, n=qdrant_chunk_size)
+def _add_process_states(db_session: Session, docs_ids: Collection[UUID], step: Step):
+    """
+    Add and commit a new process state for each given document
+    :param db_session: Database session
+    :param docs_ids: Documents ids
+    :param step: Step reached by the documents
+    """
+    state_writer = StateWriter(db_session)
+    state_writer.add_states(docs_ids, step)
+    state_writer.flush()
+    db_session.commit()
+    documents_counter.inc(len(docs_ids), step=step.value)
 
-    qdrant_client = QdrantClient(
-        url=qdrant_url,
-        port=qdrant_http_port,
-        grpc_port=qdrant_grpc_port,
-        prefer_grpc=qdrant_prefers_grpc,
-        timeout=qdrant_timeout,
-        https=True,
+
+def prepare_chunk(
+    db_session: Session,
+    chunk: Collection[UUID],
+    collections_names: Collection[str],
+    index: int = 0,
+) -> PreparedChunk:
+    """
+    Database side of the synchronization of a chunk : retrieve slices, sort documents per collection, check their
+    process state and build the points to upsert
+    :param db_session: Database session
+    :param chunk: Documents ids of the chunk
+    :param collections_names: Collections names available in Qdrant
+    :param index: Index of the chunk, only used for logging
+    :return: Prepared chunk
+    """
+    logger.info("Preparing chunk: #%s", index)
+    start = time.perf_counter()
+    slices: Sequence[Type[DocumentSlice]] = (
+        db_session.query(DocumentSlice)  # type: ignore
+        .filter(DocumentSlice.document_id.in_(chunk))
+        .all()
     )
+    logger.info("'%s' Slices were retrieved", len(slices))
+    slices_per_doc = group_slices_per_document(slices)
 
-    if isinstance(qdrant_client._client, QdrantRemote):
-        qdrant_host = qdrant_client._client._host
-        qdrant_port = qdrant_client._client._port
-        logger.info(f"Qdrant client connected to {qdrant_host}:{qdrant_port}")
+    documents_per_collection = classify_documents_per_collection(
+        qdrant_connector=None, slices=slices, collections_names=collections_names
+    )
+
+    ret = PreparedChunk(index=index)
+    ret.no_collection_docs_ids = documents_per_collection.pop(None)
+    for collection_name, docs_ids in documents_per_collection.items():
+        ids_doc_need_to_insert = check_process_state_for_documents(
+            db_session=db_session,
+            documents_ids=list(docs_ids),
+            steps=[Step.DOCUMENT_KEYWORDS_EXTRACTED],
+        )
+        ret.docs_ids_per_collection[collection_name] = docs_ids  # type: ignore
+        ret.docs_ids_to_insert_per_collection[collection_name] = ids_doc_need_to_insert  # type: ignore
+        ret.points_per_collection[collection_name] = build_points_for_documents(  # type: ignore
+            db_session, ids_doc_need_to_insert, slices_per_doc
+        )
+    db_read_duration.observe(time.perf_counter() - start)
+    return ret
+
+
+async def _upload_collection(
+    qdrant_client: AsyncQdrantClient,
+    collection_name: str,
+    prepared_chunk: PreparedChunk,
+    qdrant_wait: bool,
+    semaphore: asyncio.Semaphore,
+) -> Dict[Step, List[UUID]]:
+    """
+    Qdrant side of the synchronization of one collection of a chunk : delete old points and upsert the new ones
+    :param qdrant_client: Async Qdrant client
+    :param collection_name: Collection to work on
+    :param prepared_chunk: Chunk prepared by prepare_chunk
+    :param qdrant_wait: Flag to wait for the operations to be done
+    :param semaphore: Semaphore limiting the quantity of in-flight collections uploads
+    :return: Documents ids per step they reached
+    """
+    docs_ids = prepared_chunk.docs_ids_per_collection[collection_name]
+    ids_doc_need_to_insert = prepared_chunk.docs_ids_to_insert_per_collection[
+        collection_name
+    ]
+    points = prepared_chunk.points_per_collection[collection_name]
+    ret: Dict[Step, List[UUID]] = {
+        Step.DOCUMENT_IN_QDRANT: [],
+        Step.KEPT_FOR_TRACE: [],
+    }
+
+    async with semaphore:
+        logger.info(
+            "Chunk #%s, we are working on collection : %s",
+            prepared_chunk.index,
+            collection_name,
+        )
+        try:
+            del_res = await async_delete_points_related_to_document(
+                collection_name=collection_name,
+                qdrant_connector=qdrant_client,
+                documents_ids=list(docs_ids),
+                qdrant_wait=qdrant_wait,
+            )
+        except ErrorWhileDeletingChunks as e:
+            logger.error(
+                "Deletion operation failed for collection %s: %s", collection_name, e
+            )
+            return ret
+        logger.info("deletion operation result : %s", del_res)
+
+        if len(ids_doc_need_to_insert) > 0:
+            logger.info("Inserting '%s' points", len(points))
+            with upsert_duration.time(collection=collection_name):
+                insert_res = await qdrant_client.upsert(
+                    collection_name=collection_name,
+                    points=points,
+                    wait=qdrant_wait,
+                )
+            points_counter.inc(len(points), collection=collection_name)
+            logger.info("Insertion operation result : %s", insert_res)
+            if insert_res.status in SUCCESSFUL_UPDATE_STATUS:
+                ret[Step.DOCUMENT_IN_QDRANT].extend(ids_doc_need_to_insert)
+            else:
+                logger.error(
+                    "Insertion operation failed for collection %s", collection_name
+                )
+
+    if del_res.status in SUCCESSFUL_UPDATE_STATUS:
+        ret[Step.KEPT_FOR_TRACE].extend(
+            [docid for docid in docs_ids if docid not in ids_doc_need_to_insert]
+        )
+    else:
+        logger.error("Deletion operation failed for collection %s", collection_name)
+
+    return ret
+
+
+def syncronize(
+    db_session: Session,
+    qdrant_client: QdrantClient,
+    docids: List[UUID],
+    qdrant_chunk_size: int,
+    qdrant_wait: bool,
+) -> None:
+    """
+    Sequential synchronization : each chunk is read from the database then uploaded in Qdrant, collection per
+    collection.
+    :param db_session: Database session
+    :param qdrant_client: Qdrant client
+    :param docids: Documents ids to synchronize
+    :param qdrant_chunk_size: Quantity of documents per chunk
+    :param qdrant_wait: Flag to wait for the Qdrant operations to be done
+    """
+    qdrant_chunk: batched[UUID] = batched(iterable=docids, n=qdrant_chunk_size)
 
     for i, chunk in enumerate(qdrant_chunk):
         logger.info("Processing chunk: #%s", i)
@@ -102,11 +248,7 @@ def main() -> None:
         logger.info("'%s' Slices were retrieved", len(slices))
 
         # Group slices by document id
-        slices_per_doc: Dict[UUID, List[Type[DocumentSlice]]] = {}
-        for s in slices:
-            if s.document_id not in slices_per_doc:
-                slices_per_doc[s.document_id] = []  # type: ignore
-            slices_per_doc[s.document_id].append(s)  # type: ignore
+        slices_per_doc = group_slices_per_document(slices)
 
         # Get collections names
         documents_per_collection = classify_documents_per_collection(
@@ -117,16 +259,9 @@ def main() -> None:
         logger.info(
             "Flag documents with no collection: %s", len(documents_per_collection[None])
         )
-        for docid in documents_per_collection[None]:
-            db_session.add(
-                ProcessState(
-                    id=uuid.uuid4(),
-                    document_id=docid,
-                    title=Step.KEPT_FOR_TRACE.value,
-                )
-            )
-        del documents_per_collection[None]
-        db_session.commit()
+        _add_process_states(
+            db_session, documents_per_collection.pop(None), Step.KEPT_FOR_TRACE
+        )
 
         # Iterate on each collection
         for collection_name in documents_per_collection:
@@ -157,75 +292,259 @@ def main() -> None:
 
             if len(ids_doc_need_to_insert) > 0:
                 # Generate points if needed
-                points: List[PointStruct] = []
-                for docid in ids_doc_need_to_insert:
-                    document_slices = slices_per_doc[docid]
-                    slices_sdgs = retrieve_slices_sdgs(db_session, document_slices)
-                    all_document_sdgs = [
-                        slices_sdgs[s.id]  # type: ignore
-                        for s in document_slices
-                        if s.id in slices_sdgs
-                    ]
-                    accurate_sdgs = [
-                        sdg for sdg, _ in Counter(all_document_sdgs).most_common(2)
-                    ]
-                    for doc_slice in document_slices:
-                        # Filter slices with no SDG
-                        if doc_slice.id in slices_sdgs:
-                            points.append(
-                                convert_slice_in_qdrant_point(
-                                    slice_to_convert=doc_slice,
-                                    document_sdgs=accurate_sdgs,
-                                    slice_sdg=slices_sdgs[doc_slice.id],  # type: ignore
-                                )
-                            )
+                points = build_points_for_documents(
+                    db_session, ids_doc_need_to_insert, slices_per_doc
+                )
 
                 # Insert points
                 logger.info("Inserting points")
-                insert_res = qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=points,
-                    wait=qdrant_wait,
-                )
+                with upsert_duration.time(collection=collection_name):
+                    insert_res = qdrant_client.upsert(
+                        collection_name=collection_name,
+                        points=points,
+                        wait=qdrant_wait,
+                    )
+                points_counter.inc(len(points), collection=collection_name)
 
                 logger.info("Insertion operation result : %s", insert_res)
 
                 # Add new process state
                 logger.info("Adding new process state")
-                if insert_res.status in [
-                    UpdateStatus.ACKNOWLEDGED,
-                    UpdateStatus.COMPLETED,
-                ]:
-                    for docid in ids_doc_need_to_insert:
-                        db_session.add(
-                            ProcessState(
-                                id=uuid.uuid4(),
-                                document_id=docid,
-                                title=Step.DOCUMENT_IN_QDRANT.value,
-                            )
-                        )
-                    db_session.commit()
+                if insert_res.status in SUCCESSFUL_UPDATE_STATUS:
+                    _add_process_states(
+                        db_session, ids_doc_need_to_insert, Step.DOCUMENT_IN_QDRANT
+                    )
                 else:
                     logger.error(
                         "Insertion operation failed for collection %s", collection_name
                     )
 
-            if del_res.status in [UpdateStatus.ACKNOWLEDGED, UpdateStatus.COMPLETED]:
-                for docid in documents_per_collection[collection_name]:
-                    if docid not in ids_doc_need_to_insert:
-                        db_session.add(
-                            ProcessState(
-                                id=uuid.uuid4(),
-                                document_id=docid,
-                                title=Step.KEPT_FOR_TRACE.value,
-                            )
-                        )
-                db_session.commit()
+            if del_res.status in SUCCESSFUL_UPDATE_STATUS:
+                _add_process_states(
+                    db_session,
+                    [
+                        docid
+                        for docid in documents_per_collection[collection_name]
+                        if docid not in ids_doc_need_to_insert
+                    ],
+                    Step.KEPT_FOR_TRACE,
+                )
             else:
                 logger.error(
                     "Deletion operation failed for collection %s", collection_name
                 )
 
+
+async def async_syncronize(
+    db_session: Session,
+    qdrant_client: AsyncQdrantClient,
+    docids: List[UUID],
+    qdrant_chunk_size: int,
+    qdrant_wait: bool,
+    max_in_flight: int,
+) -> None:
+    """
+    Pipelined synchronization : database work of chunk N+1 (preparation, then process states of chunk N) is done
+    while chunk N is uploaded in Qdrant, and the collections of a chunk are uploaded concurrently.
+    Every database operation is done in a single dedicated thread because the session is not thread safe.
+    The Qdrant client is closed at the end.
+    :param db_session: Database session
+    :param qdrant_client: Async Qdrant client
+    :param docids: Documents ids to synchronize
+    :param qdrant_chunk_size: Quantity of documents per chunk
+    :param qdrant_wait: Flag to wait for the Qdrant operations to be done
+    :param max_in_flight: Max quantity of collections uploads running at the same time
+    """
+    try:
+        await _async_syncronize(
+            db_session=db_session,
+            qdrant_client=qdrant_client,
+            docids=docids,
+            qdrant_chunk_size=qdrant_chunk_size,
+            qdrant_wait=qdrant_wait,
+            max_in_flight=max_in_flight,
+        )
+    finally:
+        await qdrant_client.close()
+
+
+def _add_chunk_process_states(
+    db_session: Session, docs_ids_per_step: Dict[Step, List[UUID]], index: int
+) -> None:
+    """
+    Add and commit the process states reached by the documents of a chunk
+    :param db_session: Database session
+    :param docs_ids_per_step: Documents ids per step they reached
+    :param index: Index of the chunk, only used for logging
+    """
+    logger.info("Adding new process state for chunk #%s", index)
+    for step, docs_ids in docs_ids_per_step.items():
+        _add_process_states(db_session, docs_ids, step)
+
+
+async def _async_syncronize(
+    db_session: Session,
+    qdrant_client: AsyncQdrantClient,
+    docids: List[UUID],
+    qdrant_chunk_size: int,
+    qdrant_wait: bool,
+    max_in_flight: int,
+) -> None:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_in_flight)
+    chunks = [list(chunk) for chunk in batched(docids, qdrant_chunk_size)]
+    if not chunks:
+        logger.info("No documents to synchronize")
+        return
+
+    collections_names = await async_get_collections_names(qdrant_client)
+
+    with ThreadPoolExecutor(max_workers=1) as db_executor:
+
+        def run_db(func: Callable[..., T], *args) -> asyncio.Future[T]:
+            return loop.run_in_executor(db_executor, func, *args)
+
+        states_writes: List[asyncio.Future[None]] = []
+        next_prepared = run_db(
+            prepare_chunk, db_session, chunks[0], collections_names, 0
+        )
+        for i in range(len(chunks)):
+            prepared_chunk = await next_prepared
+
+            # Fetch next chunk from database while current one is uploaded
+            if i + 1 < len(chunks):
+                next_prepared = run_db(
+                    prepare_chunk, db_session, chunks[i + 1], collections_names, i + 1
+                )
+
+            collections_names_of_chunk = list(prepared_chunk.docs_ids_per_collection)
+            results = await asyncio.gather(
+                *[
+                    _upload_collection(
+                        qdrant_client=qdrant_client,
+                        collection_name=collection_name,
+                        prepared_chunk=prepared_chunk,
+                        qdrant_wait=qdrant_wait,
+                        semaphore=semaphore,
+                    )
+                    for collection_name in collections_names_of_chunk
+                ],
+                return_exceptions=True,
+            )
+
+            logger.info(
+                "Flag documents with no collection: %s",
+                len(prepared_chunk.no_collection_docs_ids),
+            )
+            docs_ids_per_step: Dict[Step, List[UUID]] = {
+                Step.DOCUMENT_IN_QDRANT: [],
+                Step.KEPT_FOR_TRACE: list(prepared_chunk.no_collection_docs_ids),
+            }
+            for collection_name, res in zip(collections_names_of_chunk, results):
+                if isinstance(res, BaseException):
+                    # The documents of this collection keep their state and are synchronized again next time
+                    logger.error(
+                        "Synchronization failed for collection %s in chunk #%s: %s",
+                        collection_name,
+                        i,
+                        res,
+                    )
+                    continue
+                for step, docs_ids in res.items():
+                    docs_ids_per_step[step].extend(docs_ids)
+
+            # Not awaited : the states are written while the next chunk is uploaded
+            states_writes.append(
+                run_db(_add_chunk_process_states, db_session, docs_ids_per_step, i)
+            )
+
+        await asyncio.gather(*states_writes)
+
+
+def main() -> None:
+    logger.info("QdrantSyncronizer starting...")
+
+    logger.info("Load environment variables")
+    qdrant_timeout: int = int(os.getenv("QDRANT_TIMEOUT", "60"))
+    qdrant_grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    qdrant_http_port: int = int(os.getenv("QDRANT_HTTP_PORT", "6333"))
+    qdrant_url: str = os.getenv("QDRANT_URL", "localhost")
+    qdrant_prefers_grpc: bool = (
+        os.getenv("QDRANT_PREFERS_GRPC", "False").lower() == "true"
+    )
+    qdrant_wait: bool = os.getenv("QDRANT_WAIT", "False").lower() == "true"
+    qdrant_chunk_size = int(os.getenv("QDRANT_CHUNK_SIZE", 1000))
+    input_artifact = os.getenv("ARTIFACT_ID_URL_CSV_NAME", "batch_ids.csv")
+    qdrant_sync_mode: str = os.getenv("QDRANT_SYNC_MODE", "sync").lower()
+    qdrant_max_in_flight: int = int(os.getenv("QDRANT_MAX_IN_FLIGHT", "4"))
+
+    logger.info("Environment variables loaded")
+    logger.info("Input artifact url json name: %s", input_artifact)
+    logger.info("Qdrant URL: %s", qdrant_url)
+    logger.info("Qdrant GRPC Port: %s", qdrant_grpc_port)
+    logger.info("Qdrant HTTP Port: %s", qdrant_http_port)
+    logger.info("Qdrant Prefers GRPC: %s", qdrant_prefers_grpc)
+    logger.info("Qdrant chunk Size: %s", qdrant_chunk_size)
+    logger.info("Qdrant sync mode: %s", qdrant_sync_mode)
+
+    input_directory, _ = setup_local_path()
+
+    docids = retrieve_ids_from_artifact(
+        input_artifact=input_artifact, input_directory=input_directory
+    )
+
+    # Database management
+    logger.info("Create DB session")
+    db_session: Session = create_db_session()
+    logger.info("DB session created")
+
+    if qdrant_sync_mode == "async":
+        logger.info("Qdrant max in flight uploads: %s", qdrant_max_in_flight)
+        async_qdrant_client = AsyncQdrantClient(
+            url=qdrant_url,
+            port=qdrant_http_port,
+            grpc_port=qdrant_grpc_port,
+            prefer_grpc=qdrant_prefers_grpc,
+            timeout=qdrant_timeout,
+            https=True,
+        )
+        asyncio.run(
+            async_syncronize(
+                db_session=db_session,
+                qdrant_client=async_qdrant_client,
+                docids=docids,
+                qdrant_chunk_size=qdrant_chunk_size,
+                qdrant_wait=qdrant_wait,
+                max_in_flight=qdrant_max_in_flight,
+            )
+        )
+        logger.info("Closing DB session")
+        db_session.close()
+        logger.info("QdrantSyncronizer finished")
+        return
+
+    qdrant_client = QdrantClient(
+        url=qdrant_url,
+        port=qdrant_http_port,
+        grpc_port=qdrant_grpc_port,
+        prefer_grpc=qdrant_prefers_grpc,
+        timeout=qdrant_timeout,
+        https=True,
+    )
+
+    if isinstance(qdrant_client._client, QdrantRemote):
+        qdrant_host = qdrant_client._client._host
+        qdrant_port = qdrant_client._client._port
+        logger.info(f"Qdrant client connected to {qdrant_host}:{qdrant_port}")
+
+    syncronize(
+        db_session=db_session,
+        qdrant_client=qdrant_client,
+        docids=docids,
+        qdrant_chunk_size=qdrant_chunk_size,
+        qdrant_wait=qdrant_wait,
+    )
+
     logger.info("Closing DB session")
     db_session.close()
     logger.info("QdrantSyncronizer finished")
@@ -233,4 +552,4 @@ def main() -> None:
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    export_node_metrics(profile_node(main))()
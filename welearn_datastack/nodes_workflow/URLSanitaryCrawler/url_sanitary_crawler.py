@@ -1,17 +1,20 @@
 import logging
 import os
-import uuid
 from typing import List
 
 from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
-from welearn_database.data.models import ErrorRetrieval, ProcessState, WeLearnDocument
+from welearn_database.data.models import WeLearnDocument
 
 from welearn_datastack.data.enumerations import URLStatus
-from welearn_datastack.modules.retrieve_data_from_files import retrieve_ids_from_csv
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
+from welearn_datastack.modules.state_writer import StateWriter
 from welearn_datastack.modules.url_checker import check_url
 from welearn_datastack.utils_.database_utils import create_db_session
 from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -36,7 +39,7 @@ def main() -> None:
 
     input_directory, _ = setup_local_path()
 
-    docids = retrieve_ids_from_csv(
+    docids = retrieve_ids_from_artifact(
         input_artifact=input_artifact, input_directory=input_directory
     )
 
@@ -58,6 +61,7 @@ def main() -> None:
     # Check url
     logger.info("Check URL state")
 
+    state_writer = StateWriter(db_session)
     wld: WeLearnDocument
     for i, wld in enumerate(welearn_documents):
         check_ret = check_url(wld.url)
@@ -71,38 +75,24 @@ def main() -> None:
             case URLStatus.UPDATE:
                 flag = True
                 info_error_ret = f"{wld.url} gonna be updated soon"
-                db_session.add(
-                    ProcessState(
-                        id=uuid.uuid4(),
-                        document_id=wld.id,
-                        title=Step.URL_RETRIEVED.value,
-                    )
-                )
+                state_writer.add_state(wld.id, Step.URL_RETRIEVED)
             case URLStatus.DELETE:
                 flag = True
                 info_error_ret = f"{wld.url} gonna be deleted soon"
-                db_session.add(
-                    ProcessState(
-                        id=uuid.uuid4(),
-                        document_id=wld.id,
-                        title=Step.DOCUMENT_IS_IRRETRIEVABLE.value,
-                    )
-                )
+                state_writer.add_state(wld.id, Step.DOCUMENT_IS_IRRETRIEVABLE)
 
         if flag:
-            db_session.add(
-                ErrorRetrieval(
-                    id=uuid.uuid4(),
-                    document_id=wld.id,
-                    http_error_code=check_ret[1],
-                    error_info=info_error_ret,
-                )
+            state_writer.add_error(
+                document_id=wld.id,
+                http_error_code=check_ret[1],
+                error_info=info_error_ret,
             )
 
+    state_writer.flush()
     db_session.commit()
     db_session.close()
 
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
@@ -6,6 +6,7 @@ from sqlalchemy import text
 
 from welearn_datastack.regular_expression import ALPHANUMERIC_DOT_REGEX
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
 
 # Set up logging configuration
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -54,4 +55,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    profile_node(main)()
@@ -5,8 +5,10 @@ from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
 
 from welearn_datastack.data.batch_generator import BatchGenerator
+from welearn_datastack.data.enumerations import BatchManifestFormat
 from welearn_datastack.modules import retrieve_data_from_database
 from welearn_datastack.utils_.database_utils import create_db_session
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -66,7 +68,13 @@ def main() -> None:
     # Create batch
     logger.info("Create batch")
     batch_generator.create_ids_batch(ids_to_batch)
-    batch_generator.write_batches_to_file()
+    batch_generator.write_batches_to_file(
+        retrieve_data_from_database.retrieve_documents_manifest_info(
+            db_session, ids_to_batch
+        )
+        if batch_generator.manifest_format == BatchManifestFormat.NPY
+        else None
+    )
     logger.info("Batch created")
 
     logger.info("Write quantity")
@@ -78,4 +86,4 @@ def main() -> None:
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
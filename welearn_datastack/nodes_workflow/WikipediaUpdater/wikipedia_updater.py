@@ -5,12 +5,16 @@ from typing import List
 import requests.exceptions
 from sqlalchemy.orm import Session
 from welearn_database.data.enumeration import Step
-from welearn_database.data.models import ErrorRetrieval, ProcessState, WeLearnDocument
+from welearn_database.data.models import WeLearnDocument
 
-from welearn_datastack.modules.retrieve_data_from_files import retrieve_ids_from_csv
+from welearn_datastack.modules.retrieve_data_from_files import (
+    retrieve_ids_from_artifact,
+)
+from welearn_datastack.modules.state_writer import StateWriter
 from welearn_datastack.modules.wikipedia_updater import is_redirection, is_too_different
 from welearn_datastack.utils_.database_utils import create_db_session
 from welearn_datastack.utils_.path_utils import setup_local_path
+from welearn_datastack.utils_.profiling_utils import profile_node
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 log_level: int = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO"))
@@ -35,7 +39,7 @@ def main() -> None:
 
     input_directory, _ = setup_local_path()
 
-    docids = retrieve_ids_from_csv(
+    docids = retrieve_ids_from_artifact(
         input_artifact=input_artifact, input_directory=input_directory
     )
 
@@ -53,23 +57,17 @@ def main() -> None:
 
     # Comparing documents with current online version
     logger.info("Comparing documents with current online version")
+    state_writer = StateWriter(db_session)
     wld: WeLearnDocument
     for wld in welearn_documents:
         try:
             if is_redirection(wld):
                 logger.info("Document '%s' is a redirection", wld.title)
-                db_session.add(
-                    ProcessState(
-                        document_id=wld.id,
-                        title=Step.DOCUMENT_IS_INVALID.value,
-                    )
-                )
-                db_session.add(
-                    ErrorRetrieval(
-                        document_id=wld.id,
-                        http_error_code=307,
-                        error_info="Wikipedia updater determine this document is a redirection, not a content page",
-                    ),
+                state_writer.add_state(wld.id, Step.DOCUMENT_IS_INVALID)
+                state_writer.add_error(
+                    document_id=wld.id,
+                    http_error_code=307,
+                    error_info="Wikipedia updater determine this document is a redirection, not a content page",
                 )
                 continue
 
@@ -77,12 +75,7 @@ def main() -> None:
                 logger.info(
                     "Document '%s' has a size difference exceeding 5%%", wld.title
                 )
-                db_session.add(
-                    ProcessState(
-                        document_id=wld.id,
-                        title=Step.URL_RETRIEVED.value,
-                    )
-                )
+                state_writer.add_state(wld.id, Step.URL_RETRIEVED)
         except (ValueError, KeyError) as e:
             logger.error("Error while comparing document '%s': %s", wld.title, e)
             continue
@@ -91,24 +84,23 @@ def main() -> None:
             response = getattr(e, "response", None)
             status_code = getattr(response, "status_code", "unknown")
             request_url = getattr(response, "url", "unknown")
-            db_session.add(
-                ErrorRetrieval(
-                    document_id=wld.id,
-                    http_error_code=status_code,
-                    error_info=(
-                        f"HTTPError in wikipedia_updater | "
-                        f"status_code={status_code} | "
-                        f"url={request_url} | "
-                        f"detail={e}"
-                    ),
+            state_writer.add_error(
+                document_id=wld.id,
+                http_error_code=status_code,
+                error_info=(
+                    f"HTTPError in wikipedia_updater | "
+                    f"status_code={status_code} | "
+                    f"url={request_url} | "
+                    f"detail={e}"
                 ),
             )
             continue
 
+    state_writer.flush()
     db_session.commit()
     db_session.close()
 
 
 if __name__ == "__main__":
     load_dotenv_local()
-    main()
+    profile_node(main)()
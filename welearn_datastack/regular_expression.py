@@ -88,3 +88,19 @@ def simple_xml_tag_format_regex(tag: str) -> str:
     """
     escaped_tag = re.escape(tag)
     return rf"<{escaped_tag}\b([^>]*?)(?:\s*/>|>(.*?)</{escaped_tag}>)"
+
+
+# description: Matches the name of a monthly partition of process_state, capturing its year and month.
+# example: "process_state_y2026m10" -> captures ("2026", "10")
+# limit: The default partition and any partition named otherwise are not matched.
+PROCESS_STATE_PARTITION_REGEX = r"^process_state_y(\d{4})m(\d{2})$"
+
+# description: Matches the literals and bind parameters of a SQL statement, to normalize it.
+# example: "WHERE title = 'scraped' AND id = %(id_1)s LIMIT 10" -> matches "'scraped'", "%(id_1)s" and "10"
+# limit: Numbers inside identifiers are not matched, dollar-quoted strings are not handled.
+SQL_VALUE_REGEX = r"'(?:[^']|'')*'|%\([^)]*\)s|%s|\$\d+|\?|\b\d+(?:\.\d+)?\b"
+
+# description: Matches a list of normalized values, as generated by an IN clause.
+# example: "IN (?, ?, ?)" -> matches "(?, ?, ?)"
+# limit: Only matches lists of values already replaced by "?".
+SQL_VALUES_LIST_REGEX = r"\(\s*\?(?:\s*,\s*\?)+\s*\)"
@@ -2,11 +2,14 @@ import logging
 import math
 import os
 import sys
-from typing import Any, List
+from functools import cache
+from typing import Any, Dict, Iterator, List
 
-from sqlalchemy import URL, create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import URL, Engine, create_engine
+from sqlalchemy.orm import Query, sessionmaker
+from sqlalchemy.pool import NullPool
 
+from welearn_datastack.utils_.sql_instrumentation_utils import instrument_engine
 from welearn_datastack.utils_.virtual_environement_utils import load_dotenv_local
 
 logger = logging.getLogger(__name__)
@@ -18,9 +21,67 @@ def get_main_script_name() -> str:
 
 
 def create_db_session():
-    engine = create_sqlalchemy_engine()
-    session_made = sessionmaker(engine)
-    return session_made()
+    """
+    Create a session on the process-wide engine, sessions share its connection pool
+    :return: New session
+    """
+    return _get_session_maker()()
+
+
+@cache
+def _get_session_maker() -> sessionmaker:
+    return sessionmaker(get_sqlalchemy_engine())
+
+
+@cache
+def get_sqlalchemy_engine() -> Engine:
+    """
+    Get the engine of the process, created on first call
+    :return: Engine
+    """
+    return create_sqlalchemy_engine()
+
+
+def _get_engine_options(pg_driver: str) -> Dict[str, Any]:
+    """
+    Get the engine options from the environment :
+    - PG_POOL_SIZE, PG_MAX_OVERFLOW, PG_POOL_TIMEOUT, PG_POOL_RECYCLE and PG_POOL_PRE_PING for the connection pool
+    - PG_QUERY_CACHE_SIZE for the compiled statements cache
+    - PG_INSERTMANYVALUES_PAGE_SIZE for the number of rows per INSERT of bulk inserts
+    - PG_EXECUTEMANY_BATCH_PAGE_SIZE for the number of statements per round trip of bulk updates (psycopg2)
+    - PG_PGBOUNCER, when connecting through PgBouncer : the pooling is left to PgBouncer and prepared statements,
+      which don't survive a transaction pooling, are disabled
+    :param pg_driver: SQLAlchemy driver name
+    :return: Keyword arguments for create_engine
+    """
+    options: Dict[str, Any] = {
+        "query_cache_size": int(os.getenv("PG_QUERY_CACHE_SIZE", 500)),
+        "insertmanyvalues_page_size": int(
+            os.getenv("PG_INSERTMANYVALUES_PAGE_SIZE", 1000)
+        ),
+    }
+    if not pg_driver.startswith("postgresql"):
+        return options
+
+    if os.getenv("PG_PGBOUNCER", "False").lower() == "true":
+        options["poolclass"] = NullPool
+        if pg_driver == "postgresql+psycopg":
+            options["connect_args"] = {"prepare_threshold": None}
+    else:
+        options["pool_size"] = int(os.getenv("PG_POOL_SIZE", 5))
+        options["max_overflow"] = int(os.getenv("PG_MAX_OVERFLOW", 5))
+        options["pool_timeout"] = int(os.getenv("PG_POOL_TIMEOUT", 30))
+        options["pool_recycle"] = int(os.getenv("PG_POOL_RECYCLE", 1800))
+        options["pool_pre_ping"] = (
+            os.getenv("PG_POOL_PRE_PING", "True").lower() == "true"
+        )
+
+    if pg_driver == "postgresql+psycopg2":
+        options["executemany_mode"] = "values_plus_batch"
+        options["executemany_batch_page_size"] = int(
+            os.getenv("PG_EXECUTEMANY_BATCH_PAGE_SIZE", 100)
+        )
+    return options
 
 
 def create_sqlalchemy_engine():
@@ -39,12 +100,26 @@ def create_sqlalchemy_engine():
         port=pg_port,
         database=pg_db,
     )
-    engine = create_engine(
-        url_object, connect_args={"application_name": get_main_script_name()}
-    )
+    options = _get_engine_options(pg_driver)
+    connect_args = options.pop("connect_args", {})
+    if pg_driver.startswith("postgresql"):
+        connect_args["application_name"] = get_main_script_name()
+    engine = create_engine(url_object, connect_args=connect_args, **options)
+    instrument_engine(engine)
     return engine
 
 
+def stream_query_results(query: Query, chunk_size: int = 1000) -> Iterator[Any]:
+    """
+    Iterate over the results of a query with a server-side cursor, only chunk_size rows are held in memory at a time.
+    With PgBouncer, the iteration must stay in the transaction which started it.
+    :param query: Query to stream
+    :param chunk_size: Number of rows fetched per round trip
+    :return: Rows of the query
+    """
+    return iter(query.yield_per(chunk_size))
+
+
 def create_specific_batches_quantity(
     to_batch_list: List[Any],
     qty_batch: int,
@@ -0,0 +1,77 @@
+import logging
+import os
+from pathlib import Path
+from typing import List, Mapping, Sequence, TypedDict
+from uuid import UUID
+
+import numpy as np
+
+from welearn_datastack.data.enumerations import BatchManifestFormat
+
+logger = logging.getLogger(__name__)
+
+# One row per document : raw UUID, size in bytes (-1 if unknown), corpus and last process title, utf-8 encoded
+MANIFEST_DTYPE = np.dtype(
+    [("id", "V16"), ("size", "<i8"), ("corpus", "S32"), ("step", "S32")]
+)
+MANIFEST_SUFFIX = ".npy"
+
+
+class ManifestInfo(TypedDict):
+    corpus: str
+    size: int
+    step: str
+
+
+def get_manifest_format() -> BatchManifestFormat:
+    """
+    Get the format of the batch files from BATCH_MANIFEST_FORMAT (CSV by default)
+    :return: Batch manifest format
+    """
+    return BatchManifestFormat[os.getenv("BATCH_MANIFEST_FORMAT", "CSV").upper()]
+
+
+def write_manifest(
+    path: Path,
+    documents_ids: Sequence[str],
+    documents_info: Mapping[str, ManifestInfo] | None = None,
+) -> None:
+    """
+    Write a batch of documents ids as a binary manifest
+    :param path: Path of the manifest file
+    :param documents_ids: Documents ids of the batch
+    :param documents_info: Corpus, size and step per document id, the documents without info get an empty corpus and
+    step and a size of -1
+    """
+    documents_info = documents_info or {}
+    manifest = np.zeros(len(documents_ids), dtype=MANIFEST_DTYPE)
+    manifest["size"] = -1
+    for i, docid in enumerate(documents_ids):
+        manifest[i]["id"] = UUID(str(docid)).bytes
+        info = documents_info.get(str(docid))
+        if info is not None:
+            manifest[i]["size"] = info["size"]
+            manifest[i]["corpus"] = info["corpus"].encode("utf-8")
+            manifest[i]["step"] = info["step"].encode("utf-8")
+    np.save(path, manifest, allow_pickle=False)
+
+
+def read_manifest(path: Path) -> np.ndarray:
+    """
+    Read a binary manifest, the file is memory-mapped instead of loaded
+    :param path: Path of the manifest file
+    :return: Structured array with MANIFEST_DTYPE
+    """
+    manifest = np.load(path, mmap_mode="r", allow_pickle=False)
+    if manifest.dtype != MANIFEST_DTYPE:
+        raise ValueError(f"Not a batch manifest: {path}")
+    return manifest
+
+
+def manifest_ids(manifest: np.ndarray) -> List[UUID]:
+    """
+    Documents ids of a manifest
+    :param manifest: Manifest returned by read_manifest
+    :return: Documents ids
+    """
+    return [UUID(bytes=raw_id.tobytes()) for raw_id in manifest["id"]]
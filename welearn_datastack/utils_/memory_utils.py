@@ -0,0 +1,299 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import resource
+import socket
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+from welearn_datastack.utils_.path_utils import setup_local_path
+
+logger = logging.getLogger(__name__)
+
+MEGABYTE = 1024 * 1024
+
+
+def get_rss() -> int:
+    """
+    Resident set size of the current process, from /proc when available, else the peak RSS from getrusage
+    :return: RSS in bytes
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    """
+    Sample the RSS of the process at a fixed interval, from another thread, and keep its peak
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.peak = get_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="rss-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def sample(self) -> int:
+        """
+        Sample the RSS now
+        :return: Current RSS in bytes
+        """
+        rss = get_rss()
+        self.peak = max(self.peak, rss)
+        return rss
+
+    def reset_peak(self) -> int:
+        """
+        Restart the peak from the current RSS
+        :return: Current RSS in bytes
+        """
+        rss = get_rss()
+        self.peak = rss
+        return rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+@dataclass
+class PhaseMemory:
+    """
+    Memory used by all the runs of a phase
+    :cvar calls: Number of runs
+    :cvar input_bytes: Total size of the inputs of the runs, in bytes
+    :cvar traced_peak: Highest peak of Python allocations made during a run, in bytes
+    :cvar rss_peak: Highest RSS of the process during a run, in bytes
+    :cvar rss_increase_peak: Highest increase of the RSS during a run, in bytes
+    :cvar traced_bytes_per_input_mb: Highest ratio, per run, of traced peak to input size in megabytes
+    :cvar rss_bytes_per_input_mb: Highest ratio, per run, of RSS increase to input size in megabytes
+    """
+
+    calls: int = 0
+    input_bytes: int = 0
+    traced_peak: int = 0
+    rss_peak: int = 0
+    rss_increase_peak: int = 0
+    traced_bytes_per_input_mb: float | None = None
+    rss_bytes_per_input_mb: float | None = None
+
+    def add(self, frame: "PhaseFrame") -> None:
+        self.calls += 1
+        self.traced_peak = max(self.traced_peak, frame.traced_increase)
+        self.rss_peak = max(self.rss_peak, frame.rss_peak_seen)
+        self.rss_increase_peak = max(self.rss_increase_peak, frame.rss_increase)
+        if not frame.input_bytes:
+            return
+        self.input_bytes += frame.input_bytes
+        input_mb = frame.input_bytes / MEGABYTE
+        self.traced_bytes_per_input_mb = max(
+            self.traced_bytes_per_input_mb or 0.0, frame.traced_increase / input_mb
+        )
+        self.rss_bytes_per_input_mb = max(
+            self.rss_bytes_per_input_mb or 0.0, frame.rss_increase / input_mb
+        )
+
+
+@dataclass
+class PhaseFrame:
+    """
+    Run of a phase in progress. Its input size can be set while it runs, e.g. once the documents are collected, and
+    can be a callable, only called at the end of the phase when the tracker is started
+    """
+
+    name: str
+    input_bytes: int | Callable[[], int] | None = None
+    traced_base: int = 0
+    traced_peak_seen: int = 0
+    rss_base: int = 0
+    rss_peak_seen: int = 0
+
+    @property
+    def traced_increase(self) -> int:
+        return max(0, self.traced_peak_seen - self.traced_base)
+
+    @property
+    def rss_increase(self) -> int:
+        return max(0, self.rss_peak_seen - self.rss_base)
+
+
+class MemoryTracker:
+    """
+    Track the peak memory of the phases of a node : Python allocations with tracemalloc and RSS (which includes
+    native allocations, e.g. of the models) with a sampling thread. Phases can be nested, tracemalloc and RSS peaks
+    are reset when a phase starts and the peaks seen by the inner phases are reported to the outer ones.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseMemory] = {}
+        self._stack: List[PhaseFrame] = []
+        self._sampler: RssSampler | None = None
+        self._started_tracemalloc = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._sampler is not None
+
+    def start(self, interval: float = 0.05) -> None:
+        """
+        Start tracking, the phases run before are ignored
+        :param interval: Interval between two RSS samples, in seconds
+        """
+        self.phases = {}
+        self._stack = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._sampler = RssSampler(interval)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        if self._sampler is None:
+            return
+        self._sampler.stop()
+        self._sampler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _update_current_frame(self) -> None:
+        if not self._stack or self._sampler is None:
+            return
+        frame = self._stack[-1]
+        _, traced_peak = tracemalloc.get_traced_memory()
+        self._sampler.sample()
+        frame.traced_peak_seen = max(frame.traced_peak_seen, traced_peak)
+        frame.rss_peak_seen = max(frame.rss_peak_seen, self._sampler.peak)
+
+    @contextmanager
+    def phase(
+        self, name: str, input_bytes: int | Callable[[], int] | None = None
+    ) -> Iterator[PhaseFrame]:
+        """
+        Track the peak memory of a block, does nothing if the tracker is not started
+        :param name: Name of the phase, the runs of a same phase are aggregated
+        :param input_bytes: Size of the input of the block, to compute the memory needed per input megabyte. Pass a
+        callable when the size is costly to compute, it is only called if the tracker is started
+        :return: Run of the phase, whose input_bytes can be set in the block
+        """
+        frame = PhaseFrame(name=name, input_bytes=input_bytes)
+        if self._sampler is None:
+            yield frame
+            return
+
+        # Keep the peaks of the outer phase before they are reset
+        self._update_current_frame()
+        frame.traced_base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        frame.rss_base = self._sampler.reset_peak()
+        frame.traced_peak_seen = frame.traced_base
+        frame.rss_peak_seen = frame.rss_base
+        self._stack.append(frame)
+        try:
+            yield frame
+        finally:
+            self._update_current_frame()
+            self._stack.pop()
+            if callable(frame.input_bytes):
+                frame.input_bytes = frame.input_bytes()
+            self.phases.setdefault(name, PhaseMemory()).add(frame)
+            if self._stack:
+                outer = self._stack[-1]
+                outer.traced_peak_seen = max(
+                    outer.traced_peak_seen, frame.traced_peak_seen
+                )
+                outer.rss_peak_seen = max(outer.rss_peak_seen, frame.rss_peak_seen)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {name: asdict(phase) for name, phase in self.phases.items()}
+
+    def log_summary(self) -> None:
+        for name, phase in self.phases.items():
+            logger.info(
+                "Memory of phase '%s' (%s runs): traced peak %.1f MB, RSS peak %.1f MB (+%.1f MB), "
+                "%s traced bytes and %s RSS bytes per input MB",
+                name,
+                phase.calls,
+                phase.traced_peak / MEGABYTE,
+                phase.rss_peak / MEGABYTE,
+                phase.rss_increase_peak / MEGABYTE,
+                (
+                    round(phase.traced_bytes_per_input_mb)
+                    if phase.traced_bytes_per_input_mb is not None
+                    else "n/a"
+                ),
+                (
+                    round(phase.rss_bytes_per_input_mb)
+                    if phase.rss_bytes_per_input_mb is not None
+                    else "n/a"
+                ),
+            )
+
+
+memory_tracker = MemoryTracker()
+
+
+def track_node_memory(main: Callable[[], None]) -> Callable[[], None]:
+    """
+    Track the memory of the phases of the main function of a node when MEMORY_TRACKING is true, with an RSS sample
+    every MEMORY_INTERVAL seconds (0.05 by default). The report is logged and written, even if the node fails, in the
+    MEMORY_DIRECTORY folder (memory by default) of the local artifact output, named after the node and the batch.
+    :param main: Main function of the node
+    :return: Wrapped main function
+    """
+
+    @functools.wraps(main)
+    def wrapper() -> None:
+        if os.getenv("MEMORY_TRACKING", "False").lower() != "true":
+            main()
+            return
+
+        node_name = Path(inspect.getfile(inspect.unwrap(main))).stem
+        batch_id = os.getenv("BATCH_ID", socket.gethostname())
+        memory_tracker.start(float(os.getenv("MEMORY_INTERVAL", 0.05)))
+        try:
+            with memory_tracker.phase("node"):
+                main()
+        finally:
+            memory_tracker.stop()
+            memory_tracker.log_summary()
+            _, local_artifact_output = setup_local_path()
+            output_directory = local_artifact_output / os.getenv(
+                "MEMORY_DIRECTORY", "memory"
+            )
+            output_directory.mkdir(parents=True, exist_ok=True)
+            with open(
+                Path(f"{output_directory / node_name}_{batch_id}.json"),
+                "w",
+                encoding="utf-8",
+            ) as f:
+                json.dump(
+                    {
+                        "node": node_name,
+                        "batch_id": batch_id,
+                        "phases": memory_tracker.to_dict(),
+                    },
+                    f,
+                )
+            logger.info("Memory report written in %s", output_directory)
+
+    return wrapper
@@ -0,0 +1,404 @@
+import bisect
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from welearn_datastack.utils_.http_client_utils import get_new_https_session
+from welearn_datastack.utils_.path_utils import setup_local_path
+
+logger = logging.getLogger(__name__)
+
+METRICS_FORMATS = ("openmetrics", "json")
+
+# Seconds, from a database write to a model inference on a big document
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """
+    Format labels in the OpenMetrics text format
+    :param names: Labels names
+    :param values: Labels values, in the same order
+    :return: Labels between braces, or an empty string if there is no label
+    """
+    if not names:
+        return ""
+    labels = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + labels + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_bound(bound: float) -> str:
+    # Canonical form of the "le" label : always a float, e.g. "1.0"
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+class Metric(ABC):
+    """
+    Base of the metrics : a name, a documentation and the values per labels values
+    """
+
+    metric_type: str = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric '{self.name}' expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """
+        Samples of the metric as (name, labels, value)
+        """
+        pass
+
+    @abstractmethod
+    def to_dict(self) -> Dict:
+        pass
+
+    @abstractmethod
+    def reset(self) -> None:
+        pass
+
+
+class Counter(Metric):
+    """
+    Monotonic count, e.g. of processed documents
+    """
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Increment the counter
+        :param amount: Non negative increment
+        :param labels: Labels values of the incremented count
+        """
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._label_values(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for key, value in self._values.items():
+            yield f"{self.name}_total", dict(zip(self.labelnames, key)), value
+
+    def to_dict(self) -> Dict:
+        return {
+            "type": self.metric_type,
+            "help": self.documentation,
+            "values": [
+                {"labels": dict(zip(self.labelnames, key)), "value": value}
+                for key, value in self._values.items()
+            ],
+        }
+
+    def reset(self) -> None:
+        self._values.clear()
+
+
+class Histogram(Metric):
+    """
+    Distribution of durations (or any other value) in cumulative buckets, with their sum and count
+    """
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # Counts per bucket (not cumulative), the last one is +Inf, then the sum of the values
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record a value
+        :param value: Value to record, a duration in seconds for the timers
+        :param labels: Labels values of the recorded value
+        """
+        key = self._label_values(labels)
+        if key not in self._values:
+            self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = self._values[key]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Record the duration of the block, even if it raises
+        :param labels: Labels values of the recorded duration
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _cumulative(self, key: LabelValues) -> List[Tuple[float, int]]:
+        counts, _ = self._values[key]
+        ret = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            ret.append((bound, cumulative))
+        return ret
+
+    def get_count(self, **labels: str) -> int:
+        key = self._label_values(labels)
+        return sum(self._values[key][0]) if key in self._values else 0
+
+    def get_sum(self, **labels: str) -> float:
+        key = self._label_values(labels)
+        return self._values[key][1][0] if key in self._values else 0.0
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for key, (_, total) in self._values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = self._cumulative(key)
+            for bound, count in cumulative:
+                yield f"{self.name}_bucket", {
+                    **labels,
+                    "le": _format_bound(bound),
+                }, count
+            yield f"{self.name}_count", labels, cumulative[-1][1]
+            yield f"{self.name}_sum", labels, total[0]
+
+    def to_dict(self) -> Dict:
+        values = []
+        for key, (_, total) in self._values.items():
+            cumulative = self._cumulative(key)
+            values.append(
+                {
+                    "labels": dict(zip(self.labelnames, key)),
+                    "count": cumulative[-1][1],
+                    "sum": total[0],
+                    "buckets": {
+                        _format_bound(bound): count for bound, count in cumulative
+                    },
+                }
+            )
+        return {"type": self.metric_type, "help": self.documentation, "values": values}
+
+    def reset(self) -> None:
+        self._values.clear()
+
+
+class MetricsRegistry:
+    """
+    Metrics of a node run, rendered in the OpenMetrics text format or in JSON
+    """
+
+    def __init__(self, namespace: str = "welearn_datastack"):
+        self.namespace = namespace
+        self._metrics: Dict[str, Metric] = {}
+
+    def _get_or_create(self, metric_class: type, name: str, *args, **kwargs):
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        metric = self._metrics.get(full_name)
+        if metric is None:
+            metric = metric_class(full_name, *args, **kwargs)
+            self._metrics[full_name] = metric
+        elif not isinstance(metric, metric_class):
+            raise ValueError(
+                f"Metric '{full_name}' is already registered as a {metric.metric_type}"
+            )
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """
+        Get or create a counter
+        :param name: Name of the counter, without namespace nor "_total" suffix
+        :param documentation: Help of the counter
+        :param labelnames: Labels names of the counter
+        :return: The counter
+        """
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        Get or create a histogram
+        :param name: Name of the histogram, without namespace
+        :param documentation: Help of the histogram
+        :param labelnames: Labels names of the histogram
+        :param buckets: Upper bounds of the buckets, +Inf is added
+        :return: The histogram
+        """
+        return self._get_or_create(
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def render_openmetrics(self, const_labels: Dict[str, str] | None = None) -> str:
+        """
+        Render the metrics in the OpenMetrics text format
+        :param const_labels: Labels added to every sample, e.g. the batch id
+        :return: Metrics exposition
+        """
+        const_labels = const_labels or {}
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.metric_type}")
+            for sample_name, labels, value in metric.samples():
+                labels = {**const_labels, **labels}
+                lines.append(
+                    f"{sample_name}{_format_labels(list(labels), list(labels.values()))} "
+                    f"{_format_value(value)}"
+                )
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {name: metric.to_dict() for name, metric in self._metrics.items()}
+
+    def reset(self) -> None:
+        """
+        Reset the values of every metric, the metrics stay registered
+        """
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def push(self, url: str, job: str, grouping_key: Dict[str, str]) -> None:
+        """
+        Replace the metrics of the group in a Pushgateway compatible endpoint
+        :param url: Base url of the Pushgateway
+        :param job: Job name
+        :param grouping_key: Labels identifying the group of metrics in the job
+        """
+        path = "/".join(
+            [f"{url.rstrip('/')}/metrics/job/{job}"]
+            + [f"{key}/{value}" for key, value in grouping_key.items()]
+        )
+        # The Pushgateway expects the Prometheus text format, which has no "# EOF" line
+        body = self.render_openmetrics().removesuffix("# EOF\n")
+        with get_new_https_session(retry_total=3) as http_session:
+            resp = http_session.put(
+                path,
+                data=body.encode("utf-8"),
+                headers={"Content-Type": "text/plain; version=0.0.4"},
+                timeout=30,
+            )
+            resp.raise_for_status()
+
+
+metrics = MetricsRegistry()
+
+
+def export_node_metrics(main: Callable[[], None]) -> Callable[[], None]:
+    """
+    Export the metrics recorded while running the main function of a node, even if it fails, according to :
+    - METRICS_FORMAT : openmetrics or json, written in the METRICS_DIRECTORY folder (metrics by default) of the
+    local artifact output and named after the node and the batch
+    - METRICS_PUSHGATEWAY_URL : url of a Pushgateway compatible endpoint, the job is the node and the group the batch
+    Without both, main is run as is.
+    :param main: Main function of the node
+    :return: Wrapped main function
+    """
+
+    @functools.wraps(main)
+    def wrapper() -> None:
+        metrics_format: str | None = os.getenv("METRICS_FORMAT", None)
+        pushgateway_url: str | None = os.getenv("METRICS_PUSHGATEWAY_URL", None)
+        if not metrics_format and not pushgateway_url:
+            main()
+            return
+        if metrics_format and metrics_format not in METRICS_FORMATS:
+            raise ValueError(f"Metrics format not recognized: '{metrics_format}'")
+
+        node_name = Path(inspect.getfile(inspect.unwrap(main))).stem
+        batch_id = os.getenv("BATCH_ID", socket.gethostname())
+        metrics.reset()
+        try:
+            main()
+        finally:
+            if metrics_format:
+                _, local_artifact_output = setup_local_path()
+                output_directory = local_artifact_output / os.getenv(
+                    "METRICS_DIRECTORY", "metrics"
+                )
+                output_directory.mkdir(parents=True, exist_ok=True)
+                labels = {"node": node_name, "batch_id": batch_id}
+                prefix = f"{output_directory / node_name}_{batch_id}"
+                if metrics_format == "json":
+                    with open(Path(f"{prefix}.json"), "w", encoding="utf-8") as f:
+                        json.dump({**labels, "metrics": metrics.to_dict()}, f)
+                else:
+                    with open(Path(f"{prefix}.txt"), "w", encoding="utf-8") as f:
+                        f.write(metrics.render_openmetrics(labels))
+                logger.info("Metrics written in %s", output_directory)
+            if pushgateway_url:
+                try:
+                    metrics.push(pushgateway_url, node_name, {"batch_id": batch_id})
+                    logger.info("Metrics pushed to %s", pushgateway_url)
+                except Exception as e:
+                    # Losing the metrics must not fail the node
+                    logger.error("Metrics could not be pushed: %s", e)
+
+    return wrapper
@@ -0,0 +1,145 @@
+import cProfile
+import functools
+import inspect
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Callable, Dict
+
+from welearn_datastack.utils_.path_utils import setup_local_path
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+def collapse_stack(frame: FrameType | None) -> str:
+    """
+    Collapse a call stack in the format of flame graph tools : frames from the root to the leaf, separated by ";"
+    :param frame: Innermost frame of the stack
+    :return: Collapsed stack
+    """
+    frames = []
+    while frame is not None:
+        frames.append(
+            f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class StackSampler:
+    """
+    Sample the call stack of a thread at a fixed interval, from another thread, and count each collapsed stack
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def write_collapsed(self, path: Path) -> None:
+        """
+        Write the sampled stacks, one "stack count" line each
+        :param path: Path of the file
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _get_profile_tags() -> Dict[str, str]:
+    """
+    Tags of the profile, from BATCH_ID (the pod name by default) and PICK_CORPUS_NAME
+    :return: Tags
+    """
+    return {
+        "batch_id": os.getenv("BATCH_ID", socket.gethostname()),
+        "corpus": os.getenv("PICK_CORPUS_NAME", "*").replace("*", "all"),
+    }
+
+
+def profile_node(main: Callable[[], None]) -> Callable[[], None]:
+    """
+    Profile the main function of a node according to PROFILE_MODE :
+    - cprofile : deterministic profile (.prof, readable with pstats or snakeviz) and sampled collapsed stacks
+    - sampling : sampled collapsed stacks only, every PROFILE_INTERVAL seconds (0.01 by default)
+    The files are written, even if the node fails, in the PROFILE_DIRECTORY folder of the local artifact output and
+    named after the node, the batch and the corpus. Without PROFILE_MODE, main is run as is.
+    :param main: Main function of the node
+    :return: Wrapped main function
+    """
+
+    @functools.wraps(main)
+    def wrapper() -> None:
+        mode: str | None = os.getenv("PROFILE_MODE", None)
+        if not mode:
+            main()
+            return
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Profile mode not recognized: '{mode}'")
+
+        _, local_artifact_output = setup_local_path()
+        tags = _get_profile_tags()
+        node_name = Path(inspect.getfile(main)).stem
+        output_directory = local_artifact_output / os.getenv(
+            "PROFILE_DIRECTORY", "profiles"
+        )
+        output_directory.mkdir(parents=True, exist_ok=True)
+        # Not a Path : the tags may contain dots
+        prefix = f"{output_directory / node_name}_{tags['batch_id']}_{tags['corpus']}"
+
+        sampler = StackSampler(
+            threading.get_ident(), float(os.getenv("PROFILE_INTERVAL", 0.01))
+        )
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        start = time.perf_counter()
+        sampler.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            main()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(Path(f"{prefix}.prof"))
+            sampler.stop()
+            sampler.write_collapsed(Path(f"{prefix}.collapsed"))
+            with open(Path(f"{prefix}.json"), "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "node": node_name,
+                        "mode": mode,
+                        "duration": time.perf_counter() - start,
+                        "samples": sum(sampler.stacks.values()),
+                        **tags,
+                    },
+                    f,
+                )
+            logger.info("Profile written in %s", output_directory)
+
+    return wrapper
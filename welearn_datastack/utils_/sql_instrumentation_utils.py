@@ -0,0 +1,176 @@
+import atexit
+import logging
+import math
+import os
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List
+
+from sqlalchemy import Engine, event
+
+from welearn_datastack.exceptions import QueryBudgetExceededError
+from welearn_datastack.regular_expression import (
+    SQL_VALUE_REGEX,
+    SQL_VALUES_LIST_REGEX,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Normalize a SQL statement so that the executions of a same query are counted together : literals and bind
+    parameters are replaced by "?", lists of values by "(?)" and whitespaces are collapsed
+    :param statement: SQL statement
+    :return: Normalized statement
+    """
+    statement = re.sub(SQL_VALUE_REGEX, "?", statement)
+    statement = re.sub(SQL_VALUES_LIST_REGEX, "(?)", statement)
+    return " ".join(statement.split())
+
+
+@dataclass
+class StatementStats:
+    """
+    Executions of a normalized statement
+    :cvar count: Number of executions
+    :cvar total_time: Total duration of the executions, in seconds
+    :cvar rows: Total number of rows returned or affected
+    :cvar durations: Duration of each execution, in seconds
+    """
+
+    count: int = 0
+    total_time: float = 0.0
+    rows: int = 0
+    durations: List[float] = field(default_factory=list)
+
+    @property
+    def p95_time(self) -> float:
+        """
+        95th percentile of the durations (nearest rank), in seconds
+        """
+        if not self.durations:
+            return 0.0
+        durations = sorted(self.durations)
+        return durations[math.ceil(0.95 * len(durations)) - 1]
+
+
+class QueryInstrumentation:
+    """
+    Record the executions of the SQL statements of engines, per normalized statement, with the cursor events
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, StatementStats] = {}
+
+    @property
+    def query_count(self) -> int:
+        return sum(s.count for s in self.stats.values())
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Start recording the statements of an engine
+        :param engine: Engine to instrument
+        """
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def detach(self, engine: Engine) -> None:
+        """
+        Stop recording the statements of an engine
+        :param engine: Instrumented engine
+        """
+        event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def reset(self) -> None:
+        self.stats = {}
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = self.stats.setdefault(normalize_statement(statement), StatementStats())
+        stats.count += 1
+        stats.total_time += duration
+        stats.rows += max(cursor.rowcount, 0)
+        stats.durations.append(duration)
+
+    def top(self, n: int) -> List[tuple[str, StatementStats]]:
+        """
+        Statements which took the longest in total
+        :param n: Number of statements
+        :return: Normalized statements and their stats, longest first
+        """
+        return sorted(
+            self.stats.items(), key=lambda item: item[1].total_time, reverse=True
+        )[:n]
+
+    def log_summary(self, n: int = 10) -> None:
+        """
+        Log the count, the total and p95 durations and the rows of the n statements which took the longest
+        :param n: Number of statements
+        """
+        logger.info(
+            "'%s' SQL queries executed, in %.3fs",
+            self.query_count,
+            sum(s.total_time for s in self.stats.values()),
+        )
+        for statement, stats in self.top(n):
+            logger.info(
+                "count=%s total=%.3fs p95=%.4fs rows=%s - %s",
+                stats.count,
+                stats.total_time,
+                stats.p95_time,
+                stats.rows,
+                statement[:500],
+            )
+
+
+query_instrumentation = QueryInstrumentation()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Record the statements of an engine when SQL_INSTRUMENTATION is true, the SQL_INSTRUMENTATION_TOP statements which
+    took the longest are logged when the node exits
+    :param engine: Engine to instrument
+    """
+    if os.getenv("SQL_INSTRUMENTATION", "False").lower() != "true":
+        return
+
+    query_instrumentation.attach(engine)
+    atexit.register(
+        query_instrumentation.log_summary,
+        int(os.getenv("SQL_INSTRUMENTATION_TOP", 10)),
+    )
+
+
+@contextmanager
+def query_budget(engine: Engine, max_queries: int) -> Iterator[QueryInstrumentation]:
+    """
+    Fail when the statements executed on an engine inside the block exceed a budget, e.g. to catch N+1 lazy loads
+    in tests
+    :param engine: Engine to watch
+    :param max_queries: Max number of statements
+    :return: Instrumentation of the block
+    """
+    instrumentation = QueryInstrumentation()
+    instrumentation.attach(engine)
+    try:
+        yield instrumentation
+    finally:
+        instrumentation.detach(engine)
+
+    if instrumentation.query_count > max_queries:
+        instrumentation.log_summary()
+        raise QueryBudgetExceededError(
+            f"{instrumentation.query_count} SQL queries executed, the budget is {max_queries}"
+        )